@@ -0,0 +1,73 @@
+"""
+Per-request cost of the ban check as the ban lists grow.
+
+"linear" is the old middleware: re.search per user agent pattern and a membership test per network.
+"compiled" is BanMatcher: one trie-factored regex for user agents and a CIDR prefix tree for addresses.
+Both are timed on requests that are not banned, the case where every entry has to be ruled out.
+
+    python -m benchmarks.bench_bans [--sizes 10 100 1000 5000] [--requests 2000]
+"""
+import argparse
+import random
+import re
+import string
+from ipaddress import ip_address, ip_network
+from time import perf_counter
+
+from src.services.bans import BanMatcher
+
+USER_AGENTS = [
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0 Safari/537.36",
+    "Mozilla/5.0 (X11; Linux x86_64; rv:121.0) Gecko/20100101 Firefox/121.0",
+    "Mozilla/5.0 (iPhone; CPU iPhone OS 17_1 like Mac OS X) AppleWebKit/605.1.15 Mobile/15E148",
+]
+
+
+def ban_lists(size: int, rng: random.Random) -> tuple[list[str], list[str]]:
+    agents = ["".join(rng.choices(string.ascii_letters, k=rng.randint(6, 14))) + "Bot" for _ in range(size)]
+    ips = []
+    for _ in range(size):
+        if rng.random() < 0.8:
+            ips.append(f"{rng.randint(11, 99)}.{rng.randint(0, 255)}.{rng.randint(0, 255)}.0/{rng.choice((16, 24, 32))}")
+        else:
+            ips.append(f"2001:db8:{rng.randint(0, 0xffff):x}::/48")
+    return ips, agents
+
+
+def linear_check(networks, patterns):
+    def is_banned(host: str, user_agent: str) -> bool:
+        address = ip_address(host)
+        if any(address in network for network in networks):
+            return True
+        return any(re.search(pattern, user_agent) for pattern in patterns)
+    return is_banned
+
+
+def timed(check, requests: list[tuple[str, str]]) -> float:
+    start = perf_counter()
+    for host, user_agent in requests:
+        check(host, user_agent)
+    return (perf_counter() - start) / len(requests) * 1e6
+
+
+def main(sizes: list[int], count: int):
+    rng = random.Random(1)
+    requests = [(f"{rng.randint(100, 199)}.{rng.randint(0, 255)}.0.1", rng.choice(USER_AGENTS)) for _ in range(count)]
+    print(f"{'entries':>8} {'linear us':>10} {'compiled us':>12} {'build ms':>9}")
+    for size in sizes:
+        ips, agents = ban_lists(size, rng)
+        start = perf_counter()
+        matcher = BanMatcher(ips, agents)
+        build = (perf_counter() - start) * 1000
+        linear = linear_check([ip_network(ip, strict=False) for ip in ips], agents)
+        # past 512 patterns re's cache thrashes and the old check recompiles every pattern, so sample it less
+        linear_us = timed(linear, requests[:max(5, count * 100 // size)])
+        print(f"{size:>8} {linear_us:>10.2f} {timed(matcher.is_banned, requests):>12.2f} {build:>9.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 1000, 5000])
+    parser.add_argument("--requests", type=int, default=2000)
+    args = parser.parse_args()
+    main(args.sizes, args.requests)
@@ -0,0 +1,113 @@
+"""
+Requests per second through the whole app with the ban check as BaseHTTPMiddleware ("before")
+and as the pure ASGI BanMiddleware ("after").
+
+Requests are driven in process through httpx's ASGI transport against a SQLite database,
+with authentication overridden and Redis backed features (rate limits, response cache) switched off,
+so the numbers reflect the middleware stack and the handlers only.
+
+    python -m benchmarks.bench_middleware [--requests 2000] [--concurrency 10] [--db-url sqlite+aiosqlite:///./bench.db]
+"""
+import argparse
+import asyncio
+from time import perf_counter
+
+import httpx
+from fastapi import Request, status
+from fastapi.responses import JSONResponse
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from starlette.middleware import Middleware
+from starlette.middleware.base import BaseHTTPMiddleware
+
+from main import app
+from src.conf.config import config
+from src.database.db import get_db
+from src.entity.models import Base, Contact, User
+from src.middleware.bans import BanMiddleware
+from src.services.auth import auth_service
+from src.services.bans import ban_service
+from src.services.cache import contacts_cache
+
+PATHS = ["/api/healthchecker", "/api/contacts/?limit=10"]
+
+
+async def legacy_ban_middleware(request: Request, call_next):
+    host = request.client.host if request.client else None
+    if ban_service.matcher.is_banned(host, request.headers.get("user-agent")):
+        return JSONResponse(status_code=status.HTTP_403_FORBIDDEN, content={"detail": "You are banned"})
+    return await call_next(request)
+
+
+def use_middleware(middleware: Middleware) -> None:
+    app.user_middleware = [middleware if m.cls is BanMiddleware or m.cls is BaseHTTPMiddleware else m
+                           for m in app.user_middleware]
+    app.middleware_stack = None  # rebuilt on the next request
+
+
+async def seed(session_maker) -> User:
+    async with session_maker() as session:
+        user = User(username="bench", email="bench@example.com", password="bench", confirmed=True)
+        session.add(user)
+        await session.commit()
+        await session.execute(insert(Contact), [
+            {"first_name": f"first{i}", "last_name": f"last{i}", "email": f"contact{i}@example.com",
+             "phone_number": "380000000000", "born_date": "1990-01-01", "user_id": user.id}
+            for i in range(50)
+        ])
+        await session.commit()
+        return user
+
+
+async def run(client: httpx.AsyncClient, path: str, requests: int, concurrency: int) -> float:
+    async def worker(count: int):
+        for _ in range(count):
+            response = await client.get(path)
+            assert response.status_code == 200, response.text
+
+    await worker(10)  # warm up
+    start = perf_counter()
+    await asyncio.gather(*[worker(requests // concurrency) for _ in range(concurrency)])
+    return requests // concurrency * concurrency / (perf_counter() - start)
+
+
+async def main(requests: int, concurrency: int, db_url: str):
+    engine = create_async_engine(db_url)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(Base.metadata.create_all)
+    session_maker = async_sessionmaker(bind=engine, expire_on_commit=False)
+    user = await seed(session_maker)
+
+    async def override_get_db():
+        async with session_maker() as session:
+            yield session
+
+    app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[auth_service.get_current_user] = lambda: user
+    config.RATE_LIMIT_ENABLED = False
+    contacts_cache._redis_down_until = float("inf")
+
+    variants = {
+        "before": Middleware(BaseHTTPMiddleware, dispatch=legacy_ban_middleware),
+        "after": Middleware(BanMiddleware),
+    }
+    print(f"{'path':<28} {'before req/s':>13} {'after req/s':>12}")
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        for path in PATHS:
+            results = {}
+            for name, middleware in variants.items():
+                use_middleware(middleware)
+                results[name] = await run(client, path, requests, concurrency)
+            print(f"{path:<28} {results['before']:>13.0f} {results['after']:>12.0f}")
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--db-url", default="sqlite+aiosqlite:///./bench.db")
+    args = parser.parse_args()
+    asyncio.run(main(args.requests, args.concurrency, args.db_url))
@@ -0,0 +1,80 @@
+"""
+Compare offset and keyset (cursor) pagination of repository.contacts.get_contacts.
+
+Seeds one user with a large address book and times fetching a page at increasing depths.
+Offset pages get slower the deeper they are, keyset pages should stay flat.
+
+    python -m benchmarks.bench_pagination [--rows 50000] [--limit 50] [--db-url sqlite+aiosqlite:///./bench.db]
+"""
+import argparse
+import asyncio
+from time import perf_counter
+
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+
+from src.entity.models import Base, Contact, User
+from src.repository import contacts as repository_contacts
+
+
+async def seed(session_maker, rows: int) -> User:
+    async with session_maker() as session:
+        user = User(username="bench", email="bench@example.com", password="bench", confirmed=True)
+        session.add(user)
+        await session.commit()
+        batch = 5000
+        for start in range(0, rows, batch):
+            await session.execute(insert(Contact), [
+                {
+                    "first_name": f"first{i}",
+                    "last_name": f"last{i}",
+                    "email": f"contact{i}@example.com",
+                    "phone_number": "380000000000",
+                    "born_date": "1990-01-01",
+                    "user_id": user.id,
+                }
+                for i in range(start, min(start + batch, rows))
+            ])
+        await session.commit()
+        return user
+
+
+async def timed(coro, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = perf_counter()
+        await coro()
+        best = min(best, perf_counter() - start)
+    return best * 1000
+
+
+async def main(rows: int, limit: int, db_url: str, repeat: int):
+    engine = create_async_engine(db_url)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(Base.metadata.create_all)
+    session_maker = async_sessionmaker(bind=engine, expire_on_commit=False)
+    user = await seed(session_maker, rows)
+
+    print(f"{'depth':>10} {'offset ms':>10} {'keyset ms':>10}")
+    async with session_maker() as session:
+        depth = limit
+        while depth < rows:
+            page_offset = await timed(lambda: repository_contacts.get_contacts(limit, depth, session, user), repeat)
+            last_id = (await repository_contacts.get_contacts(1, depth - 1, session, user))[0].id
+            page_keyset = await timed(
+                lambda: repository_contacts.get_contacts(limit, 0, session, user, after=last_id), repeat
+            )
+            print(f"{depth:>10} {page_offset:>10.2f} {page_keyset:>10.2f}")
+            depth *= 4
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=50000)
+    parser.add_argument("--limit", type=int, default=50)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--db-url", default="sqlite+aiosqlite:///./bench.db")
+    args = parser.parse_args()
+    asyncio.run(main(args.rows, args.limit, args.db_url, args.repeat))
@@ -0,0 +1,81 @@
+"""
+Latency of repository.contacts.search_contacts over a large address book.
+
+Seeds one user with --rows contacts with random names and reports p50/p95/p99 over --queries
+substring searches. The target is p99 under 50 ms at 1M rows on Postgres with the trigram index.
+
+    python -m benchmarks.bench_search [--rows 100000] [--queries 200] [--db-url sqlite+aiosqlite:///./bench.db]
+"""
+import argparse
+import asyncio
+import random
+import statistics
+from time import perf_counter
+
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+
+from src.entity.models import Base, Contact, User
+from src.repository import contacts as repository_contacts
+
+SYLLABLES = ["an", "bo", "ca", "de", "el", "fi", "go", "ha", "in", "jo", "ka", "li", "mo", "ne", "ol", "pe", "ra",
+             "si", "to", "ul", "va", "wi", "xe", "yo", "za"]
+
+
+def name(rnd: random.Random) -> str:
+    return "".join(rnd.choices(SYLLABLES, k=rnd.randint(2, 4))).capitalize()
+
+
+async def seed(session_maker, rows: int, rnd: random.Random) -> User:
+    async with session_maker() as session:
+        user = User(username="bench", email="bench@example.com", password="bench", confirmed=True)
+        session.add(user)
+        await session.commit()
+        batch = 5000
+        for start in range(0, rows, batch):
+            values = []
+            for _ in range(start, min(start + batch, rows)):
+                first, last = name(rnd), name(rnd)
+                values.append({
+                    "first_name": first,
+                    "last_name": last,
+                    "email": f"{first}.{last}@example.com".lower(),
+                    "phone_number": f"380{rnd.randint(0, 999999999):09d}",
+                    "born_date": "1990-01-01",
+                    "user_id": user.id,
+                })
+            await session.execute(insert(Contact), values)
+        await session.commit()
+        return user
+
+
+async def main(rows: int, queries: int, limit: int, db_url: str):
+    rnd = random.Random(42)
+    engine = create_async_engine(db_url)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(Base.metadata.create_all)
+    session_maker = async_sessionmaker(bind=engine, expire_on_commit=False)
+    user = await seed(session_maker, rows, rnd)
+
+    timings = []
+    async with session_maker() as session:
+        for _ in range(queries):
+            term = name(rnd)[:rnd.randint(3, 6)]
+            start = perf_counter()
+            await repository_contacts.search_contacts(term, limit, session, user)
+            timings.append((perf_counter() - start) * 1000)
+    await engine.dispose()
+
+    quantiles = statistics.quantiles(timings, n=100)
+    print(f"rows={rows} queries={queries} p50={quantiles[49]:.2f}ms p95={quantiles[94]:.2f}ms p99={quantiles[98]:.2f}ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--limit", type=int, default=10)
+    parser.add_argument("--db-url", default="sqlite+aiosqlite:///./bench.db")
+    args = parser.parse_args()
+    asyncio.run(main(args.rows, args.queries, args.limit, args.db_url))
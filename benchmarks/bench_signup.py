@@ -0,0 +1,75 @@
+"""
+Time the signup path (password hash + user INSERT) before and after moving the Gravatar lookup out of it.
+
+"before" rebuilds the old repository.users.create_user, which derived the Gravatar URL inline,
+"after" is the current create_user; the Gravatar URL is now resolved when a user is first serialized.
+
+    python -m benchmarks.bench_signup [--users 200] [--db-url sqlite+aiosqlite:///./bench.db]
+"""
+import argparse
+import asyncio
+import statistics
+from time import perf_counter
+
+from libgravatar import Gravatar
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+
+from src.entity.models import Base, User
+from src.repository import users as repository_users
+from src.schemas.user import UserSchema
+from src.services.auth import auth_service
+
+
+async def create_user_inline_gravatar(body: UserSchema, db):
+    avatar = None
+    try:
+        avatar = Gravatar(body.email).get_image()
+    except Exception as err:
+        print(err)
+    new_user = User(**body.model_dump(), avatar=avatar)
+    db.add(new_user)
+    await db.commit()
+    await db.refresh(new_user)
+    return new_user
+
+
+async def signups(session_maker, create_user, users: int, prefix: str) -> list[float]:
+    timings = []
+    async with session_maker() as session:
+        for i in range(users):
+            body = UserSchema(username=f"bench{i}", email=f"{prefix}{i}@example.com", password="secret1")
+            start = perf_counter()
+            body.password = await auth_service.get_password_hash(body.password)
+            await create_user(body, session)
+            timings.append((perf_counter() - start) * 1000)
+    return timings
+
+
+def report(name: str, timings: list[float]) -> None:
+    timings = sorted(timings)
+    p95 = timings[int(len(timings) * 0.95) - 1]
+    print(f"{name:>8} {statistics.median(timings):>10.2f} {p95:>10.2f} {statistics.mean(timings):>10.2f}")
+
+
+async def main(users: int, db_url: str):
+    engine = create_async_engine(db_url)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(Base.metadata.create_all)
+    session_maker = async_sessionmaker(bind=engine, expire_on_commit=False)
+
+    before = await signups(session_maker, create_user_inline_gravatar, users, "before")
+    after = await signups(session_maker, repository_users.create_user, users, "after")
+    print(f"{'':>8} {'p50 ms':>10} {'p95 ms':>10} {'mean ms':>10}")
+    report("before", before)
+    report("after", after)
+    auth_service.pwd_executor.shutdown()
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--db-url", default="sqlite+aiosqlite:///./bench.db")
+    args = parser.parse_args()
+    asyncio.run(main(args.users, args.db_url))
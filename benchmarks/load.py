@@ -0,0 +1,303 @@
+"""
+Load generator driving the whole app, in process through httpx's ASGI transport or over HTTP
+against a running server (e.g. uvicorn main:app --workers 4), with p50/p95/p99 latency and throughput per route.
+
+Scenarios run --concurrency closed-loop clients for --duration seconds:
+    signup   fresh accounts signing up (password hash, outbox insert, user insert)
+    login    seeded users logging in (password verify, token issue, Redis session create)
+    mixed    seeded users listing, paginating through, reading, creating and updating their contacts
+
+    python -m benchmarks.load mixed [--users 200] [--contacts 100] [--concurrency 20] [--duration 30]
+    python -m benchmarks.load login --url http://localhost:8000 --db-url postgresql+asyncpg://...
+
+A trace is replayed open loop: each request is sent at its recorded time, scaled by --speed or spaced evenly
+by --rate, whether or not earlier ones have returned, and latency counts from the scheduled time so
+a backed-up server shows up in the percentiles. Traces are JSON lines such as
+    {"t": 0.125, "method": "GET", "path": "/api/contacts/?limit=20", "user": 3}
+    {"t": 0.250, "method": "POST", "path": "/api/contacts/", "user": 3, "json": {...}}
+where t is seconds from the start, user picks a seeded user whose token is sent, and json or form
+is the body. --save-trace writes the requests of a scenario run in this format.
+
+    python -m benchmarks.load mixed --duration 10 --save-trace mixed.jsonl
+    python -m benchmarks.load replay --trace mixed.jsonl --speed 2
+
+Users are seeded straight into --db-url; with --url this has to be the server's database. In process the
+database is recreated, the Redis backed caches are switched off and rate limits are disabled unless
+--rate-limits is given. Logins need Redis for their sessions: without it the login scenario stops at once,
+and the others run with access tokens issued in process. Against a server, its own configuration applies and
+every seeded user has to log in.
+"""
+import argparse
+import asyncio
+import json
+import random
+import re
+from collections import defaultdict
+from time import perf_counter
+from uuid import uuid4
+
+import httpx
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+
+from src.entity.models import Base, Contact, User
+from src.services.auth import auth_service
+
+PASSWORD = "loadtest"
+NUMBER = re.compile(r"/\d+(?=/|$)")
+
+
+def percentile(values: list[float], q: float) -> float:
+    """Nearest-rank percentile of sorted values."""
+    return values[min(len(values) - 1, max(0, round(q / 100 * len(values)) - 1))]
+
+
+def route_of(method: str, path: str) -> str:
+    return f"{method} {NUMBER.sub('/{id}', path.split('?', 1)[0])}"
+
+
+class Recorder:
+    def __init__(self, trace_path: str | None = None):
+        self.latencies: dict[str, list[float]] = defaultdict(list)
+        self.errors: dict[str, int] = defaultdict(int)
+        self.trace = [] if trace_path else None
+        self.trace_path = trace_path
+        self.started = perf_counter()
+
+    def record(self, route: str, status_code: int | None, latency: float) -> None:
+        self.latencies[route].append(latency)
+        if status_code is None or status_code >= 400:
+            self.errors[route] += 1
+
+    def report(self, elapsed: float) -> None:
+        print(f"{'route':<34} {'requests':>8} {'errors':>6} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+        total = 0
+        for route, latencies in sorted(self.latencies.items()):
+            latencies.sort()
+            total += len(latencies)
+            print(f"{route:<34} {len(latencies):>8} {self.errors[route]:>6} {len(latencies) / elapsed:>8.1f} "
+                  f"{percentile(latencies, 50) * 1000:>8.1f} {percentile(latencies, 95) * 1000:>8.1f} "
+                  f"{percentile(latencies, 99) * 1000:>8.1f}")
+        print(f"{total} requests in {elapsed:.1f}s, {total / elapsed:.1f} req/s, "
+              f"{sum(self.errors.values())} errors")
+        if self.trace is not None:
+            with open(self.trace_path, "w") as file:
+                file.writelines(json.dumps(entry) + "\n" for entry in self.trace)
+            print(f"trace of {len(self.trace)} requests saved to {self.trace_path}")
+
+
+class VirtualUser:
+    """A seeded account with its token and the contact ids it has seen."""
+
+    def __init__(self, index: int, email: str):
+        self.index = index
+        self.email = email
+        self.token = None
+        self.contact_ids: list[int] = []
+
+
+class Load:
+    def __init__(self, client: httpx.AsyncClient, recorder: Recorder, users: list[VirtualUser], rnd: random.Random):
+        self.client = client
+        self.recorder = recorder
+        self.users = users
+        self.rnd = rnd
+
+    async def request(self, method: str, path: str, user: VirtualUser | None = None, scheduled: float | None = None,
+                      **kwargs) -> httpx.Response | None:
+        headers = {"Authorization": f"Bearer {user.token}"} if user is not None and user.token else {}
+        if self.recorder.trace is not None:
+            entry = {"t": round(perf_counter() - self.recorder.started, 6), "method": method, "path": path}
+            if user is not None:
+                entry["user"] = user.index
+            if "json" in kwargs:
+                entry["json"] = kwargs["json"]
+            if "data" in kwargs:
+                entry["form"] = kwargs["data"]
+            self.recorder.trace.append(entry)
+        start = perf_counter() if scheduled is None else scheduled
+        try:
+            response = await self.client.request(method, path, headers=headers, **kwargs)
+        except httpx.HTTPError:
+            response = None
+        status_code = response.status_code if response is not None else None
+        self.recorder.record(route_of(method, path), status_code, perf_counter() - start)
+        return response
+
+    async def login(self, user: VirtualUser) -> None:
+        response = await self.request("POST", "/api/auth/login", data={"username": user.email, "password": PASSWORD})
+        if response is not None and response.status_code == 200:
+            user.token = response.json()["access_token"]
+
+    async def signup(self) -> None:
+        name = uuid4().hex[:12]
+        await self.request("POST", "/api/auth/signup",
+                           json={"username": name, "email": f"{name}@example.com", "password": PASSWORD})
+
+    async def mixed(self) -> None:
+        user = self.rnd.choice(self.users)
+        step = self.rnd.random()
+        if step < 0.45:
+            response = await self.request("GET", "/api/contacts/?limit=20", user)
+            if response is not None and response.status_code == 200:
+                user.contact_ids = [contact["id"] for contact in response.json()]
+        elif step < 0.6:
+            # page through up to three pages with the cursor
+            path = "/api/contacts/?limit=20"
+            for _ in range(3):
+                response = await self.request("GET", path, user)
+                cursor = response is not None and response.headers.get("X-Next-Cursor")
+                if not cursor:
+                    break
+                path = f"/api/contacts/?limit=20&cursor={cursor}"
+        elif step < 0.75 and user.contact_ids:
+            await self.request("GET", f"/api/contacts/{self.rnd.choice(user.contact_ids)}", user)
+        elif step < 0.9:
+            response = await self.request("POST", "/api/contacts/", user, json=self.contact_body())
+            if response is not None and response.status_code == 201:
+                user.contact_ids.append(response.json()["id"])
+        elif user.contact_ids:
+            await self.request("PUT", f"/api/contacts/{self.rnd.choice(user.contact_ids)}", user,
+                               json={**self.contact_body(), "completed": self.rnd.random() < 0.5})
+        else:
+            await self.request("GET", "/api/contacts/?limit=20", user)
+
+    def contact_body(self) -> dict:
+        n = self.rnd.randrange(10 ** 6)
+        return {"first_name": f"First{n}", "last_name": f"Last{n}", "email": f"contact{n}@example.com",
+                "phone_number": f"380{n:09d}", "born_date": "1990-01-01"}
+
+    async def run_scenario(self, scenario: str, concurrency: int, duration: float) -> None:
+        action = {"signup": self.signup, "mixed": self.mixed,
+                  "login": lambda: self.login(self.rnd.choice(self.users))}[scenario]
+        deadline = perf_counter() + duration
+
+        async def client_loop():
+            while perf_counter() < deadline:
+                await action()
+
+        await asyncio.gather(*[client_loop() for _ in range(concurrency)])
+
+    async def replay(self, trace: list[dict], speed: float, rate: float | None) -> None:
+        start = perf_counter()
+        tasks = []
+        for i, entry in enumerate(trace):
+            offset = i / rate if rate else (entry["t"] - trace[0]["t"]) / speed
+            delay = start + offset - perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            user = self.users[entry["user"] % len(self.users)] if "user" in entry else None
+            body = {"json": entry["json"]} if "json" in entry else {}
+            if "form" in entry:
+                body["data"] = entry["form"]
+            tasks.append(asyncio.create_task(
+                self.request(entry["method"], entry["path"], user, scheduled=start + offset, **body)
+            ))
+        await asyncio.gather(*tasks)
+
+
+async def seed(db_url: str, users: int, contacts: int, recreate: bool) -> list[VirtualUser]:
+    engine = create_async_engine(db_url)
+    async with engine.begin() as conn:
+        if recreate:
+            await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(Base.metadata.create_all)
+    password = await auth_service.get_password_hash(PASSWORD)
+    prefix = f"load-{uuid4().hex[:8]}"
+    virtual_users = [VirtualUser(i, f"{prefix}-{i}@example.com") for i in range(users)]
+    session_maker = async_sessionmaker(bind=engine, expire_on_commit=False)
+    async with session_maker() as session:
+        for user in virtual_users:
+            row = User(username=user.email.split("@")[0], email=user.email, password=password, confirmed=True)
+            session.add(row)
+            await session.flush()
+            if contacts:
+                await session.execute(insert(Contact), [
+                    {"first_name": f"First{i}", "last_name": f"Last{i}", "email": f"contact{i}@example.com",
+                     "phone_number": f"380{i:09d}", "born_date": "1990-01-01", "user_id": row.id}
+                    for i in range(contacts)
+                ])
+        await session.commit()
+    await engine.dispose()
+    return virtual_users
+
+
+def in_process_app(db_url: str, rate_limits: bool):
+    from main import app
+    from src.conf.config import config
+    from src.database.db import get_db
+    from src.services.cache import user_cache, contacts_cache
+
+    engine = create_async_engine(db_url)
+    session_maker = async_sessionmaker(bind=engine, expire_on_commit=False)
+
+    async def override_get_db():
+        async with session_maker() as session:
+            yield session
+
+    app.dependency_overrides[get_db] = override_get_db
+    config.RATE_LIMIT_ENABLED = rate_limits
+    user_cache._redis_down_until = float("inf")
+    contacts_cache._redis_down_until = float("inf")
+    return app
+
+
+async def main(args):
+    rnd = random.Random(args.seed)
+    users = await seed(args.db_url, args.users, args.contacts, recreate=args.url is None)
+    if args.url:
+        transport, base_url = httpx.AsyncHTTPTransport(), args.url
+    else:
+        transport, base_url = httpx.ASGITransport(app=in_process_app(args.db_url, args.rate_limits)), "http://load"
+    limits = httpx.Limits(max_connections=None, max_keepalive_connections=None)
+    async with httpx.AsyncClient(transport=transport, base_url=base_url, limits=limits, timeout=args.timeout) as client:
+        load = Load(client, Recorder(), users, rnd)
+        # a few at a time, so the logins don't overflow the password hashing queue
+        logins = asyncio.Semaphore(8)
+
+        async def login(user):
+            async with logins:
+                await load.login(user)
+
+        await asyncio.gather(*[login(user) for user in users])
+        missing = [user for user in users if user.token is None]
+        if missing and (args.url or args.scenario == "login"):
+            raise SystemExit(f"{len(missing)} of {len(users)} seeded users could not log in; "
+                             f"logins need Redis for their sessions")
+        if missing:
+            # the other scenarios only need valid access tokens, which the app in process accepts without Redis
+            for user in missing:
+                user.token = await auth_service.create_access_token(data={"sub": user.email})
+            print(f"{len(missing)} of {len(users)} seeded users could not log in, Redis is likely down; "
+                  f"using access tokens issued in process")
+
+        load.recorder = Recorder(args.save_trace)
+        if args.scenario == "replay":
+            with open(args.trace) as file:
+                trace = [json.loads(line) for line in file if line.strip()]
+            await load.replay(trace, args.speed, args.rate)
+        else:
+            await load.run_scenario(args.scenario, args.concurrency, args.duration)
+        load.recorder.report(perf_counter() - load.recorder.started)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("scenario", choices=["signup", "login", "mixed", "replay"])
+    parser.add_argument("--url", help="base URL of a running server; the app runs in process without it")
+    parser.add_argument("--db-url", default="sqlite+aiosqlite:///./load.db")
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--contacts", type=int, default=50, help="contacts seeded per user")
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--duration", type=float, default=30)
+    parser.add_argument("--trace", help="JSON lines trace to replay")
+    parser.add_argument("--speed", type=float, default=1.0, help="replay speed, 2 = twice as fast as recorded")
+    parser.add_argument("--rate", type=float, help="replay at this many requests per second instead")
+    parser.add_argument("--save-trace", help="write the requests sent to this file")
+    parser.add_argument("--rate-limits", action="store_true", help="keep rate limits on in process")
+    parser.add_argument("--timeout", type=float, default=30)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+    if args.scenario == "replay" and not args.trace:
+        parser.error("replay needs --trace")
+    asyncio.run(main(args))
@@ -1,48 +1,68 @@
-from ipaddress import ip_address
-from typing import Callable
-import re
-
-import redis.asyncio as redis
-from fastapi import FastAPI, Depends, HTTPException, Request, status
-from fastapi.responses import JSONResponse, HTMLResponse
-from fastapi.templating import Jinja2Templates
+from src.services import startup  # first, so the app import is timed from here
+
+from contextlib import asynccontextmanager
+from functools import cache
+
+from fastapi import FastAPI, Depends, HTTPException, Request
+from fastapi.responses import HTMLResponse, JSONResponse, PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
-from fastapi_limiter import FastAPILimiter
 from sqlalchemy import text
 from sqlalchemy.ext.asyncio import AsyncSession
-from src.database.db import get_db
-from src.routes import contacts, auth, users
+from src.conf import messages
 from src.conf.config import config
-
-app = FastAPI()
-banned_ips = [ip_address("192.168.1.1"), ip_address("192.168.1.2")]
-user_agent_ban_list = []
+from src.database.db import get_db, sessionmanager
+from src.routes import contacts, auth, users, internal
+from src.middleware.bans import BanMiddleware
+from src.middleware.body_limit import BodyLimitMiddleware
+from src.middleware.metrics import MetricsMiddleware
+from src.middleware.sql_profiler import SqlProfilerMiddleware
+from src.services.auth import auth_service
+from src.services.avatars import avatar_pipeline, MULTIPART_OVERHEAD
+from src.services.bans import ban_service
+from src.services.health import health_monitor
+from src.services.metrics import registry
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    ban_service.start()
+    health_monitor.start()
+    startup.mark("startup")
+    print(f"app imported in {startup.phases['import']} ms, started in {startup.phases['startup']} ms")
+    yield
+    await ban_service.stop()
+    await health_monitor.stop()
+    await sessionmanager.close()
+    auth_service.pwd_executor.shutdown()
+    avatar_pipeline.executor.shutdown()
+
+
+app = FastAPI(lifespan=lifespan)
 origins = ["*"]
 
+app.add_middleware(BodyLimitMiddleware, limits={
+    "/api/users/avatar": (config.AVATAR_MAX_BYTES + MULTIPART_OVERHEAD, messages.AVATAR_TOO_LARGE),
+})
 app.add_middleware(
     CORSMiddleware,
     allow_origins=origins,
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    # readable by browser clients on other origins: the pagination cursor and the cache validator
+    expose_headers=["X-Next-Cursor", "ETag"],
 )
-
-
-@app.middleware("http")
-async def user_agent_ban_middleware(request: Request, call_next: Callable):
-    user_agent = request.headers.get("user-agent")
-    for ban_pattern in user_agent_ban_list:
-        if re.search(ban_pattern, user_agent):
-            return JSONResponse(status_code=status.HTTP_403_FORBIDDEN, content={"detail": "You are banned"})
-    response = await call_next(request)
-    return response
+app.add_middleware(SqlProfilerMiddleware)
+app.add_middleware(BanMiddleware)
+app.add_middleware(MetricsMiddleware)
 
 
 app.mount("/static", StaticFiles(directory='src/static'), name='static')
 app.include_router(auth.router, prefix="/api")
 app.include_router(users.router, prefix="/api")
 app.include_router(contacts.router, prefix="/api")
+app.include_router(internal.router, prefix="/api")
 
 
 @app.get("/")
@@ -50,18 +70,17 @@ def index():
     return {"message": "Contacts Application"}
 
 
-@app.on_event("startup")
-async def startup():
-    r = await redis.Redis(host=config.REDIS_DOMAIN, port=config.REDIS_PORT, db=0, password=config.REDIS_PASSWORD)
-    await FastAPILimiter.init(r)
-
+@cache
+def templates():
+    # Jinja2 is loaded on the first page render, not at boot
+    from fastapi.templating import Jinja2Templates
 
-templates = Jinja2Templates(directory='src/templates')
+    return Jinja2Templates(directory='src/templates')
 
 
 @app.get("/", response_class=HTMLResponse)
 def index(request: Request):
-    return templates.TemplateResponse('index.html', {"request": request})
+    return templates().TemplateResponse('index.html', {"request": request})
 
 
 @app.get("/api/healthchecker")
@@ -75,3 +94,25 @@ async def healthchecker(db: AsyncSession = Depends(get_db)):
     except Exception as e:
         print(e)
         raise HTTPException(status_code=500, detail="Error connecting to the database")
+
+
+@app.get("/livez", include_in_schema=False)
+async def livez():
+    # the process answers, nothing else is checked
+    return {"status": "ok"}
+
+
+@app.get("/readyz", include_in_schema=False)
+async def readyz():
+    # served from the health monitor's last results, without touching the database or Redis
+    ready, report = health_monitor.status()
+    return JSONResponse(report, status_code=200 if ready else 503)
+
+
+@app.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+async def metrics():
+    # async, so rendering runs on the event loop thread that records the metrics
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
+
+
+startup.mark("import")
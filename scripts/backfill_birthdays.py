@@ -0,0 +1,68 @@
+"""
+One-off backfill of Contact.birthday and Contact.birthday_key from the free-form born_date strings.
+
+Adds the columns and their index when the table predates them, then walks the table in id order
+in batches, committing each one. Rows whose born_date cannot be parsed are left NULL and counted.
+Safe to re-run: only rows without a birthday_key are read.
+
+    python -m scripts.backfill_birthdays [--batch-size 1000]
+"""
+import argparse
+import asyncio
+
+from sqlalchemy import inspect, select, text, update
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+
+from src.conf.config import config
+from src.entity.models import Contact, parse_born_date, birthday_key
+
+
+def add_missing_columns(conn):
+    existing = {c["name"] for c in inspect(conn).get_columns(Contact.__tablename__)}
+    for name in ("birthday", "birthday_key"):
+        if name not in existing:
+            column_type = Contact.__table__.c[name].type.compile(conn.dialect)
+            conn.execute(text(f"ALTER TABLE {Contact.__tablename__} ADD COLUMN {name} {column_type}"))
+    for index in Contact.__table__.indexes:
+        if index.name == "ix_contacts_user_id_birthday_key":
+            index.create(conn, checkfirst=True)
+
+
+async def main(batch_size: int):
+    engine = create_async_engine(config.DB_URL)
+    async with engine.begin() as conn:
+        await conn.run_sync(add_missing_columns)
+    session_maker = async_sessionmaker(bind=engine)
+    last_id, updated, unparsed = 0, 0, 0
+    async with session_maker() as session:
+        while True:
+            stmt = (
+                select(Contact.id, Contact.born_date)
+                .filter(Contact.id > last_id, Contact.birthday_key.is_(None))
+                .order_by(Contact.id)
+                .limit(batch_size)
+            )
+            rows = (await session.execute(stmt)).all()
+            if not rows:
+                break
+            last_id = rows[-1].id
+            values = []
+            for row in rows:
+                birthday = parse_born_date(row.born_date)
+                if birthday is None:
+                    unparsed += 1
+                    continue
+                values.append({"id": row.id, "birthday": birthday, "birthday_key": birthday_key(birthday)})
+            if values:
+                await session.execute(update(Contact), values)
+                await session.commit()
+                updated += len(values)
+            print(f"up to id {last_id}: {updated} updated, {unparsed} unparsed")
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--batch-size", type=int, default=1000)
+    args = parser.parse_args()
+    asyncio.run(main(args.batch_size))
@@ -0,0 +1,41 @@
+"""
+Sets up contact search on a database whose contacts table was created before search existed.
+
+create_all only adds the search DDL when it creates the table, so existing databases miss it and
+search_contacts falls back to scanning every contact (Postgres) or finds nothing (SQLite FTS5).
+On Postgres this enables pg_trgm and builds the trigram index; building it blocks writes to contacts
+until it is done. On SQLite it creates the contacts_fts table and its sync triggers, then rebuilds
+contacts_fts from the contacts table. Safe to re-run.
+
+    python -m scripts.setup_search
+"""
+import argparse
+import asyncio
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from src.conf.config import config
+from src.entity.models import POSTGRES_SEARCH_DDL, SQLITE_SEARCH_DDL
+
+
+async def main():
+    engine = create_async_engine(config.DB_URL)
+    async with engine.begin() as conn:
+        dialect = conn.dialect.name
+        if dialect == "postgresql":
+            statements = POSTGRES_SEARCH_DDL
+        elif dialect == "sqlite":
+            # the triggers only keep contacts_fts in sync from now on, the rebuild indexes the existing rows
+            statements = [*SQLITE_SEARCH_DDL, "INSERT INTO contacts_fts(contacts_fts) VALUES ('rebuild')"]
+        else:
+            raise SystemExit(f"contact search has no setup for {dialect}")
+        for statement in statements:
+            await conn.execute(text(statement))
+    await engine.dispose()
+    print(f"contact search set up on {dialect}: {len(statements)} statements applied")
+
+
+if __name__ == "__main__":
+    argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter).parse_args()
+    asyncio.run(main())
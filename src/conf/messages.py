@@ -2,3 +2,16 @@ ACCOUNT_EXIST = "Account already exists!"
 EMAIL_NOT_CONFIRMED = "Email not confirmed!"
 INVALID_PASSWORD = "Invalid password!"
 INVALID_EMAIL = "Invalid email!"
+INVALID_CURSOR = "Invalid cursor!"
+SERVER_BUSY = "Server is busy, try again later!"
+UNKNOWN_IMPORT_FORMAT = "Unknown import format, use csv or ndjson!"
+INVALID_FIELDS = "Invalid fields!"
+AVATAR_INVALID = "Avatar is not a valid image!"
+AVATAR_TOO_LARGE = "Avatar is too large!"
+AVATAR_TYPE_NOT_ALLOWED = "Avatar must be a JPEG, PNG, WebP or GIF image!"
+AVATAR_UPLOAD_FAILED = "Avatar upload failed, try again later!"
+TOO_MANY_REQUESTS = "Too many requests, try again later!"
+INVALID_REFRESH_TOKEN = "Invalid refresh token!"
+REFRESH_TOKEN_REUSED = "Refresh token was already used, the session has been revoked!"
+SESSION_NOT_FOUND = "Session not found!"
+SESSIONS_UNAVAILABLE = "Sessions are unavailable, try again later!"
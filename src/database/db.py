@@ -1,20 +1,146 @@
 import contextlib
+from time import perf_counter
 
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
 from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 
 from src.conf.config import config
+from src.services.metrics import db_statement_duration
+
+
+class PoolMetrics:
+    """Checkout wait and connection hold times of the application pool, aggregated in process."""
+
+    def __init__(self):
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+        self.checkins = 0
+        self.hold_total = 0.0
+        self.hold_max = 0.0
+
+    def observe_wait(self, seconds: float) -> None:
+        self.checkouts += 1
+        self.wait_total += seconds
+        self.wait_max = max(self.wait_max, seconds)
+
+    def on_checkout(self, dbapi_connection, connection_record, connection_proxy) -> None:
+        connection_record.info["checked_out_at"] = perf_counter()
+
+    def on_checkin(self, dbapi_connection, connection_record) -> None:
+        checked_out_at = connection_record.info.pop("checked_out_at", None)
+        if checked_out_at is None:
+            return
+        held = perf_counter() - checked_out_at
+        self.checkins += 1
+        self.hold_total += held
+        self.hold_max = max(self.hold_max, held)
+
+    def stats(self) -> dict:
+        return {
+            "checkouts": self.checkouts,
+            "timeouts": self.timeouts,
+            "wait_avg_ms": self.wait_total / self.checkouts * 1000 if self.checkouts else 0.0,
+            "wait_max_ms": self.wait_max * 1000,
+            "hold_avg_ms": self.hold_total / self.checkins * 1000 if self.checkins else 0.0,
+            "hold_max_ms": self.hold_max * 1000,
+        }
+
+
+pool_metrics = PoolMetrics()
+
+
+class InstrumentedPool(AsyncAdaptedQueuePool):
+    def _do_get(self):
+        start = perf_counter()
+        try:
+            return super()._do_get()
+        except PoolTimeoutError:
+            pool_metrics.timeouts += 1
+            raise
+        finally:
+            pool_metrics.observe_wait(perf_counter() - start)
+
+
+def before_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    context._statement_started_at = perf_counter()
+
+
+def after_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    operation = statement.lstrip().split(None, 1)[0].upper() if statement.strip() else "OTHER"
+    if operation not in ("SELECT", "INSERT", "UPDATE", "DELETE", "WITH"):
+        operation = "OTHER"
+    db_statement_duration.observe(perf_counter() - context._statement_started_at, operation)
+
+
+def engine_options(url: str) -> dict:
+    url = make_url(url)
+    if url.get_backend_name() == "sqlite":
+        return {}
+    options = dict(
+        poolclass=InstrumentedPool,
+        pool_size=config.DB_POOL_SIZE,
+        max_overflow=config.DB_MAX_OVERFLOW,
+        pool_timeout=config.DB_POOL_TIMEOUT,
+        pool_recycle=config.DB_POOL_RECYCLE,
+        pool_pre_ping=config.DB_POOL_PRE_PING,
+    )
+    if url.get_driver_name() == "asyncpg":
+        options["connect_args"] = {"prepared_statement_cache_size": config.DB_STATEMENT_CACHE_SIZE}
+    return options
 
 
 class DatabaseSessionManager:
+    """
+    The engine is created on first use rather than at import, so importing the app loads no database driver
+    and processes that never query (e.g. a worker failing its boot checks) never build a pool.
+    """
+
     def __init__(self, url: str):
-        self._engine: AsyncEngine | None = create_async_engine(url)
-        self._session_maker: async_sessionmaker = async_sessionmaker(autoflush=False, autocommit=False,
-                                                                     bind=self._engine)
+        self.url = url
+        self._engine: AsyncEngine | None = None
+        self._session_maker: async_sessionmaker | None = None
+
+    def _connect(self) -> None:
+        self._engine = create_async_engine(self.url, **engine_options(self.url))
+        self._session_maker = async_sessionmaker(autoflush=False, autocommit=False, bind=self._engine)
+        event.listen(self._engine.sync_engine, "checkout", pool_metrics.on_checkout)
+        event.listen(self._engine.sync_engine, "checkin", pool_metrics.on_checkin)
+        event.listen(self._engine.sync_engine, "before_cursor_execute", before_cursor_execute)
+        event.listen(self._engine.sync_engine, "after_cursor_execute", after_cursor_execute)
+
+    @property
+    def engine(self) -> AsyncEngine:
+        if self._engine is None:
+            self._connect()
+        return self._engine
+
+    async def close(self) -> None:
+        if self._engine is not None:
+            await self._engine.dispose()
+            self._engine = None
+            self._session_maker = None
+
+    def pool_stats(self) -> dict:
+        pool = self.engine.pool
+        stats = {"pool": pool.__class__.__name__}
+        if isinstance(pool, AsyncAdaptedQueuePool):
+            stats.update(
+                size=pool.size(),
+                checked_out=pool.checkedout(),
+                checked_in=pool.checkedin(),
+                overflow=pool.overflow(),
+            )
+        return {**stats, **pool_metrics.stats()}
 
     @contextlib.asynccontextmanager
     async def session(self):
         if self._session_maker is None:
-            raise Exception("Session not initialized")
+            self._connect()
         session = self._session_maker()
         try:
             yield session
@@ -1,9 +1,25 @@
 import enum
-from datetime import date
-from sqlalchemy.orm import Mapped, mapped_column, relationship
-from sqlalchemy import String, Integer, ForeignKey, DateTime, func, Enum, Boolean
+from datetime import date, datetime
+from sqlalchemy.orm import Mapped, mapped_column, relationship, validates
+from sqlalchemy import String, Integer, ForeignKey, DateTime, Date, func, Enum, Boolean, Index, DDL, event, JSON
 from sqlalchemy.orm import DeclarativeBase
 
+BORN_DATE_FORMATS = ("%Y-%m-%d", "%d.%m.%Y", "%d/%m/%Y", "%d-%m-%Y", "%Y/%m/%d", "%Y.%m.%d")
+
+
+def parse_born_date(value: str | None) -> date | None:
+    for fmt in BORN_DATE_FORMATS:
+        try:
+            return datetime.strptime((value or "").strip(), fmt).date()
+        except ValueError:
+            continue
+    return None
+
+
+def birthday_key(value: date | None) -> int | None:
+    # month * 100 + day, so a range of keys is a range of calendar days in any year
+    return value.month * 100 + value.day if value else None
+
 
 class Base(DeclarativeBase):
     pass
@@ -17,10 +33,61 @@ class Contact(Base):
     email: Mapped[str] = mapped_column(String(50))
     phone_number: Mapped[str] = mapped_column(String(12))
     born_date: Mapped[str] = mapped_column(String(20))
+    birthday: Mapped[date] = mapped_column(Date, nullable=True)
+    birthday_key: Mapped[int] = mapped_column(Integer, nullable=True)
     completed: Mapped[bool] = mapped_column(default=False)
     user_id: Mapped[int] = mapped_column(Integer, ForeignKey('users.id'), nullable=True)
     user: Mapped['User'] = relationship('User', backref='todos', lazy='joined')
 
+    __table_args__ = (
+        Index('ix_contacts_user_id_id', 'user_id', 'id'),
+        Index('ix_contacts_user_id_birthday_key', 'user_id', 'birthday_key'),
+    )
+
+    @validates('born_date')
+    def validate_born_date(self, key, value):
+        self.birthday = parse_born_date(value)
+        self.birthday_key = birthday_key(self.birthday)
+        return value
+
+
+# Contact search: a trigram GIN index over one expression on Postgres,
+# an external-content FTS5 table with the trigram tokenizer kept in sync by triggers on SQLite.
+CONTACT_SEARCH_TEXT = (
+    "lower(contacts.first_name || ' ' || contacts.last_name || ' ' || contacts.email || ' ' || contacts.phone_number)"
+)
+CONTACT_SEARCH_FIELDS = "first_name, last_name, email, phone_number"
+
+# kept as lists so scripts/setup_search.py can apply them to tables created before search existed
+POSTGRES_SEARCH_DDL = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    f"CREATE INDEX IF NOT EXISTS ix_contacts_search_trgm ON contacts USING gin (({CONTACT_SEARCH_TEXT}) gin_trgm_ops)",
+]
+SQLITE_SEARCH_DDL = [
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS contacts_fts USING fts5({CONTACT_SEARCH_FIELDS}, "
+    "content='contacts', content_rowid='id', tokenize='trigram')",
+    f"CREATE TRIGGER IF NOT EXISTS contacts_fts_ai AFTER INSERT ON contacts BEGIN "
+    f"INSERT INTO contacts_fts(rowid, {CONTACT_SEARCH_FIELDS}) "
+    "VALUES (new.id, new.first_name, new.last_name, new.email, new.phone_number); END",
+    f"CREATE TRIGGER IF NOT EXISTS contacts_fts_ad AFTER DELETE ON contacts BEGIN "
+    f"INSERT INTO contacts_fts(contacts_fts, rowid, {CONTACT_SEARCH_FIELDS}) "
+    "VALUES ('delete', old.id, old.first_name, old.last_name, old.email, old.phone_number); END",
+    f"CREATE TRIGGER IF NOT EXISTS contacts_fts_au AFTER UPDATE ON contacts BEGIN "
+    f"INSERT INTO contacts_fts(contacts_fts, rowid, {CONTACT_SEARCH_FIELDS}) "
+    "VALUES ('delete', old.id, old.first_name, old.last_name, old.email, old.phone_number); "
+    f"INSERT INTO contacts_fts(rowid, {CONTACT_SEARCH_FIELDS}) "
+    "VALUES (new.id, new.first_name, new.last_name, new.email, new.phone_number); END",
+]
+
+event.listen(Contact.__table__, 'before_create', DDL(POSTGRES_SEARCH_DDL[0]).execute_if(dialect='postgresql'))
+for statement in POSTGRES_SEARCH_DDL[1:]:
+    event.listen(Contact.__table__, 'after_create', DDL(statement).execute_if(dialect='postgresql'))
+for statement in SQLITE_SEARCH_DDL:
+    event.listen(Contact.__table__, 'after_create', DDL(statement).execute_if(dialect='sqlite'))
+event.listen(Contact.__table__, 'after_drop', DDL(
+    "DROP TABLE IF EXISTS contacts_fts"
+).execute_if(dialect='sqlite'))
+
 
 class Role(enum.Enum):
     admin: str = "admin"
@@ -35,8 +102,26 @@ class User(Base):
     email: Mapped[str] = mapped_column(String(150), nullable=False, unique=True)
     password: Mapped[str] = mapped_column(String(255), nullable=False)
     avatar: Mapped[str] = mapped_column(String(255), nullable=True)
-    refresh_token: Mapped[str] = mapped_column(String(255), nullable=True)
     created_at: Mapped[date] = mapped_column('created_at', DateTime, default=func.now())
     updated_at: Mapped[date] = mapped_column('updated_at', DateTime, default=func.now(), onupdate=func.now())
     role: Mapped[Enum] = mapped_column('role', Enum(Role), default=Role.user, nullable=False)
     confirmed: Mapped[bool] = mapped_column(Boolean, default=False, nullable=True)
+
+
+class EmailOutbox(Base):
+    __tablename__ = 'email_outbox'
+    id: Mapped[int] = mapped_column(primary_key=True)
+    recipient: Mapped[str] = mapped_column(String(150), nullable=False)
+    subject: Mapped[str] = mapped_column(String(255), nullable=False)
+    template: Mapped[str] = mapped_column(String(100), nullable=False)
+    body: Mapped[dict] = mapped_column(JSON, nullable=False)
+    status: Mapped[str] = mapped_column(String(10), default="pending", nullable=False)
+    attempts: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+    last_error: Mapped[str] = mapped_column(String(255), nullable=True)
+    next_attempt_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, nullable=False)
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=func.now())
+    sent_at: Mapped[datetime] = mapped_column(DateTime, nullable=True)
+
+    __table_args__ = (
+        Index('ix_email_outbox_status_next_attempt_at', 'status', 'next_attempt_at'),
+    )
@@ -0,0 +1,29 @@
+from fastapi import status
+from fastapi.responses import JSONResponse
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from src.services.bans import BanService, ban_service
+
+
+class BanMiddleware:
+    """
+    Pure ASGI middleware refusing banned clients with 403.
+
+    The check reads the client address and the User-Agent header straight from the scope, so no Request
+    object, extra task or response stream wrapper is involved, and allowed requests pass through untouched.
+    """
+
+    def __init__(self, app: ASGIApp, service: BanService = ban_service):
+        self.app = app
+        self.service = service
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] == "http":
+            client = scope.get("client")
+            user_agent = next((value.decode("latin-1") for name, value in scope["headers"] if name == b"user-agent"),
+                              None)
+            if self.service.matcher.is_banned(client[0] if client else None, user_agent):
+                response = JSONResponse(status_code=status.HTTP_403_FORBIDDEN, content={"detail": "You are banned"})
+                await response(scope, receive, send)
+                return
+        await self.app(scope, receive, send)
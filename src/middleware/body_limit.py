@@ -0,0 +1,28 @@
+from fastapi import status
+from fastapi.responses import JSONResponse
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+
+class BodyLimitMiddleware:
+    """
+    Pure ASGI middleware refusing requests whose Content-Length is over the limit of their path with 413.
+
+    Starlette spools the whole multipart body before the route runs, so a size check in the route only
+    comes after an oversized upload was received and written to disk. This one answers from the headers,
+    before the body is read. Bodies sent without Content-Length are still checked by the route.
+    """
+
+    def __init__(self, app: ASGIApp, limits: dict[str, tuple[int, str]]):
+        self.app = app
+        self.limits = limits
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] == "http" and scope["path"] in self.limits:
+            max_bytes, detail = self.limits[scope["path"]]
+            length = next((value for name, value in scope["headers"] if name == b"content-length"), b"")
+            if length.isdigit() and int(length) > max_bytes:
+                response = JSONResponse(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                                        content={"detail": detail})
+                await response(scope, receive, send)
+                return
+        await self.app(scope, receive, send)
@@ -0,0 +1,42 @@
+from time import perf_counter
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from src.services.metrics import http_requests, http_request_duration, http_requests_in_flight
+
+
+class MetricsMiddleware:
+    """
+    Pure ASGI middleware recording request count, latency and in-flight requests.
+
+    Requests are labelled by route template (e.g. /api/contacts/{contact_id}), which the router leaves
+    in the scope, so label cardinality stays bounded; requests no route matched share "<unmatched>".
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        method = scope["method"]
+        status_code = 500
+
+        async def send_with_status(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        http_requests_in_flight.inc(method)
+        start = perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            elapsed = perf_counter() - start
+            http_requests_in_flight.dec(method)
+            route = scope.get("route")
+            route = getattr(route, "path", "<unmatched>")
+            http_requests.inc(method, route, status_code)
+            http_request_duration.observe(elapsed, method, route)
@@ -0,0 +1,36 @@
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from src.conf.config import config
+from src.services.sql_profiler import request_profile
+
+
+class SqlProfilerMiddleware:
+    """
+    Pure ASGI middleware profiling the SQL of each request when SQL_PROFILER_ENABLED is set.
+
+    The response carries X-SQL-Queries, X-SQL-Repeated (statement shapes executed more than once)
+    and a Server-Timing entry; requests that look like an N+1 also print the profile report.
+    Statements run after the response has started, e.g. in a streamed body, are reported in the log only.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not config.SQL_PROFILER_ENABLED:
+            await self.app(scope, receive, send)
+            return
+
+        with request_profile() as profile:
+            async def send_with_profile(message: Message) -> None:
+                if message["type"] == "http.response.start":
+                    headers = MutableHeaders(scope=message)
+                    headers["X-SQL-Queries"] = str(profile.count)
+                    headers["X-SQL-Repeated"] = str(len(profile.repeated()))
+                    headers.append("Server-Timing", f'sql;dur={profile.duration * 1000:.2f};desc="{profile.count} queries"')
+                await send(message)
+
+            await self.app(scope, receive, send_with_profile)
+        if profile.repeated() or profile.tables_read():
+            print(f"SQL profile {scope['method']} {scope['path']}: {profile.report()}")
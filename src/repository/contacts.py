@@ -1,19 +1,70 @@
-from sqlalchemy import select
-from sqlalchemy.ext.asyncio import AsyncSession
-from src.entity.models import Contact, User
-from src.schemas.contact import ContactSchema, ContactUpdateSchema
-
+from datetime import date, timedelta
 
-async def get_contacts(limit: int, offset: int, db: AsyncSession, user: User):
-    stmt = select(Contact).filter_by(user=user).offset(offset).limit(limit)
+from sqlalchemy import select, insert, update, delete, or_, func, literal_column, table, column, text
+from sqlalchemy.ext.asyncio import AsyncSession
+from src.entity.models import Contact, User, CONTACT_SEARCH_TEXT, birthday_key
+from src.schemas.contact import ContactSchema, ContactUpdateSchema, ContactBulkSelection
+from src.services.cache import contacts_cache
+
+
+CONTACT_FIELDS = ("id", "first_name", "last_name", "email", "phone_number", "born_date", "birthday", "completed", "user")
+USER_COLUMNS = (User.id, User.username, User.email, User.avatar, User.role)
+
+
+def select_fields(fields: list[str]):
+    """
+    Select only the given CONTACT_FIELDS as plain rows, without hydrating Contact objects.
+    The users join is added only when "user" is asked for; its columns come back as user_<name>.
+    """
+    stmt = select(*[getattr(Contact, name) for name in fields if name != "user"])
+    if "user" in fields:
+        stmt = stmt.add_columns(*[c.label(f"user_{c.key}") for c in USER_COLUMNS])
+        stmt = stmt.outerjoin(User, Contact.user_id == User.id)
+    return stmt
+
+
+async def get_contacts(limit: int, offset: int, db: AsyncSession, user: User, after: int | None = None,
+                       fields: list[str] | None = None):
+    stmt = select(Contact) if fields is None else select_fields(fields)
+    if after is None:
+        stmt = stmt.filter(Contact.user_id == user.id).order_by(Contact.id).offset(offset).limit(limit)
+    else:
+        stmt = stmt.filter(Contact.user_id == user.id, Contact.id > after).order_by(Contact.id).limit(limit)
     contacts = await db.execute(stmt)
-    return contacts.scalars().all()
-
-
-async def get_contact(contact_id: int, db: AsyncSession, user: User):
-    stmt = select(Contact).filter_by(id=contact_id, user=user)
+    return contacts.scalars().all() if fields is None else contacts.mappings().all()
+
+
+EXPORT_COLUMNS = (
+    Contact.id,
+    Contact.first_name,
+    Contact.last_name,
+    Contact.email,
+    Contact.phone_number,
+    Contact.born_date,
+    Contact.completed,
+)
+
+
+async def stream_contacts(db: AsyncSession, user_id: int, batch_size: int):
+    stmt = (
+        select(*EXPORT_COLUMNS)
+        .filter(Contact.user_id == user_id)
+        .order_by(Contact.id)
+        .execution_options(yield_per=batch_size)
+    )
+    result = await db.stream(stmt)
+    async for rows in result.partitions():
+        yield rows
+
+
+async def get_contact(contact_id: int, db: AsyncSession, user: User, fields: list[str] | None = None):
+    if fields is None:
+        stmt = select(Contact).filter_by(id=contact_id, user=user)
+        contact = await db.execute(stmt)
+        return contact.scalar_one_or_none()
+    stmt = select_fields(fields).filter(Contact.id == contact_id, Contact.user_id == user.id)
     contact = await db.execute(stmt)
-    return contact.scalar_one_or_none()
+    return contact.mappings().one_or_none()
 
 
 async def get_contact_by_params(
@@ -35,14 +86,74 @@ async def get_contact_by_params(
     return contact.scalar_one_or_none()
 
 
+async def search_contacts(q: str, limit: int, db: AsyncSession, user: User):
+    term = q.strip().lower()
+    dialect = (await db.connection()).dialect.name
+    stmt = select(Contact).filter(Contact.user_id == user.id).limit(limit)
+    if dialect == "postgresql":
+        search_text = literal_column(CONTACT_SEARCH_TEXT)
+        stmt = stmt.filter(or_(search_text.contains(term, autoescape=True), search_text.op("%>")(term))).order_by(
+            func.word_similarity(term, search_text).desc(), Contact.id
+        )
+    elif dialect == "sqlite" and len(term) >= 3:
+        # the trigram tokenizer only matches terms of at least three characters
+        fts = table("contacts_fts", column("rowid"))
+        stmt = (
+            stmt.join(fts, fts.c.rowid == Contact.id)
+            .filter(text("contacts_fts MATCH :match").bindparams(match='"' + term.replace('"', '""') + '"'))
+            .order_by(text("bm25(contacts_fts)"), Contact.id)
+        )
+    else:
+        stmt = stmt.filter(or_(
+            Contact.first_name.icontains(term, autoescape=True),
+            Contact.last_name.icontains(term, autoescape=True),
+            Contact.email.icontains(term, autoescape=True),
+            Contact.phone_number.contains(term, autoescape=True),
+        )).order_by(Contact.id)
+    contacts = await db.execute(stmt)
+    return contacts.scalars().all()
+
+
+async def get_upcoming_birthdays(days: int, limit: int, db: AsyncSession, user: User, today: date | None = None):
+    today = today or date.today()
+    start = birthday_key(today)
+    end = birthday_key(today + timedelta(days=days))
+    stmt = select(Contact).filter(Contact.user_id == user.id, Contact.birthday_key.is_not(None))
+    if days < 365 and start <= end:
+        stmt = stmt.filter(Contact.birthday_key.between(start, end))
+    elif days < 365:
+        # the window wraps past the end of the year
+        stmt = stmt.filter(or_(Contact.birthday_key >= start, Contact.birthday_key <= end))
+    stmt = stmt.order_by(Contact.birthday_key < start, Contact.birthday_key, Contact.id).limit(limit)
+    contacts = await db.execute(stmt)
+    return contacts.scalars().all()
+
+
 async def create_contact(body: ContactSchema, db: AsyncSession, user: User):
     contact = Contact(**body.model_dump(exclude_unset=True), user=user)
+    user_id = user.id
     db.add(contact)
     await db.commit()
+    await contacts_cache.bump(user_id)
     await db.refresh(contact)
     return contact
 
 
+async def create_contacts(rows: list[dict], db: AsyncSession, user_id: int) -> int:
+    columns = [*rows[0], "user_id"]
+    conn = await db.connection()
+    if conn.dialect.driver == "asyncpg":
+        raw = await conn.get_raw_connection()
+        await raw.driver_connection.copy_records_to_table(
+            Contact.__tablename__, records=[(*row.values(), user_id) for row in rows], columns=columns
+        )
+    else:
+        await db.execute(insert(Contact), [{**row, "user_id": user_id} for row in rows])
+    await db.commit()
+    await contacts_cache.bump(user_id)
+    return len(rows)
+
+
 async def update_contact(contact_id: int, body: ContactUpdateSchema, db: AsyncSession, user: User):
     stmt = select(Contact).filter_by(id=contact_id, user=user)
     result = await db.execute(stmt)
@@ -54,7 +165,9 @@ async def update_contact(contact_id: int, body: ContactUpdateSchema, db: AsyncSe
         contact.phone_number = body.phone_number
         contact.born_date = body.born_date
         contact.completed = body.completed
+        user_id = contact.user_id
         await db.commit()
+        await contacts_cache.bump(user_id)
         await db.refresh(contact)
     return contact
 
@@ -64,9 +177,37 @@ async def delete_contact(contact_id: int, db: AsyncSession, user: User):
     contact = await db.execute(stmt)
     contact = contact.scalar_one_or_none()
     if contact:
+        user_id = contact.user_id
         await db.delete(contact)
         await db.commit()
+        await contacts_cache.bump(user_id)
     return contact
 
 
+def bulk_where(stmt, selection: ContactBulkSelection, user_id: int):
+    stmt = stmt.where(Contact.user_id == user_id)
+    if selection.ids is not None:
+        stmt = stmt.where(Contact.id.in_(selection.ids))
+    if selection.filter is not None and selection.filter.completed is not None:
+        stmt = stmt.where(Contact.completed == selection.filter.completed)
+    return stmt.returning(Contact.id).execution_options(synchronize_session=False)
+
+
+async def update_contacts(selection: ContactBulkSelection, values: dict, db: AsyncSession, user: User) -> list[int]:
+    user_id = user.id
+    result = await db.execute(bulk_where(update(Contact).values(**values), selection, user_id))
+    ids = sorted(result.scalars().all())
+    await db.commit()
+    if ids:
+        await contacts_cache.bump(user_id)
+    return ids
+
 
+async def delete_contacts(selection: ContactBulkSelection, db: AsyncSession, user: User) -> list[int]:
+    user_id = user.id
+    result = await db.execute(bulk_where(delete(Contact), selection, user_id))
+    ids = sorted(result.scalars().all())
+    await db.commit()
+    if ids:
+        await contacts_cache.bump(user_id)
+    return ids
@@ -0,0 +1,36 @@
+from datetime import datetime
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.entity.models import EmailOutbox
+
+
+async def enqueue_email(recipient: str, subject: str, template: str, body: dict, db: AsyncSession,
+                        commit: bool = True) -> EmailOutbox:
+    """
+    Store an email for the email worker to deliver.
+    With commit=False the row is only added to the session and is committed with the caller's transaction.
+    """
+    email = EmailOutbox(recipient=recipient, subject=subject, template=template, body=body,
+                        next_attempt_at=datetime.utcnow())
+    db.add(email)
+    if commit:
+        await db.commit()
+    return email
+
+
+async def claim_emails(limit: int, db: AsyncSession, now: datetime) -> list[EmailOutbox]:
+    """
+    Lock up to limit pending emails that are due; the locks are held until the caller commits.
+    Rows locked by another worker are skipped, so several workers can share one outbox.
+    """
+    stmt = (
+        select(EmailOutbox)
+        .filter(EmailOutbox.status == "pending", EmailOutbox.next_attempt_at <= now)
+        .order_by(EmailOutbox.next_attempt_at, EmailOutbox.id)
+        .limit(limit)
+        .with_for_update(skip_locked=True)
+    )
+    emails = await db.execute(stmt)
+    return list(emails.scalars().all())
@@ -1,10 +1,10 @@
 from fastapi import Depends
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
-from libgravatar import Gravatar
 from src.database.db import get_db
 from src.entity.models import User
 from src.schemas.user import UserSchema
+from src.services.cache import user_cache, contacts_cache
 
 
 async def get_user_by_email(email: str, db: AsyncSession = Depends(get_db)):
@@ -15,33 +15,27 @@ async def get_user_by_email(email: str, db: AsyncSession = Depends(get_db)):
 
 
 async def create_user(body: UserSchema, db: AsyncSession = Depends(get_db)):
-    avatar = None
-    try:
-        g = Gravatar(body.email)
-        avatar = g.get_image()
-    except Exception as err:
-        print(err)
-    new_user = User(**body.model_dump(), avatar=avatar)
+    new_user = User(**body.model_dump())
     db.add(new_user)
     await db.commit()
     await db.refresh(new_user)
     return new_user
 
 
-async def update_token(user: User, token: str | None, db: AsyncSession):
-    user.refresh_token = token
-    await db.commit()
-
-
 async def confirmed_email(email: str, db: AsyncSession) -> None:
     user = await get_user_by_email(email, db)
     user.confirmed = True
     await db.commit()
+    await user_cache.invalidate(email)
 
 
 async def update_avatar_url(email: str, url: str | None, db: AsyncSession) -> User:
     user = await get_user_by_email(email, db)
     user.avatar = url
+    user_id = user.id
     await db.commit()
+    await user_cache.invalidate(email)
+    # cached contact bodies embed the user with its avatar
+    await contacts_cache.bump(user_id)
     await db.refresh(user)
     return user
@@ -4,7 +4,6 @@ from fastapi import (
     Depends,
     status,
     Security,
-    BackgroundTasks,
     Request,
     Response,
 )
@@ -17,27 +16,32 @@ from fastapi.responses import FileResponse
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from src.conf import messages
 from src.database.db import get_db
+from src.entity.models import User
 from src.repository import users as repositories_users
-from src.schemas.user import UserSchema, TokenSchema, UserResponse, RequestEmail
+from src.schemas.user import UserSchema, TokenSchema, UserResponse, RequestEmail, SessionResponse
 from src.services.auth import auth_service
 from src.services.email import send_email
+from src.services.rate_limit import RateLimit
+from src.services.sessions import session_store, ROTATED, REUSED
 
 router = APIRouter(prefix='/auth', tags=['auth'])
 
 get_refresh_token = HTTPBearer()
 
 
-@router.post("/signup", response_model=UserResponse, status_code=status.HTTP_201_CREATED)
-async def signup(body: UserSchema, bt: BackgroundTasks, request: Request, db: AsyncSession = Depends(get_db)):
-       """
+@router.post("/signup", response_model=UserResponse, status_code=status.HTTP_201_CREATED,
+             dependencies=[Depends(RateLimit("auth:signup"))])
+async def signup(body: UserSchema, request: Request, db: AsyncSession = Depends(get_db)):
+    """
 The signup function creates a new user in the database.
     It takes in a UserSchema object, which is validated by pydantic.
     If the email already exists, it raises an HTTPException with status code 409 (Conflict).
     Otherwise, it hashes the password and creates a new user using create_user from repositories/users.py.
+    The verification email is queued in the outbox and committed together with the new user.
 
 :param body: UserSchema: Validate the request body
-:param bt: BackgroundTasks: Add a task to the background tasks queue
 :param request: Request: Get the base url of the request
 :param db: AsyncSession: Pass the database session to the repository
 :return: A new user object
@@ -46,19 +50,21 @@ The signup function creates a new user in the database.
     exist_user = await repositories_users.get_user_by_email(body.email, db)
     if exist_user:
         raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Account already exists")
-    body.password = auth_service.get_password_hash(body.password)
+    body.password = await auth_service.get_password_hash(body.password)
+    await send_email(body.email, body.username, str(request.base_url), db, commit=False)
     new_user = await repositories_users.create_user(body, db)
-    bt.add_task(send_email, new_user.email, new_user.username, str(request.base_url))
     return new_user
 
 
-@router.post("/login", response_model=TokenSchema)
-async def login(body: OAuth2PasswordRequestForm = Depends(), db: AsyncSession = Depends(get_db)):
-        """
+@router.post("/login", response_model=TokenSchema, dependencies=[Depends(RateLimit("auth:login"))])
+async def login(request: Request, body: OAuth2PasswordRequestForm = Depends(), db: AsyncSession = Depends(get_db)):
+    """
 The login function is used to authenticate a user.
     It takes in the username and password of the user, and returns an access token if successful.
     The access token can be used to make requests on behalf of that user.
+    Every login starts a new session, so a user can stay logged in on several devices at once.
 
+:param request: Request: Get the User-Agent the session is labelled with
 :param body: OAuth2PasswordRequestForm: Get the username and password from the request body
 :param db: AsyncSession: Get the database session
 :return: A dict with the access_token, refresh_token and token_type
@@ -67,44 +73,102 @@ The login function is used to authenticate a user.
     user = await repositories_users.get_user_by_email(body.username, db)
     if user is None:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid email")
-    if not auth_service.verify_password(body.password, user.password):
+    if not await auth_service.verify_password(body.password, user.password):
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid password")
-    access_token = await auth_service.create_access_token(data={"sub": user.email})
-    refresh_token = await auth_service.create_refresh_token(data={"sub": user.email})
-    await repositories_users.update_token(user, refresh_token, db)
+    sid, jti = await session_store.create(user.email, request.headers.get("user-agent"))
+    access_token = await auth_service.create_access_token(data={"sub": user.email, "sid": sid})
+    refresh_token = await auth_service.create_refresh_token(data={"sub": user.email, "sid": sid, "jti": jti})
     return {"access_token": access_token, "refresh_token": refresh_token, "token_type": "bearer"}
 
 
-@router.get("/refresh_token", response_model=TokenSchema)
-async def refresh_token(credentials: HTTPAuthorizationCredentials = Security(get_refresh_token),
-                        db: AsyncSession = Depends(get_db)):
-        """
+@router.get("/refresh_token", response_model=TokenSchema, dependencies=[Depends(RateLimit("auth:refresh"))])
+async def refresh_token(credentials: HTTPAuthorizationCredentials = Security(get_refresh_token)):
+    """
 The refresh_token function is used to refresh the access token.
 It takes in a refresh token and returns a new access_token, 
-refresh_token pair. The function first decodes the refresh token 
-to get the email of the user who owns it. It then gets that user from 
-the database and checks if their stored refresh_token matches what was passed in. If not, it raises an error because this means that either:
+refresh_token pair. Each refresh token can be used once: the session it belongs to
+is rotated to the new one in Redis, without touching the database. Presenting a refresh token
+that was already rotated means it was copied, so the whole session is revoked.
 
 :param credentials: HTTPAuthorizationCredentials: Get the token from the header
-:param db: AsyncSession: Get the database session
 :return: A token object with the access_token, refresh_token and token_type
 :doc-author: Trelent
 """
-    token = credentials.credentials
-    email = await auth_service.decode_refresh_token(token)
-    user = await repositories_users.get_user_by_email(email, db)
-    if user.refresh_token != token:
-        await repositories_users.update_token(user, None, db)
-        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid refresh token")
-    access_token = await auth_service.create_access_token(data={"sub": email})
-    refresh_token = await auth_service.create_refresh_token(data={"sub": email})
-    await repositories_users.update_token(user, refresh_token, db)
+    payload = await auth_service.decode_refresh_token(credentials.credentials)
+    email, sid, jti = payload.get("sub"), payload.get("sid"), payload.get("jti")
+    if not (email and sid and jti):
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail=messages.INVALID_REFRESH_TOKEN)
+    result, new_jti = await session_store.rotate(email, sid, jti)
+    if result == REUSED:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail=messages.REFRESH_TOKEN_REUSED)
+    if result != ROTATED:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail=messages.INVALID_REFRESH_TOKEN)
+    access_token = await auth_service.create_access_token(data={"sub": email, "sid": sid})
+    refresh_token = await auth_service.create_refresh_token(data={"sub": email, "sid": sid, "jti": new_jti})
     return {"access_token": access_token, "refresh_token": refresh_token, "token_type": "bearer"}
 
 
+@router.post("/logout", status_code=status.HTTP_204_NO_CONTENT, dependencies=[Depends(RateLimit("auth:refresh"))])
+async def logout(credentials: HTTPAuthorizationCredentials = Security(get_refresh_token)):
+    """
+The logout function ends the session of the given refresh token.
+    Only the session's current refresh token can end it, not one it was already rotated away from.
+    Access tokens already issued stay valid until they expire.
+
+:param credentials: HTTPAuthorizationCredentials: Get the refresh token from the header
+:return: None
+:doc-author: Trelent
+"""
+    payload = await auth_service.decode_refresh_token(credentials.credentials)
+    email, sid, jti = payload.get("sub"), payload.get("sid"), payload.get("jti")
+    if not (email and sid and jti) or not await session_store.logout(email, sid, jti):
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail=messages.INVALID_REFRESH_TOKEN)
+
+
+@router.get("/sessions", response_model=list[SessionResponse], dependencies=[Depends(RateLimit("auth:refresh"))])
+async def get_sessions(user: User = Depends(auth_service.get_current_user)):
+    """
+The get_sessions function lists the sessions of the current user, one per login that has not
+    expired or been revoked, with the device it was started from.
+
+:param user: User: Get the current user
+:return: A list of sessions
+:doc-author: Trelent
+"""
+    return await session_store.sessions(user.email)
+
+
+@router.delete("/sessions/{session_id}", status_code=status.HTTP_204_NO_CONTENT,
+               dependencies=[Depends(RateLimit("auth:refresh"))])
+async def revoke_session(session_id: str, user: User = Depends(auth_service.get_current_user)):
+    """
+The revoke_session function ends one of the current user's sessions, e.g. on a lost device.
+    Its refresh token stops working at once.
+
+:param session_id: str: The id of the session to end
+:param user: User: Get the current user
+:return: None
+:doc-author: Trelent
+"""
+    if not await session_store.revoke(user.email, session_id):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=messages.SESSION_NOT_FOUND)
+
+
+@router.delete("/sessions", status_code=status.HTTP_204_NO_CONTENT, dependencies=[Depends(RateLimit("auth:refresh"))])
+async def revoke_sessions(user: User = Depends(auth_service.get_current_user)):
+    """
+The revoke_sessions function ends every session of the current user, logging them out everywhere.
+
+:param user: User: Get the current user
+:return: None
+:doc-author: Trelent
+"""
+    await session_store.revoke_all(user.email)
+
+
 @router.get("/confirmed_email/{token}")
 async def confirmed_email(token: str, db: AsyncSession = Depends(get_db)):
-        """
+    """
 The confirmed_email function is used to confirm a user's email address.
     It takes the token from the URL and uses it to get the user's email address.
     Then, it checks if that user exists in our database, and if they do not exist, 
@@ -128,21 +192,19 @@ The confirmed_email function is used to confirm a user's email address.
     return {"message": "Email confirmed"}
 
 
-@router.post("/request_email")
+@router.post("/request_email", dependencies=[Depends(RateLimit("auth:email"))])
 async def request_email(
     body: RequestEmail,
-    background_tasks: BackgroundTasks,
     request: Request,
     db: AsyncSession = Depends(get_db),
 ):
-        """
+    """
 The request_email function is used to send an email to the user with a link
 to confirm their account. The function takes in a RequestEmail object, which
 contains the user's email address. It then checks if that email address exists
-in our database and if it does, sends an email containing a confirmation link.
+in our database and if it does, queues an email containing a confirmation link.
 
 :param body: RequestEmail: Get the email from the request body
-:param background_tasks: BackgroundTasks: Add a task to the background tasks queue
 :param request: Request: Get the base_url of the request
 :param db: AsyncSession: Get the database session
 :param : Get the user's email from the request body
@@ -154,9 +216,7 @@ in our database and if it does, sends an email containing a confirmation link.
     if user.confirmed:
         return {"message": "Your email is already confirmed"}
     if user:
-        background_tasks.add_task(
-            send_email, user.email, user.username, str(request.base_url)
-        )
+        await send_email(user.email, user.username, str(request.base_url), db)
     return {"message": "Check your email for confirmation."}
 
 
@@ -164,7 +224,7 @@ in our database and if it does, sends an email containing a confirmation link.
 async def request_email(
     username: str, response: Response, db: AsyncSession = Depends(get_db)
 ):
-        """
+    """
 The request_email function is a ReST endpoint that accepts a username and returns an image.
 The image is used to verify the user's email address. The function also saves the username to
 the database.
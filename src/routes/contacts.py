@@ -1,40 +1,214 @@
-from fastapi import APIRouter, HTTPException, Depends, status, Path, Query
+import base64
+import binascii
+import enum
+import json
+from datetime import date
+
+from fastapi import APIRouter, HTTPException, Depends, status, Path, Query, Request, UploadFile, File
+from fastapi.responses import StreamingResponse
+from pydantic import TypeAdapter
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from src.conf import messages
+from src.conf.config import config
 from src.database.db import get_db
 from src.entity.models import User, Role
 from src.repository import contacts as repositories_contacts
-from src.schemas.contact import ContactSchema, ContactUpdateSchema, ContactResponse
+from src.schemas.contact import (
+    ContactSchema,
+    ContactUpdateSchema,
+    ContactResponse,
+    ContactImportResponse,
+    ContactBulkSelection,
+    ContactBulkUpdateSchema,
+    ContactBulkResponse,
+)
 from src.services.auth import auth_service
+from src.services import contacts_import, contacts_export
+from src.services.cache import contacts_cache
+from src.services.rate_limit import RateLimit
+from src.services.gravatar import gravatar_url
 from src.services.roles import RoleAccess
 
 router = APIRouter(prefix='/contacts', tags=['contacts'])
 
 access_to_route_all = RoleAccess([Role.admin, Role.moderator])
 
+contact_adapter = TypeAdapter(ContactResponse)
+contact_list_adapter = TypeAdapter(list[ContactResponse])
+
+
+def encode_cursor(contact_id: int) -> str:
+    return base64.urlsafe_b64encode(str(contact_id).encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> int:
+    try:
+        return int(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode())
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=messages.INVALID_CURSOR)
+
+
+def parse_fields(fields: str | None) -> list[str] | None:
+    if fields is None:
+        return None
+    names = list(dict.fromkeys(name.strip() for name in fields.split(",") if name.strip()))
+    if not names or set(names) - set(repositories_contacts.CONTACT_FIELDS):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=messages.INVALID_FIELDS)
+    return ["id", *[name for name in names if name != "id"]]
+
+
+def serialize_row(row) -> dict:
+    data, user = {}, {}
+    for key, value in row.items():
+        if isinstance(value, date):
+            value = value.isoformat()
+        elif isinstance(value, enum.Enum):
+            value = value.value
+        if key.startswith("user_"):
+            user[key[5:]] = value
+        else:
+            data[key] = value
+    if user:
+        if user["id"] is None:
+            user = None
+        elif user["avatar"] is None:
+            user["avatar"] = gravatar_url(user["email"])
+        data["user"] = user
+    return data
 
-@router.get("/", response_model=list[ContactResponse])
-async def get_contacts(limit: int = Query(10, ge=10, le=500), offset: int = Query(0, ge=0),
-                       db: AsyncSession = Depends(get_db), user: User = Depends(auth_service.get_current_user)):
-        """
+
+@router.get("/", response_model=list[ContactResponse], dependencies=[Depends(RateLimit("contacts:read"))])
+async def get_contacts(request: Request, limit: int = Query(10, ge=10, le=500), offset: int = Query(0, ge=0),
+                       cursor: str = Query(None), fields: str = Query(None), db: AsyncSession = Depends(get_db),
+                       user: User = Depends(auth_service.get_current_user)):
+    """
 The get_contacts function returns a list of contacts.
+    Pages are ordered by contact id. When a page is full, the X-Next-Cursor header carries
+    an opaque cursor; passing it back as the cursor parameter returns the next page
+    with a keyset query instead of an offset scan, and offset is ignored.
+    With fields, e.g. fields=first_name,phone_number, only those columns (and id) are
+    selected and returned; the user is joined only when fields includes user.
+    Responses carry an ETag and are cached until the user's contacts change;
+    a matching If-None-Match is answered with 304 without querying the database.
 
+:param request: Request: Get the query string and If-None-Match header
 :param limit: int: Limit the number of contacts returned
 :param ge: Set a minimum value for the limit parameter
 :param le: Limit the number of contacts returned
 :param offset: int: Specify the number of records to skip
 :param ge: Specify that the limit must be greater than or equal to 10
+:param cursor: str: Continue after the page that returned this cursor
+:param fields: str: Comma-separated contact fields to return
 :param db: AsyncSession: Get the database session
 :param user: User: Get the current user from the auth_service
 :return: A list of contacts
 :doc-author: Trelent
 """
-    contacts = await repositories_contacts.get_contacts(limit, offset, db, user)
-    return contacts
+    after = decode_cursor(cursor) if cursor is not None else None
+    selected = parse_fields(fields)
+
+    async def build():
+        contacts = await repositories_contacts.get_contacts(limit, offset, db, user, after=after, fields=selected)
+        headers = {}
+        if len(contacts) == limit:
+            last_id = contacts[-1]["id"] if selected else contacts[-1].id
+            headers["X-Next-Cursor"] = encode_cursor(last_id)
+        if selected is None:
+            return contact_list_adapter.dump_json(contact_list_adapter.validate_python(contacts)), headers
+        return json.dumps([serialize_row(row) for row in contacts]).encode(), headers
+
+    return await contacts_cache.respond(request, user.id, build)
+
+
+@router.get("/search", response_model=list[ContactResponse], dependencies=[Depends(RateLimit("contacts:read"))])
+async def search_contacts(q: str = Query(min_length=1, max_length=100), limit: int = Query(10, ge=1, le=100),
+                          db: AsyncSession = Depends(get_db), user: User = Depends(auth_service.get_current_user)):
+    """
+The search_contacts function finds the current user's contacts by name, email or phone.
+    Matches substrings and, on Postgres, near misses; the best matches come first.
+
+:param q: str: Text to look for
+:param limit: int: Limit the number of contacts returned
+:param db: AsyncSession: Get the database session
+:param user: User: Get the current user
+:return: A list of contacts ordered by relevance
+:doc-author: Trelent
+"""
+    return await repositories_contacts.search_contacts(q, limit, db, user)
+
+
+@router.get("/birthdays", response_model=list[ContactResponse], dependencies=[Depends(RateLimit("contacts:read"))])
+async def get_upcoming_birthdays(days: int = Query(7, ge=0, le=366), limit: int = Query(100, ge=1, le=1000),
+                                 db: AsyncSession = Depends(get_db),
+                                 user: User = Depends(auth_service.get_current_user)):
+    """
+The get_upcoming_birthdays function returns the current user's contacts whose birthday
+    falls within the next days days, today included, soonest first.
+    Contacts whose born_date could not be parsed as a date are not included.
+
+:param days: int: How many days ahead to look
+:param limit: int: Limit the number of contacts returned
+:param db: AsyncSession: Get the database session
+:param user: User: Get the current user
+:return: A list of contacts
+:doc-author: Trelent
+"""
+    return await repositories_contacts.get_upcoming_birthdays(days, limit, db, user)
+
 
+@router.get("/export", dependencies=[Depends(RateLimit("contacts:read"))])
+async def export_contacts(format: str = Query("ndjson", pattern="^(csv|ndjson)$"),
+                          db: AsyncSession = Depends(get_db), user: User = Depends(auth_service.get_current_user)):
+    """
+The export_contacts function streams all of the current user's contacts as NDJSON or CSV.
+    Rows are read through a server-side cursor and written out batch by batch,
+    so the result set is never buffered in the worker.
 
-@router.get("/", response_model=ContactResponse)
+:param format: str: ndjson (default) or csv
+:param db: AsyncSession: Get the database session
+:param user: User: Get the current user
+:return: A streaming response with the contacts
+:doc-author: Trelent
+"""
+    return StreamingResponse(
+        contacts_export.export_contacts(format, db, user.id, config.CONTACTS_EXPORT_BATCH_SIZE),
+        media_type=contacts_export.MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="contacts.{format}"'},
+    )
+
+
+@router.get("/{contact_id}", response_model=ContactResponse, dependencies=[Depends(RateLimit("contacts:read"))])
+async def get_contact_by_id(request: Request, contact_id: int = Path(ge=1), fields: str = Query(None),
+                            db: AsyncSession = Depends(get_db), user: User = Depends(auth_service.get_current_user)):
+    """
+The get_contact_by_id function returns one of the current user's contacts.
+    With fields, only those columns (and id) are selected and returned.
+    Cached with an ETag like get_contacts.
+
+:param request: Request: Get the query string and If-None-Match header
+:param contact_id: int: Get the contact id from the path
+:param fields: str: Comma-separated contact fields to return
+:param db: AsyncSession: Get the database session
+:param user: User: Get the current user
+:return: A contact
+:doc-author: Trelent
+"""
+    selected = parse_fields(fields)
+
+    async def build():
+        contact = await repositories_contacts.get_contact(contact_id, db, user, fields=selected)
+        if contact is None:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="NOT FOUND")
+        if selected is None:
+            return contact_adapter.dump_json(contact_adapter.validate_python(contact)), {}
+        return json.dumps(serialize_row(contact)).encode(), {}
+
+    return await contacts_cache.respond(request, user.id, build)
+
+
+@router.get("/", response_model=ContactResponse, dependencies=[Depends(RateLimit("contacts:read"))])
 async def get_contact(
         contact_id: int = Query(None),
         first_name: str = Query(None),
@@ -42,7 +216,7 @@ async def get_contact(
         email: str = Query(None),
         db: AsyncSession = Depends(get_db)
 ):
-      """
+    """
 The get_contact function is used to retrieve a contact from the database.
     The function can be called with either a contact_id or first_name, last_name, and email.
     If all three of those parameters are provided then the function will return the first matching result.
@@ -71,10 +245,11 @@ The get_contact function is used to retrieve a contact from the database.
     return contact
 
 
-@router.post("/", response_model=ContactResponse, status_code=status.HTTP_201_CREATED)
+@router.post("/", response_model=ContactResponse, status_code=status.HTTP_201_CREATED,
+             dependencies=[Depends(RateLimit("contacts:write"))])
 async def create_contact(body: ContactSchema, db: AsyncSession = Depends(get_db),
                          user: User = Depends(auth_service.get_current_user)):
-        """
+    """
 The create_contact function creates a new contact in the database.
 
 :param body: ContactSchema: Validate the request body
@@ -87,10 +262,71 @@ The create_contact function creates a new contact in the database.
     return contact
 
 
-@router.put("/{contact_id}")
+@router.post("/import", response_model=ContactImportResponse, dependencies=[Depends(RateLimit("contacts:bulk"))])
+async def import_contacts(file: UploadFile = File(), format: str = Query(None, pattern="^(csv|ndjson)$"),
+                          db: AsyncSession = Depends(get_db), user: User = Depends(auth_service.get_current_user)):
+    """
+The import_contacts function loads many contacts from one CSV or NDJSON file.
+    Rows are validated against ContactSchema as the file is read and inserted in batches,
+    so memory use does not grow with the file. Invalid rows are skipped and listed in the report.
+
+:param file: UploadFile: CSV with a header row, or one JSON object per line
+:param format: str: csv or ndjson, guessed from the file name or content type when omitted
+:param db: AsyncSession: Get the database session
+:param user: User: Get the current user
+:return: The number of imported and failed rows with per-row errors
+:doc-author: Trelent
+"""
+    fmt = format or contacts_import.guess_format(file.filename, file.content_type)
+    if fmt is None:
+        raise HTTPException(status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE, detail=messages.UNKNOWN_IMPORT_FORMAT)
+    return await contacts_import.import_contacts(
+        file.file, fmt, db, user,
+        batch_size=config.CONTACTS_IMPORT_BATCH_SIZE,
+        max_errors=config.CONTACTS_IMPORT_MAX_ERRORS,
+    )
+
+
+@router.post("/bulk/update", response_model=ContactBulkResponse, dependencies=[Depends(RateLimit("contacts:bulk"))])
+async def update_contacts(body: ContactBulkUpdateSchema, db: AsyncSession = Depends(get_db),
+                          user: User = Depends(auth_service.get_current_user)):
+    """
+The update_contacts function changes many of the current user's contacts with one UPDATE statement.
+    Contacts are selected by ids, by filter, or both; ids of other users' contacts are ignored.
+    Selecting every contact takes "all": true.
+
+:param body: ContactBulkUpdateSchema: Get the selection and the new values
+:param db: AsyncSession: Get the database session
+:param user: User: Get the current user
+:return: The ids of the updated contacts
+:doc-author: Trelent
+"""
+    ids = await repositories_contacts.update_contacts(body, body.values.model_dump(), db, user)
+    return {"ids": ids, "count": len(ids)}
+
+
+@router.post("/bulk/delete", response_model=ContactBulkResponse, dependencies=[Depends(RateLimit("contacts:bulk"))])
+async def delete_contacts(body: ContactBulkSelection, db: AsyncSession = Depends(get_db),
+                          user: User = Depends(auth_service.get_current_user)):
+    """
+The delete_contacts function removes many of the current user's contacts with one DELETE statement.
+    Contacts are selected by ids, by filter, or both; ids of other users' contacts are ignored.
+    Selecting every contact takes "all": true.
+
+:param body: ContactBulkSelection: Get the ids and/or filter of the contacts to delete
+:param db: AsyncSession: Get the database session
+:param user: User: Get the current user
+:return: The ids of the deleted contacts
+:doc-author: Trelent
+"""
+    ids = await repositories_contacts.delete_contacts(body, db, user)
+    return {"ids": ids, "count": len(ids)}
+
+
+@router.put("/{contact_id}", dependencies=[Depends(RateLimit("contacts:write"))])
 async def update_contact(body: ContactUpdateSchema, contact_id: int = Path(ge=1), db: AsyncSession = Depends(get_db),
                          user: User = Depends(auth_service.get_current_user)):
-        """
+    """
 The update_contact function updates a contact in the database.
 
 :param body: ContactUpdateSchema: Get the contact information from the request body
@@ -104,10 +340,11 @@ The update_contact function updates a contact in the database.
     return contact
 
 
-@router.delete("/{contact_id}", status_code=status.HTTP_204_NO_CONTENT)
+@router.delete("/{contact_id}", status_code=status.HTTP_204_NO_CONTENT,
+               dependencies=[Depends(RateLimit("contacts:write"))])
 async def delete_contact(contact_id: int = Path(ge=1), db: AsyncSession = Depends(get_db),
                          user: User = Depends(auth_service.get_current_user)):
-        """
+    """
 The delete_contact function deletes a contact from the database.
 
 :param contact_id: int: Get the contact id from the path
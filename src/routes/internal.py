@@ -0,0 +1,78 @@
+from fastapi import APIRouter, Depends
+
+from src.database.db import sessionmanager
+from src.entity.models import Role
+from src.services.auth import auth_service
+from src.services.bans import ban_service
+from src.services.rate_limit import rate_limiter
+from src.services.roles import RoleAccess
+from src.services import startup
+
+router = APIRouter(prefix='/internal', tags=['internal'], dependencies=[Depends(RoleAccess([Role.admin]))])
+
+
+@router.get("/pool")
+async def pool_stats():
+    """
+The pool_stats function reports the state of the database connection pool:
+    its size, checked out connections and overflow, plus checkout wait and
+    connection hold times collected since the worker started.
+
+:return: A dict with the pool statistics
+:doc-author: Trelent
+"""
+    return sessionmanager.pool_stats()
+
+
+@router.get("/auth")
+async def auth_stats():
+    """
+The auth_stats function reports the password hashing executor queue and
+    the verified token cache of this worker.
+
+:return: A dict with the executor and token cache statistics
+:doc-author: Trelent
+"""
+    return {
+        "password_hashing": auth_service.pwd_executor.stats(),
+        "token_cache": auth_service.token_cache.stats(),
+    }
+
+
+@router.get("/rate_limit")
+async def rate_limit_stats():
+    """
+The rate_limit_stats function reports how many rate limited requests this worker
+    decided locally and how many went to Redis, and whether it is running on
+    local buckets only because Redis is unavailable.
+
+:return: A dict with the rate limiter statistics
+:doc-author: Trelent
+"""
+    return rate_limiter.stats()
+
+
+@router.get("/bans")
+async def ban_stats():
+    """
+The ban_stats function reports the ban lists this worker is enforcing:
+    the number of banned IPv4 and IPv6 networks and user agents, and the
+    version of the lists last loaded from Redis.
+
+:return: A dict with the ban list statistics
+:doc-author: Trelent
+"""
+    return ban_service.stats()
+
+
+@router.get("/startup")
+async def startup_stats():
+    """
+The startup_stats function reports how long this worker took to start: the milliseconds
+    from the start of the app import to the end of the import and of the lifespan startup.
+    python -m src.services.startup breaks the import time down by module.
+
+:return: A dict with the startup phases
+:doc-author: Trelent
+"""
+    return startup.stats()
@@ -1,5 +1,3 @@
-import cloudinary
-import cloudinary.uploader
 from fastapi import (
     APIRouter,
     HTTPException,
@@ -10,32 +8,28 @@ from fastapi import (
     UploadFile,
     File,
 )
-from fastapi_limiter.depends import RateLimiter
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 from src.database.db import get_db
 from src.entity.models import User
 from src.schemas.user import UserResponse
 from src.services.auth import auth_service
-from src.conf.config import config
+from src.services.avatars import avatar_pipeline, AvatarError
+from src.services.executor import ExecutorBusy
+from src.services.rate_limit import RateLimit
+from src.conf import messages
 from src.repository import users as repositories_users
 
 router = APIRouter(prefix="/users", tags=["users"])
-cloudinary.config(
-    cloud_name=config.CLOUDINARY_NAME,
-    api_key=config.CLOUDINARY_API_KEY,
-    secret_key=config.CLOUDINARY_SECRET_KEY,
-    secure=True,
-)
 
 
 @router.get(
     "/me",
     response_model=UserResponse,
-    dependencies=[Depends(RateLimiter(times=10, seconds=60))],
+    dependencies=[Depends(RateLimit("users:read"))],
 )
 async def get_current_user(user: User = Depends(auth_service.get_current_user)):
-        """
+    """
 The get_current_user function is a dependency that will be injected into the
     get_current_user endpoint. It uses the auth_service to retrieve the current user,
     and returns it if found.
@@ -50,17 +44,18 @@ The get_current_user function is a dependency that will be injected into the
 @router.patch(
     "/avatar",
     response_model=UserResponse,
-    dependencies=[Depends(RateLimiter(times=10, seconds=60))],
+    dependencies=[Depends(RateLimit("users:avatar"))],
 )
 async def get_current_user(
     file: UploadFile = File(),
     user: User = Depends(auth_service.get_current_user),
     db: AsyncSession = Depends(get_db),
 ):
-        """
+    """
 The get_current_user function is a dependency that will be used in the
     get_current_user endpoint. It takes an UploadFile object, which is a file
-    uploaded by the user, and uses it to update their avatar URL. The function
+    uploaded by the user, checks its size and type, turns it into a 250x250 thumbnail
+    in a process pool and stores it. Only then is the avatar URL updated. The function
     also takes a User object as well as an AsyncSession object from FastAPI's
     Depends() method.
 
@@ -71,10 +66,11 @@ The get_current_user function is a dependency that will be used in the
 :return: The current user
 :doc-author: Trelent
 """
-    public_id = f"Web/{user.email}"
-    res = cloudinary.uploader.upload(file.file, public_id=public_id, overwrite=True)
-    res_url = cloudinary.CloudinaryImage(public_id).build_url(
-        width=250, height=250, crop="fill", version=res.get("version")
-    )
-    user = await repositories_users.update_avatar_url(user.email, res_url, db)
+    try:
+        url = await avatar_pipeline.upload(file, user.email)
+    except AvatarError as err:
+        raise HTTPException(status_code=err.status_code, detail=err.detail)
+    except ExecutorBusy:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=messages.SERVER_BUSY)
+    user = await repositories_users.update_avatar_url(user.email, url, db)
     return user
@@ -1,7 +1,7 @@
-from datetime import datetime
+from datetime import date, datetime
 from typing import Optional
 
-from pydantic import BaseModel, EmailStr, Field
+from pydantic import BaseModel, EmailStr, Field, model_validator
 
 from src.schemas.user import UserResponse
 
@@ -26,10 +26,53 @@ class ContactResponse(BaseModel):
     email: EmailStr
     phone_number: str
     born_date: str
+    birthday: date | None = None
     completed: bool
-    created_at: datetime | None
-    updated_at: datetime | None
+    created_at: datetime | None = None
+    updated_at: datetime | None = None
     user: UserResponse | None
 
     class Config:
         from_attributes = True
+
+
+class ContactImportError(BaseModel):
+    row: int
+    errors: list[str]
+
+
+class ContactImportResponse(BaseModel):
+    imported: int
+    failed: int
+    errors: list[ContactImportError]
+
+
+class ContactFilter(BaseModel):
+    completed: Optional[bool] = None
+
+
+class ContactBulkSelection(BaseModel):
+    ids: Optional[list[int]] = Field(default=None, min_length=1, max_length=5000)
+    filter: Optional[ContactFilter] = None
+    all: bool = False
+
+    @model_validator(mode="after")
+    def check_selection(self):
+        # an empty filter would select every contact, so that has to be asked for with all
+        has_filter = self.filter is not None and bool(self.filter.model_dump(exclude_none=True))
+        if self.ids is None and not has_filter and not self.all:
+            raise ValueError("ids, a filter with at least one field, or all is required")
+        return self
+
+
+class ContactBulkValues(BaseModel):
+    completed: bool
+
+
+class ContactBulkUpdateSchema(ContactBulkSelection):
+    values: ContactBulkValues
+
+
+class ContactBulkResponse(BaseModel):
+    ids: list[int]
+    count: int
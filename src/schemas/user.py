@@ -1,8 +1,10 @@
+from datetime import datetime
 from typing import Optional
 
-from pydantic import BaseModel, EmailStr, Field
+from pydantic import BaseModel, EmailStr, Field, model_validator
 
 from src.entity.models import Role
+from src.services.gravatar import gravatar_url
 
 
 class UserSchema(BaseModel):
@@ -15,12 +17,19 @@ class UserResponse(BaseModel):
     id: int = 1
     username: str
     email: EmailStr
-    avatar: str
+    avatar: str | None
     role: Role
 
     class Config:
         from_attributes = True
 
+    @model_validator(mode="after")
+    def default_avatar(self):
+        # users without an uploaded avatar get their Gravatar, resolved here rather than at signup
+        if self.avatar is None:
+            self.avatar = gravatar_url(self.email)
+        return self
+
 
 class TokenSchema(BaseModel):
     access_token: str
@@ -28,5 +37,12 @@ class TokenSchema(BaseModel):
     token_type: str = "bearer"
 
 
+class SessionResponse(BaseModel):
+    id: str
+    device: str | None
+    created_at: datetime
+    last_used: datetime
+
+
 class RequestEmail(BaseModel):
     email: EmailStr
@@ -1,8 +1,9 @@
 from datetime import datetime, timedelta
+from functools import cache
+from time import perf_counter
 from typing import Optional
 
 from fastapi import Depends, HTTPException, status
-from passlib.context import CryptContext
 from fastapi.security import OAuth2PasswordBearer
 from sqlalchemy.ext.asyncio import AsyncSession
 from jose import JWTError, jwt
@@ -10,22 +11,65 @@ from jose import JWTError, jwt
 from src.database.db import get_db
 from src.repository import users as repository_users
 from src.conf.config import config
+from src.conf import messages
+from src.services.cache import user_cache, token_cache
+from src.services.executor import BoundedExecutor, ExecutorBusy
+from src.services.metrics import auth_duration
+
+@cache
+def pwd_context():
+    # built on the first hash or verify, in the process doing it, so importing the app skips passlib
+    from passlib.context import CryptContext
+
+    return CryptContext(schemes=["bcrypt"], deprecated="auto")
+
+
+# module level, so they can be sent to a process pool
+def _verify_password(plain_password, hashed_password):
+    return pwd_context().verify(plain_password, hashed_password)
+
+
+def _hash_password(password: str):
+    return pwd_context().hash(password)
 
 
 class Auth:
-    pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+    pwd_executor = BoundedExecutor(
+        config.PASSWORD_HASH_EXECUTOR,
+        max_workers=config.PASSWORD_HASH_WORKERS,
+        max_pending=config.PASSWORD_HASH_MAX_PENDING,
+        name="bcrypt",
+    )
     SECRET_KEY = config.SECRET_KEY_JWT
 
     ALGORITHM = config.ALGORITHM
+    cache = user_cache
+    token_cache = token_cache
+
+    async def _run_hasher(self, operation: str, fn, *args):
+        start = perf_counter()
+        try:
+            result = await self.pwd_executor.run(fn, *args)
+        except ExecutorBusy:
+            raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=messages.SERVER_BUSY)
+        # includes the wait for a free worker
+        auth_duration.observe(perf_counter() - start, operation)
+        return result
 
-    def verify_password(self, plain_password, hashed_password):
-        return self.pwd_context.verify(plain_password, hashed_password)
+    async def verify_password(self, plain_password, hashed_password):
+        return await self._run_hasher("bcrypt_verify", _verify_password, plain_password, hashed_password)
 
-    def get_password_hash(self, password: str):
-        return self.pwd_context.hash(password)
+    async def get_password_hash(self, password: str):
+        return await self._run_hasher("bcrypt_hash", _hash_password, password)
 
     oauth2_scheme = OAuth2PasswordBearer(tokenUrl="api.auth/login")
 
+    def _encode(self, claims: dict) -> str:
+        start = perf_counter()
+        token = jwt.encode(claims, self.SECRET_KEY, algorithm=self.ALGORITHM)
+        auth_duration.observe(perf_counter() - start, "jwt_encode")
+        return token
+
     # define a function to generate a new access token
     async def create_access_token(self, data: dict, expires_delta: Optional[float] = None):
         to_encode = data.copy()
@@ -34,7 +78,7 @@ class Auth:
         else:
             expire = datetime.utcnow() + timedelta(minutes=15)
         to_encode.update({"iat": datetime.utcnow(), "exp": expire, "scope": "access_token"})
-        encoded_access_token = jwt.encode(to_encode, self.SECRET_KEY, algorithm=self.ALGORITHM)
+        encoded_access_token = self._encode(to_encode)
         return encoded_access_token
 
     # define a function to generate a new refresh token
@@ -43,17 +87,44 @@ class Auth:
         if expires_delta:
             expire = datetime.utcnow() + timedelta(seconds=expires_delta)
         else:
-            expire = datetime.utcnow() + timedelta(days=7)
+            expire = datetime.utcnow() + timedelta(seconds=config.REFRESH_TOKEN_TTL)
         to_encode.update({"iat": datetime.utcnow(), "exp": expire, "scope": "refresh_token"})
-        encoded_refresh_token = jwt.encode(to_encode, self.SECRET_KEY, algorithm=self.ALGORITHM)
+        encoded_refresh_token = self._encode(to_encode)
         return encoded_refresh_token
 
-    async def decode_refresh_token(self, refresh_token: str):
+    def create_email_token(self, data: dict):
+        to_encode = data.copy()
+        expire = datetime.utcnow() + timedelta(days=1)
+        to_encode.update({"iat": datetime.utcnow(), "exp": expire, "scope": "email_token"})
+        token = self._encode(to_encode)
+        return token
+
+    async def get_email_from_token(self, token: str):
+        try:
+            payload = jwt.decode(token, self.SECRET_KEY, algorithms=[self.ALGORITHM])
+            if payload.get('scope') == 'email_token':
+                return payload['sub']
+        except JWTError:
+            pass
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                            detail="Invalid token for email verification")
+
+    def decode_token(self, token: str) -> dict:
+        payload = self.token_cache.get(token)
+        if payload is None:
+            start = perf_counter()
+            try:
+                payload = jwt.decode(token, self.SECRET_KEY, algorithms=[self.ALGORITHM])
+            finally:
+                auth_duration.observe(perf_counter() - start, "jwt_decode")
+            self.token_cache.set(token, payload)
+        return payload
+
+    async def decode_refresh_token(self, refresh_token: str) -> dict:
         try:
-            payload = jwt.decode(refresh_token, self.SECRET_KEY, algorithms=[self.ALGORITHM])
+            payload = self.decode_token(refresh_token)
             if payload['scope'] == 'refresh_token':
-                email = payload['sub']
-                return email
+                return payload
             raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail='Invalid scope for token')
         except JWTError:
             raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail='Could not validate credentials')
@@ -67,7 +138,7 @@ class Auth:
 
         try:
             # Decode JWT
-            payload = jwt.decode(token, self.SECRET_KEY, algorithms=[self.ALGORITHM])
+            payload = self.decode_token(token)
             if payload['scope'] == 'access_token':
                 email = payload["sub"]
                 if email is None:
@@ -77,9 +148,12 @@ class Auth:
         except JWTError as e:
             raise credentials_exception
 
-        user = await repository_users.get_user_by_email(email, db)
+        user = await self.cache.get(email)
         if user is None:
-            raise credentials_exception
+            user = await repository_users.get_user_by_email(email, db)
+            if user is None:
+                raise credentials_exception
+            await self.cache.set(email, user)
         return user
 
 
@@ -0,0 +1,165 @@
+import asyncio
+import hashlib
+import io
+from pathlib import Path
+
+from fastapi import UploadFile, status
+
+from src.conf import messages
+from src.conf.config import config
+from src.services.executor import BoundedExecutor
+
+# content types accepted for upload and their signatures: the file has to match one of them,
+# a signature being the magic bytes expected at each offset
+AVATAR_TYPES = {
+    "image/jpeg": ({0: b"\xff\xd8\xff"},),
+    "image/png": ({0: b"\x89PNG\r\n\x1a\n"},),
+    "image/webp": ({0: b"RIFF", 8: b"WEBP"},),
+    "image/gif": ({0: b"GIF87a"}, {0: b"GIF89a"}),
+}
+CHUNK_SIZE = 64 * 1024
+# room for the multipart boundaries and part headers around the file in the request body
+MULTIPART_OVERHEAD = 16 * 1024
+
+
+class AvatarError(Exception):
+    status_code = status.HTTP_422_UNPROCESSABLE_ENTITY
+    detail = messages.AVATAR_INVALID
+
+
+class AvatarTooLarge(AvatarError):
+    status_code = status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+    detail = messages.AVATAR_TOO_LARGE
+
+
+class AvatarTypeNotAllowed(AvatarError):
+    status_code = status.HTTP_415_UNSUPPORTED_MEDIA_TYPE
+    detail = messages.AVATAR_TYPE_NOT_ALLOWED
+
+
+class AvatarStorageError(AvatarError):
+    status_code = status.HTTP_502_BAD_GATEWAY
+    detail = messages.AVATAR_UPLOAD_FAILED
+
+
+def has_signature(head: bytes, signatures: tuple[dict[int, bytes], ...]) -> bool:
+    return any(all(head[offset:offset + len(magic)] == magic for offset, magic in signature.items())
+               for signature in signatures)
+
+
+async def read_upload(file: UploadFile, max_bytes: int) -> bytes:
+    """
+    Read the upload chunk by chunk, rejecting it as soon as it is over max_bytes
+    or when its first bytes do not match its declared image type.
+    """
+    signatures = AVATAR_TYPES.get(file.content_type)
+    if signatures is None:
+        raise AvatarTypeNotAllowed()
+    if file.size is not None and file.size > max_bytes:
+        raise AvatarTooLarge()
+    data = bytearray()
+    while chunk := await file.read(CHUNK_SIZE):
+        if not data and not has_signature(chunk, signatures):
+            raise AvatarTypeNotAllowed()
+        data += chunk
+        if len(data) > max_bytes:
+            raise AvatarTooLarge()
+    if not data:
+        raise AvatarError()
+    return bytes(data)
+
+
+def make_thumbnail(data: bytes, size: int, max_pixels: int) -> bytes:
+    """Crop and scale the image to a size x size PNG. Runs in the avatar process pool."""
+    # imported here, so Pillow is only loaded by the processes that make thumbnails
+    from PIL import Image, ImageOps, UnidentifiedImageError
+
+    try:
+        with Image.open(io.BytesIO(data)) as image:
+            if image.width * image.height > max_pixels:
+                raise AvatarTooLarge()
+            image = ImageOps.exif_transpose(image)
+            thumbnail = ImageOps.fit(image.convert("RGBA"), (size, size), Image.Resampling.LANCZOS)
+    except (UnidentifiedImageError, OSError, ValueError, Image.DecompressionBombError):
+        raise AvatarError()
+    out = io.BytesIO()
+    thumbnail.save(out, format="PNG", optimize=True)
+    return out.getvalue()
+
+
+class CloudinaryStorage:
+    """The SDK is imported and configured on the first upload rather than when the app starts."""
+
+    def __init__(self, folder: str = "Web"):
+        self.folder = folder
+        self._uploader = None
+
+    def _upload(self, data: bytes, **options) -> dict:
+        if self._uploader is None:
+            import cloudinary
+            import cloudinary.uploader
+
+            cloudinary.config(
+                cloud_name=config.CLOUDINARY_NAME,
+                api_key=config.CLOUDINARY_API_KEY,
+                api_secret=config.CLOUDINARY_SECRET_KEY,
+                secure=True,
+            )
+            self._uploader = cloudinary.uploader
+        return self._uploader.upload(data, **options)
+
+    async def save(self, key: str, data: bytes) -> str:
+        # the SDK is blocking, keep it off the event loop
+        res = await asyncio.to_thread(self._upload, data, public_id=f"{self.folder}/{key}", overwrite=True,
+                                      format="png")
+        return res["secure_url"]
+
+
+class LocalStorage:
+    def __init__(self, root: str, base_url: str):
+        self.root = Path(root)
+        self.base_url = base_url.rstrip("/")
+
+    def _write(self, path: Path, data: bytes) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(".tmp")
+        tmp.write_bytes(data)
+        tmp.replace(path)
+
+    async def save(self, key: str, data: bytes) -> str:
+        name = hashlib.sha256(key.encode()).hexdigest()[:32] + ".png"
+        await asyncio.to_thread(self._write, self.root / name, data)
+        # the version busts browser caches when the avatar is replaced under the same name
+        return f"{self.base_url}/{name}?v={hashlib.sha256(data).hexdigest()[:12]}"
+
+
+def build_storage():
+    if config.AVATAR_STORAGE == "local":
+        return LocalStorage(config.AVATAR_LOCAL_DIR, config.AVATAR_LOCAL_URL)
+    return CloudinaryStorage()
+
+
+class AvatarPipeline:
+    def __init__(self, storage, executor: BoundedExecutor):
+        self.storage = storage
+        self.executor = executor
+
+    async def upload(self, file: UploadFile, key: str) -> str:
+        """Validate the upload, make the thumbnail in the process pool, store it and return its URL."""
+        data = await read_upload(file, config.AVATAR_MAX_BYTES)
+        thumbnail = await self.executor.run(make_thumbnail, data, config.AVATAR_SIZE, config.AVATAR_MAX_PIXELS)
+        try:
+            return await self.storage.save(key, thumbnail)
+        except Exception as err:
+            raise AvatarStorageError() from err
+
+
+avatar_pipeline = AvatarPipeline(
+    build_storage(),
+    BoundedExecutor(
+        config.AVATAR_EXECUTOR,
+        max_workers=config.AVATAR_WORKERS,
+        max_pending=config.AVATAR_MAX_PENDING,
+        name="avatar",
+    ),
+)
@@ -0,0 +1,216 @@
+import asyncio
+import re
+from ipaddress import ip_address, ip_network
+from typing import Iterable
+
+import redis.asyncio as aioredis
+
+from src.conf.config import config
+
+REGEX_CHARS = set(r".^$*+?{}[]\|()")
+
+
+def trie_pattern(words: Iterable[str]) -> str:
+    """
+    One regex matching any of the literal words, factored by common prefixes.
+    A search tries the distinct characters at each trie level instead of every word in turn,
+    so its cost barely grows with the number of words.
+    """
+    trie = {}
+    for word in words:
+        node = trie
+        for char in word:
+            node = node.setdefault(char, {})
+            if "" in node:
+                break  # a prefix of this word is already banned
+        else:
+            node.clear()
+            node[""] = True
+    return _trie_node(trie)
+
+
+def _trie_node(node: dict) -> str:
+    if "" in node:
+        return ""
+    branches = [re.escape(char) + _trie_node(child) for char, child in sorted(node.items())]
+    return branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+
+
+def compile_user_agents(patterns: Iterable[str]) -> list[re.Pattern]:
+    """
+    Compile user agent bans: literal ones into a prefix trie and plain regexes alongside, to one regex.
+    Regexes with capturing groups or global inline flags such as (?i) are compiled on their own,
+    as joining them would renumber their backreferences or fail to compile.
+    """
+    literals, regexes, standalone = [], [], []
+    for pattern in patterns:
+        if not pattern:
+            continue
+        if REGEX_CHARS.isdisjoint(pattern):
+            literals.append(pattern)
+            continue
+        try:
+            compiled = re.compile(pattern)
+        except re.error as err:
+            print(f"invalid user agent ban {pattern!r}: {err}")
+            continue
+        if compiled.groups or compiled.flags != re.UNICODE:
+            standalone.append(compiled)
+        else:
+            regexes.append(f"(?:{pattern})")
+    if literals:
+        regexes.append(trie_pattern(literals))
+    return ([re.compile("|".join(regexes))] if regexes else []) + standalone
+
+
+class CidrTrie:
+    """Binary prefix tree of networks; a lookup walks at most one node per address bit, however many networks."""
+
+    def __init__(self, bits: int):
+        self.bits = bits
+        self.root = [None, None, False]
+        self.size = 0
+
+    def add(self, network_address: int, prefixlen: int) -> None:
+        node = self.root
+        for shift in range(self.bits - 1, self.bits - 1 - prefixlen, -1):
+            if node[2]:
+                return  # covered by a wider network
+            bit = network_address >> shift & 1
+            if node[bit] is None:
+                node[bit] = [None, None, False]
+            node = node[bit]
+        if node[2]:
+            return
+        node[0] = node[1] = None
+        node[2] = True
+        self.size += 1
+
+    def contains(self, address: int) -> bool:
+        node = self.root
+        shift = self.bits
+        while node is not None:
+            if node[2]:
+                return True
+            shift -= 1
+            if shift < 0:
+                return False
+            node = node[address >> shift & 1]
+        return False
+
+
+class BanMatcher:
+    """Immutable snapshot of the banned networks and user agents."""
+
+    def __init__(self, ips: Iterable[str], user_agents: Iterable[str]):
+        self.networks = {4: CidrTrie(32), 6: CidrTrie(128)}
+        for value in ips:
+            try:
+                network = ip_network(value.strip(), strict=False)
+            except ValueError as err:
+                print(f"invalid IP ban {value!r}: {err}")
+                continue
+            self.networks[network.version].add(int(network.network_address), network.prefixlen)
+        user_agents = list(user_agents)
+        self.user_agent_count = len(user_agents)
+        self.user_agents = compile_user_agents(user_agents)
+
+    def ip_banned(self, host: str | None) -> bool:
+        if not host:
+            return False
+        try:
+            address = ip_address(host)
+        except ValueError:
+            return False
+        if address.version == 6 and address.ipv4_mapped:
+            address = address.ipv4_mapped
+        return self.networks[address.version].contains(int(address))
+
+    def user_agent_banned(self, user_agent: str | None) -> bool:
+        return bool(user_agent) and any(pattern.search(user_agent) for pattern in self.user_agents)
+
+    def is_banned(self, host: str | None, user_agent: str | None) -> bool:
+        return self.ip_banned(host) or self.user_agent_banned(user_agent)
+
+    def stats(self) -> dict:
+        return {
+            "ipv4_networks": self.networks[4].size,
+            "ipv6_networks": self.networks[6].size,
+            "user_agents": self.user_agent_count,
+        }
+
+
+class BanService:
+    """
+    Serves the current BanMatcher and rebuilds it when the ban lists in Redis change.
+
+    The lists are the sets bans:ips (addresses or CIDR networks) and bans:user_agents (literals or regexes),
+    added to the ones from config. Writers bump bans:version after changing them, e.g.
+        SADD bans:ips 203.0.113.0/24
+        INCR bans:version
+    and every worker picks the change up within interval seconds. The matcher is swapped in one assignment,
+    so requests never see a half-built list; when Redis is unavailable the last lists stay in force.
+    """
+
+    ips_key = "bans:ips"
+    user_agents_key = "bans:user_agents"
+    version_key = "bans:version"
+
+    def __init__(self, client: aioredis.Redis, ips: list[str], user_agents: list[str], interval: float):
+        self.client = client
+        self.static_ips = ips
+        self.static_user_agents = user_agents
+        self.interval = interval
+        self.matcher = BanMatcher(ips, user_agents)
+        self.version = None
+        self._task: asyncio.Task | None = None
+
+    async def reload(self) -> bool:
+        version = await self.client.get(self.version_key)
+        if version == self.version:
+            return False
+        ips = await self.client.smembers(self.ips_key)
+        user_agents = await self.client.smembers(self.user_agents_key)
+        self.matcher = await asyncio.to_thread(
+            BanMatcher,
+            [*self.static_ips, *(ip.decode() for ip in ips)],
+            [*self.static_user_agents, *(user_agent.decode() for user_agent in user_agents)],
+        )
+        self.version = version
+        return True
+
+    async def _watch(self) -> None:
+        while True:
+            try:
+                await self.reload()
+            except Exception as err:
+                # keep the last matcher and the watcher running, whatever went wrong
+                print(f"ban lists not reloaded: {err!r}")
+            await asyncio.sleep(self.interval)
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._watch())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    def stats(self) -> dict:
+        return {"version": self.version and int(self.version), **self.matcher.stats()}
+
+
+ban_service = BanService(
+    aioredis.Redis(
+        host=config.REDIS_DOMAIN,
+        port=config.REDIS_PORT,
+        db=0,
+        password=config.REDIS_PASSWORD,
+        socket_connect_timeout=0.2,
+        socket_timeout=0.2,
+    ),
+    ips=config.BANNED_IPS,
+    user_agents=config.BANNED_USER_AGENTS,
+    interval=config.BANS_RELOAD_INTERVAL,
+)
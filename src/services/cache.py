@@ -0,0 +1,286 @@
+import json
+from collections import OrderedDict
+from datetime import datetime
+from hashlib import sha256
+from time import monotonic, time, time_ns
+from typing import Awaitable, Callable
+
+import redis
+import redis.asyncio as aioredis
+from sqlalchemy.orm import make_transient_to_detached
+from starlette.requests import Request
+from starlette.responses import Response
+
+from src.conf.config import config
+from src.entity.models import Role, User
+
+
+# the User columns kept in the cache; the password hash is read from the database only
+USER_FIELDS = ("id", "username", "email", "avatar", "created_at", "updated_at", "role", "confirmed")
+
+
+class UserCache:
+    """
+    Cache of User rows keyed by email.
+
+    A small in-process LRU sits in front of Redis. The local copy lives for a few seconds only,
+    because invalidations made by other workers reach Redis but not this process.
+    Entries are kept as JSON of the USER_FIELDS columns, password hash left out, and every hit hands out
+    a fresh detached User built from them, which can be attached to the caller's session without clashing
+    with other requests. Nothing read from Redis is ever unpickled or executed.
+    When Redis fails, it is skipped for a short while and only the local LRU is used.
+    """
+
+    prefix = "user:"
+    retry_after = 5.0
+
+    def __init__(self, client: aioredis.Redis, ttl: int, local_ttl: int, local_size: int):
+        self.client = client
+        self.ttl = ttl
+        self.local_ttl = local_ttl
+        self.local_size = local_size
+        self._local: OrderedDict[str, tuple[float, bytes]] = OrderedDict()
+        self._redis_down_until = 0.0
+
+    async def get(self, email: str):
+        entry = self._local.get(email)
+        if entry is not None:
+            expire, payload = entry
+            if expire > monotonic():
+                self._local.move_to_end(email)
+                return self._load(payload)
+            del self._local[email]
+        payload = await self._call(self.client.get, self.prefix + email)
+        if payload is None:
+            return None
+        try:
+            user = self._load(payload)
+        except (ValueError, TypeError, KeyError):
+            return None  # an entry in an older or foreign format counts as a miss and is overwritten
+        self._remember(email, payload)
+        return user
+
+    async def set(self, email: str, user) -> None:
+        payload = self._dump(user)
+        self._remember(email, payload)
+        await self._call(self.client.set, self.prefix + email, payload, ex=self.ttl)
+
+    async def invalidate(self, email: str) -> None:
+        self._local.pop(email, None)
+        await self._call(self.client.delete, self.prefix + email)
+
+    async def _call(self, method, *args, **kwargs):
+        if self._redis_down_until > monotonic():
+            return None
+        try:
+            return await method(*args, **kwargs)
+        except redis.RedisError:
+            self._redis_down_until = monotonic() + self.retry_after
+            return None
+
+    @staticmethod
+    def _dump(user: User) -> bytes:
+        fields = {name: getattr(user, name) for name in USER_FIELDS}
+        fields["role"] = fields["role"].value if isinstance(fields["role"], Role) else fields["role"]
+        for name in ("created_at", "updated_at"):
+            fields[name] = fields[name] and fields[name].isoformat()
+        return json.dumps(fields).encode()
+
+    @staticmethod
+    def _load(payload: bytes) -> User:
+        fields = json.loads(payload)
+        fields["role"] = fields["role"] and Role(fields["role"])
+        for name in ("created_at", "updated_at"):
+            fields[name] = fields[name] and datetime.fromisoformat(fields[name])
+        user = User(**fields)
+        # known to exist, so attaching it to a session or relating a contact to it never INSERTs it
+        make_transient_to_detached(user)
+        return user
+
+    def _remember(self, email: str, payload: bytes) -> None:
+        self._local[email] = (monotonic() + self.local_ttl, payload)
+        self._local.move_to_end(email)
+        while len(self._local) > self.local_size:
+            self._local.popitem(last=False)
+
+
+class TokenCache:
+    """
+    Bounded LRU of verified JWT payloads keyed by a digest of the token.
+
+    A hit skips the signature check, so only payloads that passed jwt.decode are stored,
+    and each entry is dropped once the token's exp has passed.
+    """
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._entries: OrderedDict[bytes, dict] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _key(token: str) -> bytes:
+        return sha256(token.encode()).digest()
+
+    def get(self, token: str) -> dict | None:
+        key = self._key(token)
+        payload = self._entries.get(key)
+        if payload is not None and payload["exp"] > time():
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return payload
+        if payload is not None:
+            del self._entries[key]
+        self.misses += 1
+        return None
+
+    def set(self, token: str, payload: dict) -> None:
+        if not isinstance(payload.get("exp"), (int, float)):
+            return
+        key = self._key(token)
+        self._entries[key] = payload
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+        }
+
+
+class ResponseCache:
+    """
+    Redis cache of per-user JSON responses with strong ETags.
+
+    Every user has a version counter that writes bump. The ETag is a digest of the user, the version,
+    the path and the sorted query parameters, so a matching If-None-Match is answered with 304
+    after a single Redis read. Bodies are cached under the same digest for ttl seconds.
+    A missing counter starts from the current time in nanoseconds, so a counter lost from Redis
+    never repeats a version that was already handed out.
+    A bump that fails, e.g. for a write during a Redis outage, marks the user dirty in this process:
+    their requests skip the cache and the bump is retried before every cache read until it succeeds,
+    so bodies and ETags from before the write are not served again once Redis is back.
+    """
+
+    retry_after = 5.0
+
+    def __init__(self, client: aioredis.Redis, prefix: str, ttl: int):
+        self.client = client
+        self.prefix = prefix
+        self.ttl = ttl
+        self._redis_down_until = 0.0
+        self._dirty: set[int] = set()
+
+    async def _call(self, command: Callable[[], Awaitable]):
+        if self._redis_down_until > monotonic():
+            return None
+        try:
+            return await command()
+        except redis.RedisError:
+            self._redis_down_until = monotonic() + self.retry_after
+            return None
+
+    def _version_key(self, user_id: int) -> str:
+        return f"{self.prefix}:version:{user_id}"
+
+    async def _pipeline(self, user_id: int, incr: bool):
+        async with self.client.pipeline(transaction=False) as pipe:
+            pipe.set(self._version_key(user_id), time_ns(), nx=True)
+            if incr:
+                pipe.incr(self._version_key(user_id))
+            else:
+                pipe.get(self._version_key(user_id))
+            return await pipe.execute()
+
+    async def version(self, user_id: int) -> int | None:
+        """The user's current version, or None when the cache must not be used for them right now."""
+        for dirty in list(self._dirty):
+            await self.bump(dirty)
+        if user_id in self._dirty:
+            return None
+        result = await self._call(lambda: self._pipeline(user_id, incr=False))
+        return int(result[1]) if result else None
+
+    async def bump(self, user_id: int) -> None:
+        if await self._call(lambda: self._pipeline(user_id, incr=True)):
+            self._dirty.discard(user_id)
+        else:
+            # until a bump gets through, this process serves the user without the cache
+            self._dirty.add(user_id)
+
+    @staticmethod
+    def etag_matches(header: str | None, etag: str) -> bool:
+        if not header:
+            return False
+        return etag in (tag.strip() for tag in header.split(","))
+
+    async def respond(self, request: Request, user_id: int,
+                      build: Callable[[], Awaitable[tuple[bytes, dict]]]) -> Response:
+        """
+        Answer from the cache, or call build() for the JSON body and extra headers and cache them.
+        If-None-Match: * only gets a 304 once a cached body or build() shows the resource exists;
+        build() raises for missing resources, so those still get their error.
+        """
+        version = await self.version(user_id)
+        if version is None:
+            body, headers = await build()
+            return Response(body, media_type="application/json", headers=headers)
+        query = sorted(request.query_params.multi_items())
+        digest = sha256(f"{user_id}:{version}:{request.url.path}?{query}".encode()).hexdigest()[:32]
+        etag = f'"{digest}"'
+        if_none_match = request.headers.get("if-none-match")
+        if self.etag_matches(if_none_match, etag):
+            return Response(status_code=304, headers={"ETag": etag})
+        wildcard = if_none_match is not None and if_none_match.strip() == "*"
+        key = f"{self.prefix}:body:{user_id}:{digest}"
+        cached = await self._call(lambda: self.client.hgetall(key))
+        if cached:
+            if wildcard:
+                return Response(status_code=304, headers={"ETag": etag})
+            headers = json.loads(cached[b"headers"])
+            return Response(cached[b"body"], media_type="application/json", headers={**headers, "ETag": etag})
+        body, headers = await build()
+        await self._call(lambda: self._store(key, body, headers))
+        if wildcard:
+            return Response(status_code=304, headers={"ETag": etag})
+        return Response(body, media_type="application/json", headers={**headers, "ETag": etag})
+
+    async def _store(self, key: str, body: bytes, headers: dict):
+        async with self.client.pipeline(transaction=True) as pipe:
+            pipe.hset(key, mapping={"body": body, "headers": json.dumps(headers)})
+            pipe.expire(key, self.ttl)
+            return await pipe.execute()
+
+
+user_cache = UserCache(
+    aioredis.Redis(
+        host=config.REDIS_DOMAIN,
+        port=config.REDIS_PORT,
+        db=0,
+        password=config.REDIS_PASSWORD,
+        socket_connect_timeout=0.2,
+        socket_timeout=0.2,
+    ),
+    ttl=config.USER_CACHE_TTL,
+    local_ttl=config.USER_CACHE_LOCAL_TTL,
+    local_size=config.USER_CACHE_LOCAL_SIZE,
+)
+token_cache = TokenCache(config.TOKEN_CACHE_SIZE)
+contacts_cache = ResponseCache(
+    aioredis.Redis(
+        host=config.REDIS_DOMAIN,
+        port=config.REDIS_PORT,
+        db=0,
+        password=config.REDIS_PASSWORD,
+        socket_connect_timeout=0.2,
+        socket_timeout=0.2,
+    ),
+    prefix="contacts",
+    ttl=config.CONTACTS_CACHE_TTL,
+)
@@ -0,0 +1,36 @@
+import csv
+import io
+import json
+from typing import AsyncIterator
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.repository import contacts as repository_contacts
+
+MEDIA_TYPES = {"csv": "text/csv", "ndjson": "application/x-ndjson"}
+FIELDS = [column.key for column in repository_contacts.EXPORT_COLUMNS]
+
+
+async def export_contacts(fmt: str, db: AsyncSession, user_id: int, batch_size: int) -> AsyncIterator[str]:
+    """
+    Yield the user's contacts as CSV or NDJSON text, one chunk per batch_size rows.
+    Rows come from a server-side cursor, so the result set is never held in memory.
+    The session is closed when the stream ends, since it outlives the request handler.
+    """
+    try:
+        if fmt == "csv":
+            buffer = io.StringIO()
+            writer = csv.writer(buffer)
+            writer.writerow(FIELDS)
+            async for rows in repository_contacts.stream_contacts(db, user_id, batch_size):
+                writer.writerows(rows)
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+            if buffer.tell():
+                yield buffer.getvalue()
+        else:
+            async for rows in repository_contacts.stream_contacts(db, user_id, batch_size):
+                yield "".join(json.dumps(dict(zip(FIELDS, row))) + "\n" for row in rows)
+    finally:
+        await db.close()
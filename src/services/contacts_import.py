@@ -0,0 +1,119 @@
+import asyncio
+import csv
+import io
+import json
+from typing import BinaryIO, Iterator
+
+from pydantic import ValidationError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.entity.models import User, parse_born_date, birthday_key
+from src.repository import contacts as repository_contacts
+from src.schemas.contact import ContactSchema
+
+
+def guess_format(filename: str | None, content_type: str | None) -> str | None:
+    name = (filename or "").lower()
+    if name.endswith(".csv") or content_type == "text/csv":
+        return "csv"
+    if name.endswith((".ndjson", ".jsonl")) or content_type in ("application/x-ndjson", "application/jsonl"):
+        return "ndjson"
+    return None
+
+
+def iter_records(file: BinaryIO, fmt: str) -> Iterator[tuple[dict | None, str | None]]:
+    """
+    Yield (record, error) pairs one data row at a time, reading the file lazily.
+    CSV needs a header row; NDJSON needs one JSON object per line, blank lines are skipped.
+    """
+    text = io.TextIOWrapper(file, encoding="utf-8-sig", newline="")
+    try:
+        if fmt == "csv":
+            for record in csv.DictReader(text):
+                yield {k: v for k, v in record.items() if k is not None and v not in ("", None)}, None
+            return
+        for line in text:
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError as err:
+                yield None, f"invalid JSON: {err}"
+                continue
+            if not isinstance(record, dict):
+                yield None, "expected a JSON object"
+                continue
+            yield record, None
+    finally:
+        text.detach()
+
+
+def validate_record(record: dict) -> tuple[dict | None, list[str]]:
+    try:
+        body = ContactSchema.model_validate(record)
+    except ValidationError as err:
+        return None, [f"{'.'.join(str(p) for p in e['loc'])}: {e['msg']}" for e in err.errors()]
+    values = body.model_dump()
+    if not isinstance(values["phone_number"], str):
+        return None, ["phone_number: Field required"]
+    values["birthday"] = parse_born_date(values["born_date"])
+    values["birthday_key"] = birthday_key(values["birthday"])
+    return values, []
+
+
+def read_rows(records: Iterator[tuple[int, tuple[dict | None, str | None]]], batch: list[tuple[int, dict]],
+              limit: int) -> tuple[list[tuple[int, list[str]]], bool]:
+    """
+    Read and validate numbered records into batch until it holds limit rows or limit rows have failed.
+    Return the failed rows with their errors, and whether the file is done. Blocking: runs in a thread.
+    """
+    failures = []
+    for row, (record, error) in records:
+        if error is not None:
+            failures.append((row, [error]))
+        else:
+            values, errors = validate_record(record)
+            if errors:
+                failures.append((row, errors))
+            else:
+                batch.append((row, values))
+        if len(batch) >= limit or len(failures) >= limit:
+            return failures, False
+    return failures, True
+
+
+async def import_contacts(file: BinaryIO, fmt: str, db: AsyncSession, user: User,
+                          batch_size: int, max_errors: int) -> dict:
+    """
+    Validate rows as they are read and insert them in batches of batch_size, committing each batch.
+    Rows are read and validated in a worker thread, a batch at a time, so a large file never blocks the event loop.
+    Memory use depends on the batch size and the number of reported errors, not on the file size.
+    At most max_errors row errors are reported; failed counts all of them.
+    """
+    report = {"imported": 0, "failed": 0, "errors": []}
+    user_id = user.id  # read once, commits expire the instance
+
+    def fail(rows: list[int], errors: list[str]):
+        report["failed"] += len(rows)
+        for row in rows:
+            if len(report["errors"]) < max_errors:
+                report["errors"].append({"row": row, "errors": errors})
+
+    async def flush(batch: list[tuple[int, dict]]):
+        try:
+            report["imported"] += await repository_contacts.create_contacts([v for _, v in batch], db, user_id)
+        except Exception as err:
+            await db.rollback()
+            fail([row for row, _ in batch], [f"database error: {err.__class__.__name__}"])
+        batch.clear()
+
+    records = enumerate(iter_records(file, fmt), start=1)
+    batch, done = [], False
+    while not done:
+        # reading the spooled upload and validating rows block, so only the inserts run on the event loop
+        failures, done = await asyncio.to_thread(read_rows, records, batch, batch_size)
+        for row, errors in failures:
+            fail([row], errors)
+        if len(batch) >= batch_size or (done and batch):
+            await flush(batch)
+    return report
@@ -1,40 +1,21 @@
-from pathlib import Path
-
-from fastapi_mail import FastMail, MessageSchema, ConnectionConfig, MessageType
-from fastapi_mail.errors import ConnectionErrors
 from pydantic import EmailStr
+from sqlalchemy.ext.asyncio import AsyncSession
 
+from src.repository import outbox as repository_outbox
 from src.services.auth import auth_service
-from src.conf.config import config
-
-
-conf = ConnectionConfig(
-    MAIL_USERNAME=config.MAIL_USERNAME,
-    MAIL_PASSWORD=config.MAIL_PASSWORD,
-    MAIL_FROM=config.MAIL_FROM,
-    MAIL_PORT=config.MAIL_PORT,
-    MAIL_SERVER=config.MAIL_SERVER,
-    MAIL_FROM_NAME="TODO System",
-    MAIL_STARTTLS=False,
-    MAIL_SSL_TLS=True,
-    USE_CREDENTIALS=True,
-    VALIDATE_CERTS=True,
-    TEMPLATE_FOLDER=Path(__file__).parent / 'templates',
-)
-
-
-async def send_email(email: EmailStr, username: str, host: str):
-    try:
-        token_veryfication = auth_service.create_email_token({'sub': email})
-        message = MessageSchema(
-            subject="Confirm your email",
-            recipients=[email],
-            template_body={"host": host, "username": username,"token": token_veryfication},
-            subtype=MessageType.html
-        )
 
-        fm = FastMail(conf)
-        await fm.send_message(message, template_name="verify_email.html")
-    except ConnectionErrors as err:
-        print(err)
 
+async def send_email(email: EmailStr, username: str, host: str, db: AsyncSession, commit: bool = True):
+    """
+    Queue the email verification message in the outbox, the email worker sends it.
+    Pass commit=False to commit the message together with the rest of the caller's transaction.
+    """
+    token_verification = auth_service.create_email_token({'sub': email})
+    await repository_outbox.enqueue_email(
+        email,
+        "Confirm your email",
+        "verify_email.html",
+        {"host": host, "username": username, "token": token_verification},
+        db,
+        commit=commit,
+    )
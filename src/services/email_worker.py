@@ -0,0 +1,219 @@
+"""
+Delivers the email outbox: python -m src.services.email_worker
+
+Due emails are claimed in batches and sent over one reused SMTP connection; each one is recorded as sent
+right after the server accepts it. Delivery is at-least-once: an email whose outcome could not be recorded
+is sent again once its claim runs out.
+Failures are retried with exponential backoff until EMAIL_OUTBOX_MAX_ATTEMPTS, 5xx replies are not retried.
+Every recipient domain has its own token bucket; emails over the limit are pushed back, not counted as attempts.
+"""
+import asyncio
+import time
+from datetime import datetime, timedelta
+from email.message import EmailMessage
+from email.utils import formataddr
+from pathlib import Path
+from typing import AsyncIterator
+
+import aiosmtplib
+from jinja2 import Environment, FileSystemLoader, select_autoescape
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.conf.config import config
+from src.database.db import sessionmanager
+from src.entity.models import EmailOutbox
+from src.repository import outbox as repository_outbox
+
+TEMPLATE_FOLDER = Path(__file__).parent / 'templates'
+
+templates = Environment(loader=FileSystemLoader(TEMPLATE_FOLDER), autoescape=select_autoescape())
+
+
+def build_message(email: EmailOutbox) -> EmailMessage:
+    message = EmailMessage()
+    message["From"] = formataddr((config.MAIL_FROM_NAME, config.MAIL_FROM))
+    message["To"] = email.recipient
+    message["Subject"] = email.subject
+    message.set_content(templates.get_template(email.template).render(**email.body), subtype="html")
+    return message
+
+
+def is_permanent(err: Exception) -> bool:
+    if isinstance(err, aiosmtplib.SMTPRecipientsRefused):
+        return all(r.code >= 500 for r in err.recipients)
+    return isinstance(err, aiosmtplib.SMTPResponseException) and err.code >= 500
+
+
+class SMTPSender:
+    """One SMTP connection, opened on first use and reused until it fails or close() is called."""
+
+    def __init__(self, hostname: str, port: int, username: str | None = None, password: str | None = None,
+                 use_tls: bool = False, start_tls: bool | None = False, timeout: float = 30):
+        self.options = dict(hostname=hostname, port=port, username=username, password=password,
+                            use_tls=use_tls, start_tls=start_tls, timeout=timeout)
+        self._smtp: aiosmtplib.SMTP | None = None
+        self.connections = 0
+
+    async def _connection(self) -> aiosmtplib.SMTP:
+        if self._smtp is None or not self._smtp.is_connected:
+            smtp = aiosmtplib.SMTP(**self.options)
+            await smtp.connect()
+            self._smtp = smtp
+            self.connections += 1
+        return self._smtp
+
+    async def send_each(self, messages: list[EmailMessage]) -> AsyncIterator[Exception | None]:
+        """Send messages in order, yielding None or the error for each one as soon as it is known."""
+        for i, message in enumerate(messages):
+            try:
+                smtp = await self._connection()
+            except (aiosmtplib.SMTPException, OSError) as err:
+                # nothing else can go out without a connection
+                await self.close()
+                for _ in messages[i:]:
+                    yield err
+                return
+            try:
+                await smtp.send_message(message)
+                yield None
+            except aiosmtplib.SMTPResponseException as err:
+                yield err
+            except (aiosmtplib.SMTPException, OSError) as err:
+                await self.close()
+                yield err
+
+    async def send_many(self, messages: list[EmailMessage]) -> list[Exception | None]:
+        """Send messages in order and return None or the error for each of them."""
+        return [err async for err in self.send_each(messages)]
+
+    async def close(self) -> None:
+        smtp, self._smtp = self._smtp, None
+        if smtp is None or not smtp.is_connected:
+            return
+        try:
+            await smtp.quit()
+        except (aiosmtplib.SMTPException, OSError):
+            smtp.close()
+
+
+class DomainRateLimiter:
+    """A token bucket per recipient domain: rate emails per second with bursts of up to burst."""
+
+    def __init__(self, rate: float, burst: int, clock=time.monotonic):
+        self.rate = rate
+        self.burst = burst
+        self.clock = clock
+        self._buckets: dict[str, tuple[float, float]] = {}
+
+    def acquire(self, domain: str) -> float:
+        """Take a token for domain; return 0 if one was available, otherwise the seconds until one is."""
+        if self.rate <= 0:
+            return 0.0
+        now = self.clock()
+        tokens, updated = self._buckets.get(domain, (self.burst, now))
+        tokens = min(self.burst, tokens + (now - updated) * self.rate)
+        if tokens >= 1:
+            self._buckets[domain] = (tokens - 1, now)
+            return 0.0
+        self._buckets[domain] = (tokens, now)
+        return (1 - tokens) / self.rate
+
+
+def retry_delay(attempts: int) -> float:
+    return min(config.EMAIL_RETRY_BASE * 2 ** (attempts - 1), config.EMAIL_RETRY_MAX)
+
+
+def record_result(email: EmailOutbox, err: Exception | None, now: datetime, max_attempts: int,
+                  permanent: bool = False) -> None:
+    email.attempts += 1
+    if err is None:
+        email.status = "sent"
+        email.sent_at = datetime.utcnow()
+        email.last_error = None
+        return
+    email.last_error = f"{err.__class__.__name__}: {err}"[:255]
+    if permanent or is_permanent(err) or email.attempts >= max_attempts:
+        email.status = "failed"
+    else:
+        email.next_attempt_at = now + timedelta(seconds=retry_delay(email.attempts))
+
+
+async def process_batch(db: AsyncSession, sender: SMTPSender, limiter: DomainRateLimiter, batch_size: int,
+                        max_attempts: int, now: datetime | None = None) -> int:
+    """
+    Claim up to batch_size due emails, send them and record the outcome of each as soon as it is known.
+    Return the number of emails that were sent or failed.
+
+    The claim is committed before anything is sent: the emails to send are leased by moving their
+    next_attempt_at EMAIL_OUTBOX_CLAIM_TIMEOUT ahead, so no row lock is held across SMTP round trips
+    and other workers skip them. Each email is then committed as sent or failed right after its SMTP reply.
+    Delivery is at-least-once: if the worker dies or that commit fails after the server accepted an email,
+    the lease runs out and the email is sent again.
+    """
+    now = now or datetime.utcnow()
+    emails = await repository_outbox.claim_emails(batch_size, db, now)
+    ready, messages, processed = [], [], 0
+    for email in emails:
+        wait = limiter.acquire(email.recipient.rpartition("@")[2].lower())
+        if wait:
+            email.next_attempt_at = now + timedelta(seconds=wait)
+            continue
+        try:
+            messages.append(build_message(email))
+        except Exception as err:
+            # a broken template or body will not render on a retry either
+            record_result(email, err, now, max_attempts, permanent=True)
+            processed += 1
+            continue
+        email.next_attempt_at = now + timedelta(seconds=config.EMAIL_OUTBOX_CLAIM_TIMEOUT)
+        ready.append(email)
+    await db.commit()
+    if not messages:
+        return processed
+    i = 0
+    async for err in sender.send_each(messages):
+        email = ready[i]
+        i += 1
+        # the commits expire loaded rows; the row is leased, so reading it back is safe
+        await db.refresh(email)
+        record_result(email, err, now, max_attempts)
+        await db.commit()
+    return processed + len(ready)
+
+
+async def run(sender: SMTPSender, limiter: DomainRateLimiter, stop: asyncio.Event | None = None) -> None:
+    stop = stop or asyncio.Event()
+    try:
+        while not stop.is_set():
+            processed = 0
+            async with sessionmanager.session() as db:
+                processed = await process_batch(db, sender, limiter, config.EMAIL_OUTBOX_BATCH_SIZE,
+                                                config.EMAIL_OUTBOX_MAX_ATTEMPTS)
+            if processed >= config.EMAIL_OUTBOX_BATCH_SIZE:
+                continue
+            if not processed:
+                # don't keep an idle connection open for the server to time out
+                await sender.close()
+            try:
+                await asyncio.wait_for(stop.wait(), config.EMAIL_OUTBOX_POLL_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+    finally:
+        await sender.close()
+
+
+async def main() -> None:
+    sender = SMTPSender(
+        hostname=config.MAIL_SERVER,
+        port=config.MAIL_PORT,
+        username=config.MAIL_USERNAME,
+        password=config.MAIL_PASSWORD,
+        use_tls=config.MAIL_SSL_TLS,
+        start_tls=config.MAIL_STARTTLS,
+        timeout=config.MAIL_TIMEOUT,
+    )
+    await run(sender, DomainRateLimiter(config.EMAIL_DOMAIN_RATE, config.EMAIL_DOMAIN_BURST))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
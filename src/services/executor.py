@@ -0,0 +1,71 @@
+import asyncio
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Callable
+
+
+class ExecutorBusy(Exception):
+    pass
+
+
+class BoundedExecutor:
+    """
+    Runs blocking callables in a thread or process pool so they do not stall the event loop.
+
+    At most max_workers calls run at once; up to max_pending more wait for a slot,
+    anything beyond that is rejected with ExecutorBusy instead of queueing without bound.
+    The pool itself is created on first use.
+    """
+
+    def __init__(self, kind: str, max_workers: int, max_pending: int, name: str = "executor"):
+        self.kind = kind
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self.name = name
+        self._executor: Executor | None = None
+        self._slots = asyncio.Semaphore(max_workers)
+        self.running = 0
+        self.pending = 0
+        self.completed = 0
+        self.rejected = 0
+
+    @property
+    def executor(self) -> Executor:
+        if self._executor is None:
+            if self.kind == "process":
+                self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+            else:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix=self.name)
+        return self._executor
+
+    async def run(self, fn: Callable, *args):
+        if self.pending >= self.max_pending:
+            self.rejected += 1
+            raise ExecutorBusy(self.name)
+        self.pending += 1
+        try:
+            await self._slots.acquire()
+        finally:
+            self.pending -= 1
+        self.running += 1
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self.executor, fn, *args)
+        finally:
+            self.running -= 1
+            self.completed += 1
+            self._slots.release()
+
+    def stats(self) -> dict:
+        return {
+            "kind": self.kind,
+            "max_workers": self.max_workers,
+            "max_pending": self.max_pending,
+            "running": self.running,
+            "pending": self.pending,
+            "completed": self.completed,
+            "rejected": self.rejected,
+        }
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
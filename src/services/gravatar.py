@@ -0,0 +1,15 @@
+from functools import lru_cache
+
+from src.conf.config import config
+
+
+@lru_cache(maxsize=config.GRAVATAR_CACHE_SIZE)
+def gravatar_url(email: str) -> str | None:
+    """The Gravatar image URL of email, derived on first read instead of at signup and memoized."""
+    from libgravatar import Gravatar
+
+    try:
+        return Gravatar(email).get_image()
+    except Exception as err:
+        print(err)
+        return None
@@ -0,0 +1,103 @@
+import asyncio
+from time import monotonic, perf_counter, time
+from typing import Awaitable, Callable
+
+from sqlalchemy import text
+
+from src.conf.config import config
+from src.database.db import sessionmanager
+from src.services.metrics import dependency_up
+from src.services.sessions import session_store
+
+
+async def check_database() -> None:
+    async with sessionmanager.engine.connect() as conn:
+        await conn.execute(text("SELECT 1"))
+
+
+async def check_redis() -> None:
+    await session_store.client.ping()
+
+
+async def check_mail() -> None:
+    # a TCP connect is enough to tell the server is reachable, without an SMTP session per check
+    _, writer = await asyncio.open_connection(config.MAIL_SERVER, config.MAIL_PORT)
+    writer.close()
+    await writer.wait_closed()
+
+
+class HealthMonitor:
+    """
+    Checks the app's dependencies every interval seconds in the background and keeps the last results,
+    so readiness probes are answered from memory: however often they come, the database sees one
+    connection checkout per interval.
+
+    The app is ready when every required check passed and the results are no older than stale_after;
+    failing optional checks only mark it degraded, as the features behind them fall back or fail on their own.
+    """
+
+    def __init__(self, checks: dict[str, Callable[[], Awaitable]], required: list[str], interval: float,
+                 timeout: float, stale_after: float):
+        self.checks = checks
+        self.required = required
+        self.interval = interval
+        self.timeout = timeout
+        self.stale_after = stale_after
+        self.results: dict[str, dict] = {}
+        self.last_run: float | None = None
+        self._task: asyncio.Task | None = None
+
+    async def _check(self, name: str, check: Callable[[], Awaitable]) -> None:
+        start = perf_counter()
+        try:
+            await asyncio.wait_for(check(), self.timeout)
+            error = None
+        except asyncio.TimeoutError:
+            error = f"no answer in {self.timeout}s"
+        except Exception as err:
+            error = f"{type(err).__name__}: {err}"
+        self.results[name] = {
+            "ok": error is None,
+            "latency_ms": round((perf_counter() - start) * 1000, 1),
+            "error": error,
+            "checked_at": round(time()),
+        }
+        dependency_up.set(int(error is None), name)
+
+    async def run_once(self) -> None:
+        await asyncio.gather(*[self._check(name, check) for name, check in self.checks.items()])
+        self.last_run = monotonic()
+
+    async def _watch(self) -> None:
+        while True:
+            await self.run_once()
+            await asyncio.sleep(self.interval)
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._watch())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    def status(self) -> tuple[bool, dict]:
+        """Whether the app is ready, and the report served by /readyz."""
+        fresh = self.last_run is not None and monotonic() - self.last_run <= self.stale_after
+        failing = [name for name, result in self.results.items() if not result["ok"]]
+        ready = fresh and all(self.results.get(name, {}).get("ok") for name in self.required)
+        if not ready:
+            status = "unavailable" if self.last_run is not None else "starting"
+        else:
+            status = "degraded" if failing else "ok"
+        return ready, {"status": status, "checks": self.results}
+
+
+health_monitor = HealthMonitor(
+    {"database": check_database, "redis": check_redis, "mail": check_mail},
+    required=config.HEALTH_REQUIRED,
+    interval=config.HEALTH_CHECK_INTERVAL,
+    timeout=config.HEALTH_CHECK_TIMEOUT,
+    stale_after=config.HEALTH_STALE_AFTER,
+)
@@ -0,0 +1,134 @@
+from bisect import bisect_left
+from typing import Iterator
+
+# seconds; from a cache hit up to a slow bcrypt hash or a long export
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: tuple[str, ...], values: tuple, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Metric:
+    """
+    Base of the per-process metrics. Series are plain lists keyed by label values and only ever
+    updated from the event loop thread, so recording a value takes no lock and allocates nothing
+    once its series exists.
+    """
+
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self._series: dict[tuple, list] = {}
+
+    def _new_series(self) -> list:
+        return [0]
+
+    def series(self, labels: tuple) -> list:
+        series = self._series.get(labels)
+        if series is None:
+            series = self._series[labels] = self._new_series()
+        return series
+
+    def samples(self) -> Iterator[str]:
+        for labels, series in self._series.items():
+            yield f"{self.name}{_labels(self.labelnames, labels)} {series[0]}"
+
+    def render(self) -> Iterator[str]:
+        yield f"# HELP {self.name} {self.documentation}"
+        yield f"# TYPE {self.name} {self.kind}"
+        yield from self.samples()
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def inc(self, *labels, amount: float = 1) -> None:
+        self.series(labels)[0] += amount
+
+
+class Gauge(Metric):
+    kind = "gauge"
+
+    def inc(self, *labels, amount: float = 1) -> None:
+        self.series(labels)[0] += amount
+
+    def dec(self, *labels, amount: float = 1) -> None:
+        self.series(labels)[0] -= amount
+
+    def set(self, value: float, *labels) -> None:
+        self.series(labels)[0] = value
+
+
+class Histogram(Metric):
+    """Counts per bucket are kept non-cumulative and summed up only when rendered."""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple[str, ...] = (),
+                 buckets: tuple[float, ...] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = buckets
+
+    def _new_series(self) -> list:
+        # one slot per bucket, one for +Inf, then the sum
+        return [0] * (len(self.buckets) + 1) + [0.0]
+
+    def observe(self, value: float, *labels) -> None:
+        series = self.series(labels)
+        series[bisect_left(self.buckets, value)] += 1
+        series[-1] += value
+
+    def samples(self) -> Iterator[str]:
+        for labels, series in self._series.items():
+            total = 0
+            for bound, count in zip((*self.buckets, "+Inf"), series):
+                total += count
+                le = 'le="' + str(bound) + '"'
+                yield f"{self.name}_bucket{_labels(self.labelnames, labels, le)} {total}"
+            yield f"{self.name}_sum{_labels(self.labelnames, labels)} {series[-1]}"
+            yield f"{self.name}_count{_labels(self.labelnames, labels)} {total}"
+
+
+class Registry:
+    def __init__(self):
+        self.metrics: list[Metric] = []
+
+    def register(self, metric: Metric):
+        self.metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        return "\n".join(line for metric in self.metrics for line in metric.render()) + "\n"
+
+
+registry = Registry()
+
+http_requests = registry.register(Counter(
+    "http_requests_total", "HTTP requests by method, route template and status code.", ("method", "route", "status")
+))
+http_request_duration = registry.register(Histogram(
+    "http_request_duration_seconds", "HTTP request latency by method and route template.", ("method", "route")
+))
+http_requests_in_flight = registry.register(Gauge(
+    "http_requests_in_flight", "HTTP requests being served by this process.", ("method",)
+))
+db_statement_duration = registry.register(Histogram(
+    "db_statement_duration_seconds", "SQL statement execution time by statement type.", ("operation",)
+))
+auth_duration = registry.register(Histogram(
+    "auth_operation_duration_seconds", "Password hashing and JWT time by operation.", ("operation",)
+))
+dependency_up = registry.register(Gauge(
+    "dependency_up", "1 when the last background health check of the dependency passed.", ("dependency",)
+))
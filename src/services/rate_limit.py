@@ -0,0 +1,198 @@
+import math
+from collections import OrderedDict
+from time import monotonic
+from uuid import uuid4
+
+import redis
+import redis.asyncio as aioredis
+from redis.asyncio.retry import Retry
+from redis.backoff import NoBackoff
+from fastapi import HTTPException, Request, status
+from jose import JWTError
+
+from src.conf import messages
+from src.conf.config import config, parse_rate
+from src.services.auth import auth_service
+
+# Sliding-window log: one sorted-set member per granted request, scored by Redis server time in ms.
+# First gives back the unspent end of the caller's previous lease, members ARGV[5]:ARGV[6] to ARGV[5]:ARGV[7].
+# Then grants up to ARGV[3] requests at once, named ARGV[4]:1 and on, and returns
+# {granted, ms until the oldest member leaves the window}.
+SLIDING_WINDOW = """
+local limit = tonumber(ARGV[1])
+local window = tonumber(ARGV[2])
+local requested = tonumber(ARGV[3])
+for i = tonumber(ARGV[6]), tonumber(ARGV[7]) do
+    redis.call('ZREM', KEYS[1], ARGV[5] .. ':' .. i)
+end
+local time = redis.call('TIME')
+local now = tonumber(time[1]) * 1000 + math.floor(tonumber(time[2]) / 1000)
+redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', now - window)
+local granted = math.min(requested, limit - redis.call('ZCARD', KEYS[1]))
+if granted > 0 then
+    for i = 1, granted do
+        redis.call('ZADD', KEYS[1], now, ARGV[4] .. ':' .. i)
+    end
+    redis.call('PEXPIRE', KEYS[1], window)
+    return {granted, 0}
+end
+local oldest = redis.call('ZRANGE', KEYS[1], 0, 0, 'WITHSCORES')
+local retry = window
+if oldest[2] then
+    retry = math.max(1, tonumber(oldest[2]) + window - now)
+end
+return {0, retry}
+"""
+
+
+class HybridRateLimiter:
+    """
+    Sliding-window rate limits shared by all workers through one Lua script, with a per-process pre-filter.
+
+    Each process leases a small share of a window (lease_fraction of the limit, at least one request)
+    and spends it locally until it runs out or lease_ttl passes, so allowed traffic mostly skips Redis.
+    A key Redis has refused is refused locally until its retry time, so blocked traffic skips it as well.
+    The unspent part of an expired lease is given back on the next call to Redis for the key, so only
+    the lease currently held by each process counts in the window without having been used.
+    When Redis fails it is skipped for a short while and every process falls back to its own token bucket
+    of the same rate; limits then apply per process instead of globally.
+    """
+
+    prefix = "ratelimit"
+    retry_after = 5.0
+
+    def __init__(self, client: aioredis.Redis, policies: dict[str, str], overrides: dict[str, dict[str, str]],
+                 lease_fraction: float, lease_ttl: float, local_size: int, clock=monotonic):
+        self.client = client
+        self.script = client.register_script(SLIDING_WINDOW)
+        self.policies = {name: parse_rate(rate) for name, rate in policies.items()}
+        self.overrides = {
+            identity: {name: parse_rate(rate) for name, rate in rates.items()} for identity, rates in overrides.items()
+        }
+        self.lease_fraction = lease_fraction
+        self.lease_ttl = lease_ttl
+        self.local_size = local_size
+        self.clock = clock
+        # key -> [leased requests left, lease expiry, blocked until, lease nonce, lease size] while Redis is up,
+        # key -> [tokens, last refill] in the local-only fallback
+        self._leases: OrderedDict[str, list] = OrderedDict()
+        self._buckets: OrderedDict[str, list[float]] = OrderedDict()
+        self._redis_down_until = 0.0
+        self.counters = {"local_allowed": 0, "local_blocked": 0, "redis_calls": 0, "degraded": 0}
+
+    def policy(self, name: str, identity: str) -> tuple[int, float]:
+        return self.overrides.get(identity, {}).get(name) or self.policies[name]
+
+    async def hit(self, name: str, identity: str) -> float:
+        """Count one request of identity against policy name; return 0 if allowed, else seconds to wait."""
+        times, seconds = self.policy(name, identity)
+        key = f"{self.prefix}:{name}:{identity}"
+        now = self.clock()
+        lease = self._entry(self._leases, key, [0, 0.0, 0.0, "", 0])
+        if lease[0] >= 1 and lease[1] > now:
+            lease[0] -= 1
+            self.counters["local_allowed"] += 1
+            return 0.0
+        if lease[2] > now:
+            self.counters["local_blocked"] += 1
+            return lease[2] - now
+        if self._redis_down_until > now:
+            return self._local_hit(key, times, seconds, now)
+        self.counters["redis_calls"] += 1
+        # the lease's members are spent in order, so the unspent ones are the last int(lease[0])
+        unspent, size = int(lease[0]), lease[4]
+        nonce = uuid4().hex
+        try:
+            granted, retry_ms = await self.script(keys=[key], args=[
+                times, int(seconds * 1000), max(1, int(times * self.lease_fraction)), nonce,
+                lease[3], size - unspent + 1, size,
+            ])
+        except redis.RedisError:
+            self._redis_down_until = now + self.retry_after
+            return self._local_hit(key, times, seconds, now)
+        now = self.clock()
+        if granted:
+            lease[:] = [granted - 1, now + min(self.lease_ttl, seconds), 0.0, nonce, granted]
+            return 0.0
+        lease[:] = [0, 0.0, now + retry_ms / 1000, "", 0]
+        return retry_ms / 1000
+
+    def _local_hit(self, key: str, times: int, seconds: float, now: float) -> float:
+        self.counters["degraded"] += 1
+        bucket = self._entry(self._buckets, key, [times, now])
+        rate = times / seconds
+        bucket[0] = min(times, bucket[0] + (now - bucket[1]) * rate)
+        bucket[1] = now
+        if bucket[0] >= 1:
+            bucket[0] -= 1
+            return 0.0
+        return (1 - bucket[0]) / rate
+
+    def _entry(self, entries: OrderedDict, key: str, default: list) -> list:
+        entry = entries.get(key)
+        if entry is None:
+            entry = entries[key] = default
+            while len(entries) > self.local_size:
+                entries.popitem(last=False)
+        else:
+            entries.move_to_end(key)
+        return entry
+
+    def stats(self) -> dict:
+        return {
+            **self.counters,
+            "keys": len(self._leases) + len(self._buckets),
+            "degraded_mode": self._redis_down_until > self.clock(),
+        }
+
+
+rate_limiter = HybridRateLimiter(
+    aioredis.Redis(
+        host=config.REDIS_DOMAIN,
+        port=config.REDIS_PORT,
+        db=0,
+        password=config.REDIS_PASSWORD,
+        socket_connect_timeout=0.2,
+        socket_timeout=0.2,
+        # fail over to the local buckets at once rather than retrying on the request path
+        retry=Retry(NoBackoff(), 0),
+    ),
+    policies=config.RATE_LIMITS,
+    overrides=config.RATE_LIMIT_OVERRIDES,
+    lease_fraction=config.RATE_LIMIT_LEASE_FRACTION,
+    lease_ttl=config.RATE_LIMIT_LEASE_TTL,
+    local_size=config.RATE_LIMIT_LOCAL_SIZE,
+)
+
+
+def request_identity(request: Request) -> str:
+    """The email of a valid bearer access token, otherwise the client address."""
+    scheme, _, token = request.headers.get("authorization", "").partition(" ")
+    if scheme.lower() == "bearer" and token:
+        try:
+            payload = auth_service.decode_token(token)
+            if payload.get("scope") == "access_token" and payload.get("sub"):
+                return payload["sub"]
+        except JWTError:
+            pass
+    return request.client.host if request.client else "unknown"
+
+
+class RateLimit:
+    """Route dependency applying the RATE_LIMITS policy called name."""
+
+    def __init__(self, name: str):
+        if name not in rate_limiter.policies:
+            raise ValueError(f"no rate limit policy named {name}")
+        self.name = name
+
+    async def __call__(self, request: Request):
+        if not config.RATE_LIMIT_ENABLED:
+            return
+        wait = await rate_limiter.hit(self.name, request_identity(request))
+        if wait:
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail=messages.TOO_MANY_REQUESTS,
+                headers={"Retry-After": str(math.ceil(wait))},
+            )
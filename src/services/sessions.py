@@ -0,0 +1,163 @@
+from functools import wraps
+from time import time
+from uuid import uuid4
+
+import redis
+import redis.asyncio as aioredis
+from redis.asyncio.retry import Retry
+from redis.backoff import NoBackoff
+from fastapi import HTTPException, status
+
+from src.conf import messages
+from src.conf.config import config
+
+# KEYS: session hash, the user's session set; ARGV: presented jti, new jti, now, ttl, session id.
+# Returns 1 when rotated, 0 when the session is gone, -1 when an already rotated token came back.
+ROTATE = """
+local current = redis.call('HGET', KEYS[1], 'jti')
+if not current then
+    redis.call('SREM', KEYS[2], ARGV[5])
+    return 0
+end
+if current ~= ARGV[1] then
+    redis.call('DEL', KEYS[1])
+    redis.call('SREM', KEYS[2], ARGV[5])
+    return -1
+end
+redis.call('HSET', KEYS[1], 'jti', ARGV[2], 'last_used', ARGV[3])
+redis.call('EXPIRE', KEYS[1], ARGV[4])
+redis.call('EXPIRE', KEYS[2], ARGV[4])
+return 1
+"""
+
+# KEYS: session hash, the user's session set; ARGV: presented jti, session id.
+# Ends the session only when the presented token is its current one; returns 1 when it did.
+LOGOUT = """
+if redis.call('HGET', KEYS[1], 'jti') ~= ARGV[1] then
+    return 0
+end
+redis.call('DEL', KEYS[1])
+redis.call('SREM', KEYS[2], ARGV[2])
+return 1
+"""
+
+ROTATED, MISSING, REUSED = 1, 0, -1
+
+
+def _unavailable(method):
+    @wraps(method)
+    async def wrapper(*args, **kwargs):
+        try:
+            return await method(*args, **kwargs)
+        except redis.RedisError:
+            raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                                detail=messages.SESSIONS_UNAVAILABLE)
+    return wrapper
+
+
+class RefreshTokenStore:
+    """
+    Refresh token families, one per login session, kept in Redis.
+
+    A session is the hash refresh:session:<sid> holding the email, the device and the jti of the one refresh token
+    currently valid for it; refresh:user:<email> is the set of the user's session ids. Refreshing swaps the jti in
+    a single script, so each refresh token works once. A token presented after it was rotated means it leaked,
+    and the whole session is revoked. Sessions expire ttl seconds after their last refresh, and revoking one
+    is a single DEL. Nothing is written to the database.
+    """
+
+    prefix = "refresh"
+
+    def __init__(self, client: aioredis.Redis, ttl: int):
+        self.client = client
+        self.ttl = ttl
+        self.rotate_script = client.register_script(ROTATE)
+        self.logout_script = client.register_script(LOGOUT)
+
+    def session_key(self, sid: str) -> str:
+        return f"{self.prefix}:session:{sid}"
+
+    def user_key(self, email: str) -> str:
+        return f"{self.prefix}:user:{email}"
+
+    @_unavailable
+    async def create(self, email: str, device: str | None) -> tuple[str, str]:
+        """Start a session; return its id and the jti of its first refresh token."""
+        sid, jti = uuid4().hex, uuid4().hex
+        now = int(time())
+        async with self.client.pipeline(transaction=True) as pipe:
+            pipe.hset(self.session_key(sid), mapping={
+                "email": email, "jti": jti, "device": (device or "")[:200], "created_at": now, "last_used": now,
+            })
+            pipe.expire(self.session_key(sid), self.ttl)
+            pipe.sadd(self.user_key(email), sid)
+            pipe.expire(self.user_key(email), self.ttl)
+            await pipe.execute()
+        return sid, jti
+
+    @_unavailable
+    async def rotate(self, email: str, sid: str, jti: str) -> tuple[int, str | None]:
+        """Replace the session's refresh token jti; return ROTATED and the new jti, or MISSING or REUSED."""
+        new_jti = uuid4().hex
+        result = await self.rotate_script(
+            keys=[self.session_key(sid), self.user_key(email)], args=[jti, new_jti, int(time()), self.ttl, sid]
+        )
+        return int(result), new_jti if int(result) == ROTATED else None
+
+    @_unavailable
+    async def logout(self, email: str, sid: str, jti: str) -> bool:
+        """End the session if jti is its current refresh token; a rotated-out token cannot end it."""
+        result = await self.logout_script(keys=[self.session_key(sid), self.user_key(email)], args=[jti, sid])
+        return bool(result)
+
+    @_unavailable
+    async def sessions(self, email: str) -> list[dict]:
+        sids = sorted(sid.decode() for sid in await self.client.smembers(self.user_key(email)))
+        async with self.client.pipeline(transaction=False) as pipe:
+            for sid in sids:
+                pipe.hgetall(self.session_key(sid))
+            hashes = await pipe.execute()
+        sessions, expired = [], []
+        for sid, fields in zip(sids, hashes):
+            if not fields:
+                expired.append(sid)
+                continue
+            fields = {key.decode(): value.decode() for key, value in fields.items()}
+            sessions.append({
+                "id": sid,
+                "device": fields["device"] or None,
+                "created_at": int(fields["created_at"]),
+                "last_used": int(fields["last_used"]),
+            })
+        if expired:
+            await self.client.srem(self.user_key(email), *expired)
+        return sessions
+
+    @_unavailable
+    async def revoke(self, email: str, sid: str) -> bool:
+        # the set membership check keeps users from revoking sessions that are not theirs
+        if not await self.client.srem(self.user_key(email), sid):
+            return False
+        await self.client.delete(self.session_key(sid))
+        return True
+
+    @_unavailable
+    async def revoke_all(self, email: str) -> int:
+        sids = await self.client.smembers(self.user_key(email))
+        await self.client.delete(self.user_key(email), *[self.session_key(sid.decode()) for sid in sids])
+        return len(sids)
+
+
+session_store = RefreshTokenStore(
+    aioredis.Redis(
+        host=config.REDIS_DOMAIN,
+        port=config.REDIS_PORT,
+        db=0,
+        password=config.REDIS_PASSWORD,
+        socket_connect_timeout=0.2,
+        socket_timeout=0.2,
+        # answer 503 at once instead of retrying on the request path
+        retry=Retry(NoBackoff(), 0),
+    ),
+    ttl=config.REFRESH_TOKEN_TTL,
+)
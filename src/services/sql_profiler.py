@@ -0,0 +1,135 @@
+import re
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from time import perf_counter
+from typing import Iterator
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from src.conf.config import config
+
+# bind parameter styles of asyncpg/psycopg/named, then string and number literals
+_PARAMETERS = re.compile(r"\$\d+|%\(\w+\)s|%s|(?<!:):\w+")
+_LITERALS = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+_LISTS = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_TABLES = re.compile(r"\b(?:FROM|JOIN)\s+\"?(\w+)\"?", re.IGNORECASE)
+
+
+def normalize(statement: str) -> str:
+    """The shape of a statement: literals and parameters replaced by ?, IN lists collapsed, whitespace squeezed."""
+    shape = _LITERALS.sub("?", _PARAMETERS.sub("?", statement))
+    shape = _LISTS.sub("(?, ...)", shape)
+    return " ".join(shape.split())
+
+
+@dataclass
+class Statement:
+    shape: str
+    statement: str
+    duration: float
+
+
+class QueryProfile:
+    """
+    Statements executed while the profile is active, with the two usual signs of an N+1:
+    one shape executed repeatedly, and one table read by several SELECTs (e.g. a row fetched on its own
+    and again through a joined load).
+    """
+
+    def __init__(self, threshold: int = config.SQL_PROFILER_REPEAT_THRESHOLD):
+        self.threshold = threshold
+        self.statements: list[Statement] = []
+
+    def record(self, statement: str, duration: float) -> None:
+        self.statements.append(Statement(normalize(statement), statement, duration))
+
+    @property
+    def count(self) -> int:
+        return len(self.statements)
+
+    @property
+    def duration(self) -> float:
+        return sum(statement.duration for statement in self.statements)
+
+    def repeated(self) -> dict[str, int]:
+        shapes = Counter(statement.shape for statement in self.statements)
+        return {shape: count for shape, count in shapes.items() if count >= self.threshold}
+
+    def tables_read(self) -> dict[str, int]:
+        """Tables read by more than one SELECT, with the number of SELECTs reading them."""
+        tables = Counter(
+            table
+            for statement in self.statements
+            if statement.shape.lstrip().upper().startswith(("SELECT", "WITH"))
+            for table in set(_TABLES.findall(statement.shape))
+        )
+        return {table: count for table, count in tables.items() if count > 1}
+
+    def report(self) -> str:
+        lines = [f"{self.count} queries in {self.duration * 1000:.1f}ms"]
+        lines += [f"  {count}x {shape}" for shape, count in self.repeated().items()]
+        lines += [f"  table {table} read by {count} SELECTs" for table, count in self.tables_read().items()]
+        return "\n".join(lines)
+
+
+_request_profile: ContextVar[QueryProfile | None] = ContextVar("sql_profile", default=None)
+# profiles recording every statement in the process, whichever thread or task runs it
+_captures: list[QueryProfile] = []
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    if _captures or _request_profile.get() is not None:
+        context._profiler_started_at = perf_counter()
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    started_at = getattr(context, "_profiler_started_at", None)
+    if started_at is None:
+        return
+    duration = perf_counter() - started_at
+    profile = _request_profile.get()
+    if profile is not None:
+        profile.record(statement, duration)
+    for capture in _captures:
+        capture.record(statement, duration)
+
+
+@contextmanager
+def request_profile(threshold: int = config.SQL_PROFILER_REPEAT_THRESHOLD) -> Iterator[QueryProfile]:
+    """Profile the statements of the current task and the threads it hands work to."""
+    profile = QueryProfile(threshold)
+    token = _request_profile.set(profile)
+    try:
+        yield profile
+    finally:
+        _request_profile.reset(token)
+
+
+@contextmanager
+def capture_queries(threshold: int = config.SQL_PROFILER_REPEAT_THRESHOLD) -> Iterator[QueryProfile]:
+    """Profile every statement the process executes inside the block, e.g. behind a TestClient."""
+    profile = QueryProfile(threshold)
+    _captures.append(profile)
+    try:
+        yield profile
+    finally:
+        _captures.remove(profile)
+
+
+@contextmanager
+def assert_max_queries(limit: int, allow_repeats: bool = False) -> Iterator[QueryProfile]:
+    """
+    Fail when the block executes more than limit statements or, unless allow_repeats, repeats a statement shape:
+
+        with assert_max_queries(2):
+            client.get("/api/contacts/")
+    """
+    with capture_queries() as profile:
+        yield profile
+    assert profile.count <= limit, f"expected at most {limit} queries, got {profile.report()}"
+    assert allow_repeats or not profile.repeated(), f"repeated queries: {profile.report()}"
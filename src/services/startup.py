@@ -0,0 +1,93 @@
+"""
+Cold start timings.
+
+In the app: main imports this module first, so IMPORT_STARTED marks the start of importing the app and
+mark() records how far into startup each phase ends; /api/internal/startup reports them.
+
+From the command line, the import time of every module, measured with python -X importtime in a fresh
+interpreter and summed up per package:
+
+    python -m src.services.startup [--module main] [--top 20] [--json]
+"""
+import argparse
+import json
+import subprocess
+import sys
+from collections import defaultdict
+from time import perf_counter
+
+IMPORT_STARTED = perf_counter()
+phases: dict[str, float] = {}
+
+
+def mark(phase: str) -> None:
+    """Record the milliseconds from the start of the app import to the end of phase."""
+    phases[phase] = round((perf_counter() - IMPORT_STARTED) * 1000, 1)
+
+
+def stats() -> dict:
+    return {"phases_ms": phases}
+
+
+def parse_importtime(output: str) -> list[dict]:
+    """Rows of python -X importtime output as dicts, in import order."""
+    rows = []
+    for line in output.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        if not self_us.strip().isdigit():
+            continue  # the header
+        rows.append({
+            "module": name.strip(),
+            "depth": (len(name) - len(name.lstrip()) - 1) // 2,
+            "self_ms": int(self_us) / 1000,
+            "cumulative_ms": int(cumulative_us) / 1000,
+        })
+    return rows
+
+
+def measure(module: str) -> list[dict]:
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                            capture_output=True, text=True)
+    if result.returncode:
+        raise SystemExit(result.stderr)
+    return parse_importtime(result.stderr)
+
+
+def summarize(rows: list[dict], module: str, top: int) -> dict:
+    packages = defaultdict(float)
+    for row in rows:
+        packages[row["module"].split(".")[0]] += row["self_ms"]
+    total = next((row["cumulative_ms"] for row in rows if row["module"] == module), sum(packages.values()))
+    own = [row for row in rows if row["module"] == module or row["module"].startswith("src.")]
+    return {
+        "module": module,
+        "total_ms": total,
+        "packages": dict(sorted(packages.items(), key=lambda item: -item[1])[:top]),
+        "app_modules": {row["module"]: row["cumulative_ms"]
+                        for row in sorted(own, key=lambda row: -row["cumulative_ms"])[:top]},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--module", default="main")
+    parser.add_argument("--top", type=int, default=20)
+    parser.add_argument("--json", action="store_true", help="print the summary as JSON, e.g. to track it in CI")
+    args = parser.parse_args()
+    summary = summarize(measure(args.module), args.module, args.top)
+    if args.json:
+        print(json.dumps(summary, indent=2))
+        return
+    print(f"import {args.module}: {summary['total_ms']:.1f} ms")
+    print(f"\n{'package (self time)':<40} {'ms':>8}")
+    for name, ms in summary["packages"].items():
+        print(f"{name:<40} {ms:>8.1f}")
+    print(f"\n{'app module (with its imports)':<40} {'ms':>8}")
+    for name, ms in summary["app_modules"].items():
+        print(f"{name:<40} {ms:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
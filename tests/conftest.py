@@ -31,7 +31,7 @@ test_user = {
 
 @pytest.fixture(scope="module", autouse=True)
 def init_models_wrap():
-        """
+    """
 The init_models_wrap function is a wrapper function that allows us to run the init_models function
 synchronously. This is necessary because we need to initialize our database before running any tests, and
 the pytest-asyncio plugin does not allow for synchronous code in test functions.
@@ -44,7 +44,7 @@ the pytest-asyncio plugin does not allow for synchronous code in test functions.
             await conn.run_sync(Base.metadata.drop_all)
             await conn.run_sync(Base.metadata.create_all)
         async with TestingSessionLocal() as session:
-            hash_password = auth_service.get_password_hash(test_user["password"])
+            hash_password = await auth_service.get_password_hash(test_user["password"])
             current_user = User(
                 username=test_user["username"],
                 email=test_user["email"],
@@ -1,4 +1,5 @@
-from unittest.mock import Mock
+from collections import OrderedDict
+from unittest.mock import Mock, AsyncMock
 
 import pytest
 from sqlalchemy import select
@@ -6,6 +7,8 @@ from sqlalchemy import select
 from src.entity.models import User
 from tests.conftest import TestingSessionLocal
 from src.conf import messages
+from src.services.rate_limit import rate_limiter
+from src.services.sessions import RefreshTokenStore
 
 user_data = {
     "username": "agent007",
@@ -15,7 +18,7 @@ user_data = {
 
 
 def test_signup(client, monkeypatch):
-    mock_send_email = Mock()
+    mock_send_email = AsyncMock()
     monkeypatch.setattr("src.routes.auth.send_email", mock_send_email)
     response = client.post("api/auth/signup", json=user_data)
     assert response.status_code == 201, response.text
@@ -23,11 +26,11 @@ def test_signup(client, monkeypatch):
     assert data["username"] == user_data["username"]
     assert data["email"] == user_data["email"]
     assert "password" not in data
-    assert "avatar" in data
+    assert data["avatar"].startswith("https://www.gravatar.com/avatar/")
 
 
 def test_repeat_signup(client, monkeypatch):
-    mock_send_email = Mock()
+    mock_send_email = AsyncMock()
     monkeypatch.setattr("src.routes.auth.send_email", mock_send_email)
     response = client.post("api/auth/signup", json=user_data)
     assert response.status_code == 409, response.text
@@ -49,7 +52,8 @@ def test_not_confirmed_login(client):
 
 
 @pytest.mark.asyncio
-async def test_login(client):
+async def test_login(client, monkeypatch):
+    monkeypatch.setattr("src.routes.auth.session_store.create", AsyncMock(return_value=("sid", "jti")))
     async with TestingSessionLocal() as session:
         current_user = await session.execute(
             select(User).where(User.email == user_data.get("email"))
@@ -109,3 +113,57 @@ def test_validation_error_login(client):
     assert response.status_code == 422, response.text
     data = response.json()
     assert "details" in data
+
+
+def test_login_rate_limit(client, monkeypatch):
+    monkeypatch.setitem(rate_limiter.policies, "auth:login", (1, 60))
+    monkeypatch.setattr(rate_limiter, "_leases", OrderedDict())
+    monkeypatch.setattr(rate_limiter, "_buckets", OrderedDict())
+    monkeypatch.setattr("src.routes.auth.session_store.create", AsyncMock(return_value=("sid", "jti")))
+    form = {"username": user_data.get("email"), "password": user_data.get("password")}
+    assert client.post("api/auth/login", data=form).status_code == 200
+    response = client.post("api/auth/login", data=form)
+    assert response.status_code == 429, response.text
+    assert response.json()["detail"] == messages.TOO_MANY_REQUESTS
+    assert int(response.headers["Retry-After"]) > 0
+
+
+def test_refresh_token_rotation(client, monkeypatch):
+    fakeredis = pytest.importorskip("fakeredis")
+    pytest.importorskip("lupa")
+    monkeypatch.setattr("src.routes.auth.session_store", RefreshTokenStore(fakeredis.FakeAsyncRedis(), ttl=3600))
+    login = {"username": user_data["email"], "password": user_data["password"]}
+    first = client.post("api/auth/login", data=login, headers={"User-Agent": "phone"}).json()
+    client.post("api/auth/login", data=login, headers={"User-Agent": "laptop"})
+
+    response = client.get("api/auth/refresh_token", headers={"Authorization": f"Bearer {first['refresh_token']}"})
+    assert response.status_code == 200, response.text
+    rotated = response.json()
+    response = client.get("api/auth/sessions", headers={"Authorization": f"Bearer {rotated['access_token']}"})
+    assert response.status_code == 200, response.text
+    assert sorted(session["device"] for session in response.json()) == ["laptop", "phone"]
+
+    # reusing the first refresh token revokes the phone session, the laptop stays logged in
+    response = client.get("api/auth/refresh_token", headers={"Authorization": f"Bearer {first['refresh_token']}"})
+    assert response.status_code == 401, response.text
+    assert response.json()["detail"] == messages.REFRESH_TOKEN_REUSED
+    response = client.get("api/auth/refresh_token", headers={"Authorization": f"Bearer {rotated['refresh_token']}"})
+    assert response.status_code == 401, response.text
+    response = client.get("api/auth/sessions", headers={"Authorization": f"Bearer {rotated['access_token']}"})
+    assert [session["device"] for session in response.json()] == ["laptop"]
+
+    response = client.delete("api/auth/sessions", headers={"Authorization": f"Bearer {rotated['access_token']}"})
+    assert response.status_code == 204, response.text
+    response = client.get("api/auth/sessions", headers={"Authorization": f"Bearer {rotated['access_token']}"})
+    assert response.json() == []
+
+    # logging out takes the session's current refresh token, not one it was rotated away from
+    tablet = client.post("api/auth/login", data=login, headers={"User-Agent": "tablet"}).json()
+    response = client.get("api/auth/refresh_token", headers={"Authorization": f"Bearer {tablet['refresh_token']}"})
+    current = response.json()
+    response = client.post("api/auth/logout", headers={"Authorization": f"Bearer {tablet['refresh_token']}"})
+    assert response.status_code == 401, response.text
+    response = client.post("api/auth/logout", headers={"Authorization": f"Bearer {current['refresh_token']}"})
+    assert response.status_code == 204, response.text
+    response = client.get("api/auth/sessions", headers={"Authorization": f"Bearer {current['access_token']}"})
+    assert response.json() == []
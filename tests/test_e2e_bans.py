@@ -0,0 +1,19 @@
+from src.services.bans import ban_service, BanMatcher
+
+
+def test_banned_user_agent(client, monkeypatch):
+    monkeypatch.setattr(ban_service, "matcher", BanMatcher([], ["EvilBot"]))
+    response = client.get("/api/healthchecker", headers={"User-Agent": "EvilBot/1.0"})
+    assert response.status_code == 403, response.text
+    assert response.json()["detail"] == "You are banned"
+
+
+def test_missing_user_agent(client, monkeypatch):
+    monkeypatch.setattr(ban_service, "matcher", BanMatcher([], ["EvilBot"]))
+    user_agent = client.headers.pop("user-agent", None)
+    try:
+        response = client.get("/api/healthchecker")
+    finally:
+        if user_agent is not None:
+            client.headers["user-agent"] = user_agent
+    assert response.status_code == 200, response.text
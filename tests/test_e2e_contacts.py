@@ -1,6 +1,15 @@
-from unittest.mock import Mock, patch
+import json
+from datetime import date
+from unittest.mock import Mock, patch, AsyncMock
 import pytest
+from sqlalchemy import select, insert, delete
+from src.conf import messages
+from src.conf.config import config
+from src.entity.models import Contact, User
+from src.repository.contacts import get_upcoming_birthdays
 from src.services.auth import auth_service
+from src.services.sql_profiler import assert_max_queries
+from tests.conftest import TestingSessionLocal, test_user
 
 
 def test_get_contacts(client, get_token):
@@ -16,7 +25,7 @@ to ensure that it contains no contacts.
 :return: An empty list
 :doc-author: Trelent
 """
-    with patch.object(auth_service, "cache") as redis_mock:
+    with patch.object(auth_service, "cache", AsyncMock()) as redis_mock:
         redis_mock.get.return_value = None
         token = get_token
         headers = {"Authorization": f"Bearer {token}"}
@@ -40,7 +49,7 @@ The test_create_contact function tests the creation of a contact.
 :return: A 201 status code and the contact data
 :doc-author: Trelent
 """
-    with patch.object(auth_service, "cache") as redis_mock:
+    with patch.object(auth_service, "cache", AsyncMock()) as redis_mock:
         redis_mock.get.return_value = None
         token = get_token
         headers = {"Authorization": f"Bearer {token}"}
@@ -52,3 +61,202 @@ The test_create_contact function tests the creation of a contact.
         assert 'id' in data
         assert data["title"] == "test"
         assert data["description"] == "test"
+
+
+def test_get_contacts_invalid_cursor(client, get_token):
+    with patch.object(auth_service, "cache", AsyncMock()) as redis_mock:
+        redis_mock.get.return_value = None
+        headers = {"Authorization": f"Bearer {get_token}"}
+        response = client.get("/api/contacts", headers=headers, params={"cursor": "not-a-cursor"})
+        assert response.status_code == 400, response.text
+        assert response.json()["detail"] == messages.INVALID_CURSOR
+
+
+@pytest.mark.asyncio
+async def test_get_contacts_cursor_pages(client, get_token):
+    async with TestingSessionLocal() as session:
+        user = (await session.execute(select(User).filter_by(email=test_user["email"]))).scalar_one()
+        await session.execute(insert(Contact), [
+            {"first_name": f"first{i}", "last_name": f"last{i}", "email": f"page{i}@example.com",
+             "phone_number": f"380{i:09d}", "born_date": "2000-01-01", "user_id": user.id}
+            for i in range(25)
+        ])
+        await session.commit()
+        expected = (await session.execute(
+            select(Contact.id).filter_by(user_id=user.id).order_by(Contact.id)
+        )).scalars().all()
+    try:
+        with patch.object(auth_service, "cache", AsyncMock()) as redis_mock:
+            redis_mock.get.return_value = None
+            headers = {"Authorization": f"Bearer {get_token}"}
+            seen, pages, cursor = [], [], None
+            while True:
+                params = {"limit": 10} if cursor is None else {"limit": 10, "cursor": cursor}
+                response = client.get("/api/contacts", headers=headers, params=params)
+                assert response.status_code == 200, response.text
+                page = [contact["id"] for contact in response.json()]
+                pages.append(len(page))
+                seen.extend(page)
+                cursor = response.headers.get("X-Next-Cursor")
+                if cursor is None:
+                    break
+            assert len(pages) >= 3
+            # browser clients on other origins can read the cursor
+            response = client.get("/api/contacts", headers={**headers, "Origin": "https://app.example.com"})
+            assert "X-Next-Cursor" in response.headers["Access-Control-Expose-Headers"]
+            assert all(size == 10 for size in pages[:-1]) and pages[-1] < 10
+            # no overlaps and nothing skipped
+            assert seen == expected
+    finally:
+        async with TestingSessionLocal() as session:
+            await session.execute(delete(Contact).filter(Contact.email.like("page%@example.com")))
+            await session.commit()
+
+
+def test_import_contacts(client, get_token):
+    with patch.object(auth_service, "cache", AsyncMock()) as redis_mock:
+        redis_mock.get.return_value = None
+        headers = {"Authorization": f"Bearer {get_token}"}
+        content = (
+            "first_name,last_name,email,phone_number,born_date\n"
+            "Peter,Parker,peter@example.com,380501234567,2001-08-10\n"
+            "Tony,Stark,not-an-email,380501234568,1970-05-29\n"
+        )
+        response = client.post(
+            "/api/contacts/import", headers=headers, files={"file": ("contacts.csv", content, "text/csv")}
+        )
+        assert response.status_code == 200, response.text
+        data = response.json()
+        assert data["imported"] == 1
+        assert data["failed"] == 1
+        assert data["errors"][0]["row"] == 2
+        assert data["errors"][0]["errors"][0].startswith("email")
+
+
+def test_import_contacts_unknown_format(client, get_token):
+    with patch.object(auth_service, "cache", AsyncMock()) as redis_mock:
+        redis_mock.get.return_value = None
+        headers = {"Authorization": f"Bearer {get_token}"}
+        response = client.post(
+            "/api/contacts/import", headers=headers, files={"file": ("contacts.txt", "", "text/plain")}
+        )
+        assert response.status_code == 415, response.text
+
+
+def test_export_contacts(client, get_token):
+    with patch.object(auth_service, "cache", AsyncMock()) as redis_mock:
+        redis_mock.get.return_value = None
+        headers = {"Authorization": f"Bearer {get_token}"}
+        response = client.get("/api/contacts/export", headers=headers, params={"format": "csv"})
+        assert response.status_code == 200, response.text
+        assert response.headers["content-type"].startswith("text/csv")
+        lines = response.text.splitlines()
+        assert lines[0] == "id,first_name,last_name,email,phone_number,born_date,completed"
+        assert len(lines) == 2
+        response = client.get("/api/contacts/export", headers=headers)
+        assert response.status_code == 200, response.text
+        contacts = [json.loads(line) for line in response.text.splitlines()]
+        assert contacts[0]["email"] == "peter@example.com"
+
+
+def test_search_contacts(client, get_token):
+    with patch.object(auth_service, "cache", AsyncMock()) as redis_mock:
+        redis_mock.get.return_value = None
+        headers = {"Authorization": f"Bearer {get_token}"}
+        for q in ("ETER", "pa", "0501234567"):
+            response = client.get("/api/contacts/search", headers=headers, params={"q": q})
+            assert response.status_code == 200, response.text
+            data = response.json()
+            assert len(data) == 1
+            assert data[0]["email"] == "peter@example.com"
+        response = client.get("/api/contacts/search", headers=headers, params={"q": "nobody"})
+        assert response.status_code == 200, response.text
+        assert response.json() == []
+
+
+@pytest.mark.asyncio
+async def test_upcoming_birthdays(client, get_token):
+    with patch.object(auth_service, "cache", AsyncMock()) as redis_mock:
+        redis_mock.get.return_value = None
+        headers = {"Authorization": f"Bearer {get_token}"}
+        contact = {
+            "first_name": "Janus",
+            "last_name": "Bifrons",
+            "email": "janus@example.com",
+            "phone_number": "380501234569",
+            "born_date": "05.01.1985",
+        }
+        response = client.post("/api/contacts", headers=headers, json=contact)
+        assert response.status_code == 201, response.text
+        assert response.json()["birthday"] == "1985-01-05"
+        response = client.get("/api/contacts/birthdays", headers=headers, params={"days": 366})
+        assert response.status_code == 200, response.text
+        assert {c["email"] for c in response.json()} == {"peter@example.com", "janus@example.com"}
+
+    async with TestingSessionLocal() as session:
+        user = (await session.execute(select(User).filter_by(email=test_user["email"]))).scalar_one()
+        contacts = await get_upcoming_birthdays(10, 100, session, user, today=date(2024, 12, 30))
+        assert [c.email for c in contacts] == ["janus@example.com"]
+        contacts = await get_upcoming_birthdays(7, 100, session, user, today=date(2024, 8, 5))
+        assert [c.email for c in contacts] == ["peter@example.com"]
+
+
+def test_get_contacts_fields(client, get_token):
+    with patch.object(auth_service, "cache", AsyncMock()) as redis_mock:
+        redis_mock.get.return_value = None
+        headers = {"Authorization": f"Bearer {get_token}"}
+        response = client.get("/api/contacts", headers=headers, params={"fields": "first_name,phone_number"})
+        assert response.status_code == 200, response.text
+        data = response.json()
+        assert data[0] == {"id": data[0]["id"], "first_name": "Peter", "phone_number": "380501234567"}
+        response = client.get(f"/api/contacts/{data[0]['id']}", headers=headers, params={"fields": "email,user"})
+        assert response.status_code == 200, response.text
+        contact = response.json()
+        assert contact["email"] == "peter@example.com"
+        assert contact["user"]["email"] == test_user["email"]
+        assert contact["user"]["role"] == "admin"
+        response = client.get("/api/contacts", headers=headers, params={"fields": "password"})
+        assert response.status_code == 400, response.text
+        assert response.json()["detail"] == messages.INVALID_FIELDS
+
+
+def test_bulk_update_and_delete(client, get_token):
+    with patch.object(auth_service, "cache", AsyncMock()) as redis_mock:
+        redis_mock.get.return_value = None
+        headers = {"Authorization": f"Bearer {get_token}"}
+        contacts = client.get("/api/contacts", headers=headers).json()
+        ids = sorted(contact["id"] for contact in contacts)
+        assert len(ids) == 2
+        response = client.post(
+            "/api/contacts/bulk/update", headers=headers,
+            json={"ids": [*ids, 100000], "values": {"completed": True}},
+        )
+        assert response.status_code == 200, response.text
+        assert response.json() == {"ids": ids, "count": 2}
+        response = client.post(
+            "/api/contacts/bulk/delete", headers=headers, json={"ids": ids[1:], "filter": {"completed": True}}
+        )
+        assert response.status_code == 200, response.text
+        assert response.json() == {"ids": ids[1:], "count": 1}
+        for body in ({}, {"filter": {}}, {"filter": {"completed": None}}):
+            response = client.post("/api/contacts/bulk/delete", headers=headers, json=body)
+            assert response.status_code == 422, response.text
+        response = client.post(
+            "/api/contacts/bulk/update", headers=headers, json={"all": True, "values": {"completed": False}}
+        )
+        assert response.status_code == 200, response.text
+        assert response.json() == {"ids": ids[:1], "count": 1}
+        assert [contact["id"] for contact in client.get("/api/contacts", headers=headers).json()] == ids[:1]
+
+
+def test_get_contacts_query_budget(client, get_token, monkeypatch):
+    monkeypatch.setattr(config, "SQL_PROFILER_ENABLED", True)
+    with patch.object(auth_service, "cache", AsyncMock()) as redis_mock:
+        redis_mock.get.return_value = None
+        headers = {"Authorization": f"Bearer {get_token}"}
+        with assert_max_queries(2):
+            response = client.get("/api/contacts/", headers=headers)
+        assert response.status_code == 200, response.text
+        assert response.headers["X-SQL-Queries"] == "2"
+        assert response.headers["X-SQL-Repeated"] == "0"
+        assert response.headers["Server-Timing"].startswith("sql;dur=")
@@ -0,0 +1,34 @@
+import pytest
+
+from src.services.health import HealthMonitor
+
+
+async def passing():
+    pass
+
+
+async def failing():
+    raise ConnectionError("refused")
+
+
+def test_livez(client):
+    response = client.get("/livez")
+    assert response.status_code == 200, response.text
+    assert response.json() == {"status": "ok"}
+
+
+@pytest.mark.asyncio
+async def test_readyz(client, monkeypatch):
+    monitor = HealthMonitor({"database": passing, "redis": failing}, required=["database"], interval=5, timeout=1,
+                            stale_after=30)
+    monkeypatch.setattr("main.health_monitor", monitor)
+    response = client.get("/readyz")
+    assert response.status_code == 503, response.text
+    assert response.json()["status"] == "starting"
+
+    await monitor.run_once()
+    response = client.get("/readyz")
+    assert response.status_code == 200, response.text
+    assert response.json()["status"] == "degraded"
+    assert response.json()["checks"]["redis"]["ok"] is False
+    assert 'dependency_up{dependency="database"} 1' in client.get("/metrics").text
@@ -0,0 +1,32 @@
+from unittest.mock import patch, AsyncMock
+
+from src.services.auth import auth_service
+
+
+def test_pool_stats(client, get_token):
+    with patch.object(auth_service, "cache", AsyncMock()) as redis_mock:
+        redis_mock.get.return_value = None
+        headers = {"Authorization": f"Bearer {get_token}"}
+        response = client.get("/api/internal/pool", headers=headers)
+        assert response.status_code == 200, response.text
+        data = response.json()
+        assert data["pool"] == "InstrumentedPool"
+        assert data["checked_out"] == 0
+        assert "wait_max_ms" in data
+        assert "hold_avg_ms" in data
+
+
+def test_auth_stats(client, get_token):
+    with patch.object(auth_service, "cache", AsyncMock()) as redis_mock:
+        redis_mock.get.return_value = None
+        headers = {"Authorization": f"Bearer {get_token}"}
+        response = client.get("/api/internal/auth", headers=headers)
+        assert response.status_code == 200, response.text
+        data = response.json()
+        assert data["password_hashing"]["kind"] == "thread"
+        assert data["token_cache"]["size"] >= 1
+
+
+def test_internal_requires_auth(client):
+    response = client.get("/api/internal/pool")
+    assert response.status_code == 401, response.text
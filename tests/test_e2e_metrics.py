@@ -0,0 +1,13 @@
+def test_metrics(client, get_token):
+    client.get("/api/healthchecker")
+    client.get("/api/contacts/?limit=1", headers={"Authorization": f"Bearer {get_token}"})
+    client.get("/api/no-such-route")
+    response = client.get("/metrics")
+    assert response.status_code == 200, response.text
+    assert response.headers["content-type"].startswith("text/plain")
+    text = response.text
+    assert 'http_requests_total{method="GET",route="/api/healthchecker",status="200"}' in text
+    assert 'http_request_duration_seconds_bucket{method="GET",route="/api/contacts/",le="+Inf"}' in text
+    assert 'http_requests_total{method="GET",route="<unmatched>",status="404"}' in text
+    assert 'auth_operation_duration_seconds_count{operation="jwt_encode"}' in text
+
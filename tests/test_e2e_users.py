@@ -1,28 +1,79 @@
+import io
 from unittest.mock import Mock, patch, AsyncMock
+
 import pytest
+from PIL import Image
+
+from src.conf import messages
 from src.services.auth import auth_service
+from src.services.avatars import avatar_pipeline, LocalStorage
+from src.services.executor import BoundedExecutor
 
 
-def test_get_me(client, get_token, monkeypatch):
+def test_get_me(client, get_token):
     """
 The test_get_me function tests the /api/users/me endpoint.
-It does so by first patching the auth_service's cache with a mock redis object, and then setting up mocks for
-the FastAPILimiter class' redis, identifier, and http_callback methods. It then creates a token using get_token
-and adds it to an Authorization header before sending a GET request to /api/users/me. Finally it asserts that the
-response status code is 200.
+It does so by first patching the auth_service's cache with a mock redis object. It then creates a token using
+get_token and adds it to an Authorization header before sending a GET request to /api/users/me. Finally it asserts
+that the response status code is 200.
 
 :param client: Make requests to the api
 :param get_token: Get the token from the fixture
-:param monkeypatch: Mock the redis, identifier and http_callback functions
 :return: The user's information
 :doc-author: Trelent
 """    
-    with patch.object(auth_service, "cache") as redis_mock:
+    with patch.object(auth_service, "cache", AsyncMock()) as redis_mock:
         redis_mock.get.return_value = None
-        monkeypatch.setattr("fastapi_limiter.FastAPILimiter.redis", AsyncMock())
-        monkeypatch.setattr("fastapi_limiter.FastAPILimiter.identifier", AsyncMock())
-        monkeypatch.setattr("fastapi_limiter.FastAPILimiter.http_callback", AsyncMock())
         token = get_token
         headers = {"Authorization": f"Bearer {token}"}
         response = client.get("/api/users/me", headers=headers)
         assert response.status_code == 200, response.text
+
+
+def png(width: int, height: int) -> bytes:
+    buffer = io.BytesIO()
+    Image.new("RGB", (width, height), "red").save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+@pytest.fixture
+def avatar_client(client, monkeypatch, tmp_path):
+    monkeypatch.setattr(avatar_pipeline, "storage", LocalStorage(str(tmp_path), "/static/avatars"))
+    monkeypatch.setattr(avatar_pipeline, "executor", BoundedExecutor("thread", max_workers=1, max_pending=1))
+    with patch.object(auth_service, "cache", AsyncMock()) as redis_mock:
+        redis_mock.get.return_value = None
+        yield client
+
+
+def test_update_avatar(avatar_client, get_token, tmp_path):
+    headers = {"Authorization": f"Bearer {get_token}"}
+    files = {"file": ("avatar.png", png(640, 480), "image/png")}
+    response = avatar_client.patch("/api/users/avatar", headers=headers, files=files)
+    assert response.status_code == 200, response.text
+    avatar = response.json()["avatar"]
+    assert avatar.startswith("/static/avatars/")
+    stored = tmp_path / avatar.removeprefix("/static/avatars/").split("?")[0]
+    with Image.open(stored) as image:
+        assert image.size == (250, 250)
+
+
+def test_update_avatar_rejects_non_images(avatar_client, get_token):
+    headers = {"Authorization": f"Bearer {get_token}"}
+    files = {"file": ("avatar.png", b"not an image", "image/png")}
+    response = avatar_client.patch("/api/users/avatar", headers=headers, files=files)
+    assert response.status_code == 415, response.text
+    assert response.json()["detail"] == messages.AVATAR_TYPE_NOT_ALLOWED
+    files = {"file": ("avatar.txt", b"hello", "text/plain")}
+    response = avatar_client.patch("/api/users/avatar", headers=headers, files=files)
+    assert response.status_code == 415, response.text
+    files = {"file": ("avatar.webp", b"RIFF\x00\x00\x00\x00WAVEfmt ", "image/webp")}
+    response = avatar_client.patch("/api/users/avatar", headers=headers, files=files)
+    assert response.status_code == 415, response.text
+
+
+def test_update_avatar_rejects_large_requests_early(client):
+    # refused from Content-Length alone, before authentication or reading the body
+    files = {"file": ("avatar.png", b"\x00" * (6 * 1024 * 1024), "image/png")}
+    response = client.patch("/api/users/avatar", files=files)
+    assert response.status_code == 413, response.text
+    assert response.json()["detail"] == messages.AVATAR_TOO_LARGE
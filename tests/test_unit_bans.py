@@ -0,0 +1,86 @@
+import asyncio
+import random
+import re
+import unittest
+from unittest.mock import AsyncMock, MagicMock
+
+from src.services.bans import BanMatcher, BanService, trie_pattern
+
+
+class TestTriePattern(unittest.TestCase):
+    def test_matches_like_searching_each_word(self):
+        rng = random.Random(17)
+        words = ["".join(rng.choices("abc.+", k=rng.randint(1, 6))) for _ in range(300)]
+        pattern = re.compile(trie_pattern(words))
+        for _ in range(500):
+            text = "".join(rng.choices("abc.+xy", k=rng.randint(0, 12)))
+            self.assertEqual(pattern.search(text) is not None, any(word in text for word in words), text)
+
+
+class TestBanMatcher(unittest.TestCase):
+    def setUp(self) -> None:
+        self.matcher = BanMatcher(
+            ["192.168.1.1", "10.0.0.0/8", "2001:db8::/32", "not an ip"],
+            ["EvilBot", "curl/", r"^python-requests/\d+", "[broken"],
+        )
+
+    def test_ips(self):
+        self.assertTrue(self.matcher.ip_banned("192.168.1.1"))
+        self.assertFalse(self.matcher.ip_banned("192.168.1.2"))
+        self.assertTrue(self.matcher.ip_banned("10.20.30.40"))
+        self.assertFalse(self.matcher.ip_banned("11.0.0.1"))
+        self.assertTrue(self.matcher.ip_banned("2001:db8::1"))
+        self.assertTrue(self.matcher.ip_banned("::ffff:10.1.1.1"))
+        self.assertFalse(self.matcher.ip_banned("2001:db9::1"))
+        self.assertFalse(self.matcher.ip_banned("testclient"))
+        self.assertFalse(self.matcher.ip_banned(None))
+
+    def test_user_agents(self):
+        self.assertTrue(self.matcher.user_agent_banned("Mozilla/5.0 (compatible; EvilBot/2.1)"))
+        self.assertTrue(self.matcher.user_agent_banned("curl/8.4.0"))
+        self.assertTrue(self.matcher.user_agent_banned("python-requests/2.31"))
+        self.assertFalse(self.matcher.user_agent_banned("my python-requests/2.31"))
+        self.assertFalse(self.matcher.user_agent_banned("Mozilla/5.0 (X11; Linux x86_64) Firefox/120.0"))
+        self.assertFalse(self.matcher.user_agent_banned(None))
+        self.assertEqual(self.matcher.stats(), {"ipv4_networks": 2, "ipv6_networks": 1, "user_agents": 4})
+
+    def test_regexes_that_cannot_be_joined(self):
+        matcher = BanMatcher([], ["(?i)curl", r"zz(b)\1", "(?P<bot>Bot)X", "Spider"])
+        self.assertTrue(matcher.user_agent_banned("CURL/8.4.0"))
+        self.assertTrue(matcher.user_agent_banned("zzbb"))
+        self.assertFalse(matcher.user_agent_banned("zzb"))
+        self.assertTrue(matcher.user_agent_banned("BotX"))
+        self.assertTrue(matcher.user_agent_banned("Spider/1"))
+        self.assertFalse(matcher.user_agent_banned("Mozilla/5.0"))
+
+    def test_empty_lists(self):
+        matcher = BanMatcher([], [])
+        self.assertFalse(matcher.is_banned("10.0.0.1", "EvilBot"))
+
+
+class TestBanService(unittest.IsolatedAsyncioTestCase):
+    async def test_reload_on_version_change(self):
+        client = MagicMock()
+        client.get = AsyncMock(return_value=b"1")
+        client.smembers = AsyncMock(side_effect=[{b"203.0.113.0/24"}, {b"EvilBot"}])
+        service = BanService(client, ["192.168.1.1"], [], interval=5)
+        self.assertFalse(service.matcher.is_banned("203.0.113.7", None))
+        self.assertTrue(await service.reload())
+        self.assertTrue(service.matcher.is_banned("203.0.113.7", None))
+        self.assertTrue(service.matcher.is_banned("192.168.1.1", None))
+        self.assertTrue(service.matcher.is_banned(None, "EvilBot/1.0"))
+        self.assertFalse(await service.reload())
+        self.assertEqual(client.smembers.await_count, 2)
+        self.assertEqual(service.stats()["version"], 1)
+
+    async def test_watch_survives_errors(self):
+        client = MagicMock()
+        client.get = AsyncMock(side_effect=[ValueError("bad ban"), b"1"])
+        client.smembers = AsyncMock(side_effect=[set(), {b"EvilBot"}])
+        service = BanService(client, [], [], interval=0)
+        service.start()
+        for _ in range(20):
+            await asyncio.sleep(0)
+        await service.stop()
+        self.assertEqual(service.version, b"1")
+        self.assertTrue(service.matcher.is_banned(None, "EvilBot/1.0"))
@@ -0,0 +1,227 @@
+import unittest
+from time import time
+from unittest.mock import MagicMock, AsyncMock, patch
+
+import pytest
+import redis
+from fastapi import HTTPException
+from sqlalchemy import inspect
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.requests import Request
+
+from src.entity.models import Contact, Role, User
+from src.repository import contacts as repository_contacts
+from src.repository import users as repository_users
+from src.schemas.contact import ContactSchema, ContactUpdateSchema
+from src.services.cache import UserCache, TokenCache, ResponseCache
+
+
+class TestUserCache(unittest.IsolatedAsyncioTestCase):
+    def setUp(self) -> None:
+        self.client = AsyncMock()
+        self.client.get.return_value = None
+        self.cache = UserCache(self.client, ttl=300, local_ttl=10, local_size=2)
+        self.user = User(id=1, username="test_user", email="test@example.com", confirmed=True,
+                         password="$2b$12$hash", role=Role.admin)
+
+    async def test_miss(self):
+        self.assertIsNone(await self.cache.get("test@example.com"))
+        self.client.get.assert_awaited_once_with("user:test@example.com")
+
+    async def test_local_hit_skips_redis(self):
+        await self.cache.set("test@example.com", self.user)
+        result = await self.cache.get("test@example.com")
+        self.client.get.assert_not_awaited()
+        self.assertIsNot(result, self.user)
+        self.assertEqual(result.email, self.user.email)
+
+    async def test_entries_are_json_without_password(self):
+        await self.cache.set("test@example.com", self.user)
+        payload = self.client.set.await_args.args[1]
+        self.assertNotIn(b"hash", payload)
+        self.client.get.return_value = payload
+        self.cache._local.clear()
+        user = await self.cache.get("test@example.com")
+        self.assertEqual((user.id, user.email, user.role), (1, "test@example.com", Role.admin))
+        self.assertTrue(inspect(user).detached)
+        self.client.get.return_value = b"\x80\x04\x95 pickled"
+        self.cache._local.clear()
+        self.assertIsNone(await self.cache.get("test@example.com"))
+
+    async def test_invalidate(self):
+        await self.cache.set("test@example.com", self.user)
+        await self.cache.invalidate("test@example.com")
+        self.client.delete.assert_awaited_once_with("user:test@example.com")
+        self.assertIsNone(await self.cache.get("test@example.com"))
+
+    async def test_local_lru_eviction(self):
+        for i in range(3):
+            await self.cache.set(f"user{i}@example.com", self.user)
+        self.assertNotIn("user0@example.com", self.cache._local)
+        self.assertEqual(len(self.cache._local), 2)
+
+    async def test_redis_error_falls_back(self):
+        self.client.get.side_effect = redis.ConnectionError
+        self.assertIsNone(await self.cache.get("test@example.com"))
+        self.assertIsNone(await self.cache.get("test@example.com"))
+        self.client.get.assert_awaited_once()
+
+
+class TestTokenCache(unittest.TestCase):
+    def setUp(self) -> None:
+        self.cache = TokenCache(maxsize=2)
+        self.payload = {"sub": "test@example.com", "scope": "access_token", "exp": int(time()) + 60}
+
+    def test_hit(self):
+        self.cache.set("token", self.payload)
+        self.assertEqual(self.cache.get("token"), self.payload)
+        self.assertIsNone(self.cache.get("other"))
+        stats = self.cache.stats()
+        self.assertEqual(stats["hits"], 1)
+        self.assertEqual(stats["misses"], 1)
+        self.assertEqual(stats["hit_ratio"], 0.5)
+
+    def test_expired_entry_is_dropped(self):
+        self.cache.set("token", {**self.payload, "exp": int(time()) - 1})
+        self.assertIsNone(self.cache.get("token"))
+        self.assertEqual(self.cache.stats()["size"], 0)
+
+    def test_payload_without_exp_is_not_cached(self):
+        self.cache.set("token", {"sub": "test@example.com"})
+        self.assertEqual(self.cache.stats()["size"], 0)
+
+    def test_lru_eviction(self):
+        for token in ("a", "b", "c"):
+            self.cache.set(token, self.payload)
+        self.assertIsNone(self.cache.get("a"))
+        self.assertEqual(self.cache.stats()["size"], 2)
+
+
+class TestResponseCache(unittest.IsolatedAsyncioTestCase):
+    def setUp(self) -> None:
+        self.client = MagicMock()
+        self.client.hgetall = AsyncMock(return_value={})
+        self.cache = ResponseCache(self.client, prefix="contacts", ttl=300)
+        self.cache.version = AsyncMock(return_value=7)
+        self.cache._store = AsyncMock()
+        self.build = AsyncMock(return_value=(b"[]", {"X-Next-Cursor": "MTA"}))
+
+    @staticmethod
+    def request(headers: dict | None = None) -> Request:
+        return Request({
+            "type": "http",
+            "method": "GET",
+            "path": "/api/contacts/",
+            "query_string": b"limit=10",
+            "headers": [(k.lower().encode(), v.encode()) for k, v in (headers or {}).items()],
+        })
+
+    async def test_miss_builds_and_stores(self):
+        response = await self.cache.respond(self.request(), 1, self.build)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.body, b"[]")
+        self.assertEqual(response.headers["x-next-cursor"], "MTA")
+        self.assertTrue(response.headers["etag"].startswith('"'))
+        self.build.assert_awaited_once()
+        self.cache._store.assert_awaited_once()
+
+    async def test_if_none_match(self):
+        etag = (await self.cache.respond(self.request(), 1, self.build)).headers["etag"]
+        response = await self.cache.respond(self.request({"If-None-Match": etag}), 1, self.build)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(self.build.await_count, 1)
+
+    async def test_version_change_changes_etag(self):
+        etag = (await self.cache.respond(self.request(), 1, self.build)).headers["etag"]
+        self.cache.version.return_value = 8
+        response = await self.cache.respond(self.request({"If-None-Match": etag}), 1, self.build)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response.headers["etag"], etag)
+
+    async def test_wildcard_needs_existing_resource(self):
+        response = await self.cache.respond(self.request({"If-None-Match": "*"}), 1, self.build)
+        self.assertEqual(response.status_code, 304)
+        self.build.side_effect = HTTPException(status_code=404)
+        with self.assertRaises(HTTPException):
+            await self.cache.respond(self.request({"If-None-Match": "*"}), 1, self.build)
+
+    async def test_cached_body(self):
+        self.client.hgetall.return_value = {b"body": b"[1]", b"headers": b"{}"}
+        response = await self.cache.respond(self.request(), 1, self.build)
+        self.assertEqual(response.body, b"[1]")
+        self.build.assert_not_awaited()
+
+    async def test_redis_unavailable(self):
+        self.cache.version.return_value = None
+        response = await self.cache.respond(self.request(), 1, self.build)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn("etag", response.headers)
+
+
+class TestResponseCacheInvalidation(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self) -> None:
+        fakeredis = pytest.importorskip("fakeredis")
+        self.server = fakeredis.FakeServer()
+        self.cache = ResponseCache(fakeredis.FakeAsyncRedis(server=self.server), prefix="contacts", ttl=300)
+        patcher = patch.object(repository_contacts, "contacts_cache", self.cache)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.user = User(id=1, username="test_user", email="test@example.com", confirmed=True)
+        self.session = AsyncMock(spec=AsyncSession)
+        self.body = dict(first_name="Peter", last_name="Parker", email="peter@example.com",
+                         phone_number="380501234567", born_date="2001-08-10")
+        self.build = AsyncMock(return_value=(b"[]", {}))
+
+    async def etag(self) -> str:
+        return (await self.cache.respond(TestResponseCache.request(), self.user.id, self.build)).headers["etag"]
+
+    def returns(self, contact: Contact) -> None:
+        result = MagicMock()
+        result.scalar_one_or_none.return_value = contact
+        self.session.execute.return_value = result
+
+    async def test_writes_bump_the_version(self):
+        etags = [await self.etag()]
+        await repository_contacts.create_contact(ContactSchema(**self.body), self.session, self.user)
+        etags.append(await self.etag())
+        self.returns(Contact(id=1, user_id=self.user.id, **self.body))
+        await repository_contacts.update_contact(1, ContactUpdateSchema(**self.body, completed=True),
+                                                 self.session, self.user)
+        etags.append(await self.etag())
+        self.returns(Contact(id=1, user_id=self.user.id, **self.body))
+        await repository_contacts.delete_contact(1, self.session, self.user)
+        etags.append(await self.etag())
+        self.assertEqual(len(set(etags)), 4)
+        # every version was built once, and unchanged data is still answered from the cache
+        self.assertEqual(self.build.await_count, 4)
+        self.assertEqual(await self.etag(), etags[-1])
+        self.assertEqual(self.build.await_count, 4)
+
+    async def test_write_while_redis_is_down(self):
+        etag = await self.etag()
+        self.server.connected = False
+        await repository_contacts.create_contact(ContactSchema(**self.body), self.session, self.user)
+        response = await self.cache.respond(TestResponseCache.request({"If-None-Match": etag}), 1, self.build)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn("etag", response.headers)
+        # Redis is back and the down window is over; the missed bump is made before the next read
+        self.server.connected = True
+        self.cache._redis_down_until = 0.0
+        response = await self.cache.respond(TestResponseCache.request({"If-None-Match": etag}), 1, self.build)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response.headers["etag"], etag)
+        self.assertEqual(self.cache._dirty, set())
+
+    async def test_other_users_are_not_invalidated(self):
+        other = (await self.cache.respond(TestResponseCache.request(), 2, self.build)).headers["etag"]
+        await repository_contacts.create_contact(ContactSchema(**self.body), self.session, self.user)
+        self.assertEqual((await self.cache.respond(TestResponseCache.request(), 2, self.build)).headers["etag"], other)
+
+    async def test_avatar_change_bumps_the_version(self):
+        # cached contact bodies embed the user's avatar
+        etag = await self.etag()
+        self.returns(self.user)
+        with patch.object(repository_users, "user_cache", AsyncMock()), \
+                patch.object(repository_users, "contacts_cache", self.cache):
+            await repository_users.update_avatar_url(self.user.email, "https://example.com/a.png", self.session)
+        self.assertNotEqual(await self.etag(), etag)
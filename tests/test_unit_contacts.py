@@ -1,5 +1,5 @@
 import unittest
-from unittest.mock import MagicMock, AsyncMock
+from unittest.mock import MagicMock, AsyncMock, patch
 from sqlalchemy.ext.asyncio import AsyncSession
 from src.entity.models import Contact, User
 from src.schemas.contact import ContactSchema, ContactUpdateSchema
@@ -15,132 +15,114 @@ from src.repository.contacts import (
 
 class TestAsyncContact(unittest.IsolatedAsyncioTestCase):
     def setUp(self) -> None:
-        self.user = User(id=1, username="test_user", passwor="blabla", confirmed=True)
+        self.user = User(id=1, username="test_user", password="blabla", confirmed=True)
         self.session = AsyncMock(spec=AsyncSession)
+        patcher = patch("src.repository.contacts.contacts_cache", AsyncMock())
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def contact(self, contact_id: int) -> Contact:
+        return Contact(
+            id=contact_id,
+            first_name=f"first_{contact_id}",
+            last_name=f"last_{contact_id}",
+            email=f"contact{contact_id}@example.com",
+            phone_number="380501234567",
+            born_date="2000-01-01",
+            user=self.user,
+        )
 
     async def test_get_contacts(self):
-    """    
-    The test_get_contacts function tests the get_contacts function.
-    It does this by mocking a session object and then calling the get_contacts function with that mocked session object.
-    The test asserts that the result of calling get_contacts is equal to a list of two Contact objects.
-    
-    :param self: Access the attributes and methods of the class in python
-    :return: A list of contacts
-    :doc-author: Trelent
-    """
+        """
+        The test_get_contacts function tests the get_contacts function.
+        It does this by mocking a session object and then calling the get_contacts function with that mocked session object.
+        The test asserts that the result of calling get_contacts is equal to a list of two Contact objects.
+
+        :param self: Access the attributes and methods of the class in python
+        :return: A list of contacts
+        :doc-author: Trelent
+        """
         limit = 10
         offset = 0
-        contacts = [
-            Contact(
-                id=1,
-                title="test_title_1",
-                description="test_description_1",
-                user=self.user,
-            ),
-            Contact(
-                id=2,
-                title="test_title_2",
-                description="test_description_2",
-                user=self.user,
-            ),
-        ]
+        contacts = [self.contact(1), self.contact(2)]
         mocked_contacts = MagicMock()
         mocked_contacts.scalars.return_value.all.return_value = contacts
         self.session.execute.return_value = mocked_contacts
-        result = await get_contacts(limit, offset, self.session)
+        result = await get_contacts(limit, offset, self.session, self.user)
         self.assertEqual(result, contacts)
 
     async def test_get_contact(self):
-        """    
-    The test_get_contact function tests the get_contact function.
-    It does this by mocking a session object and a user object, then calling the get_contact function with these mocked objects as arguments.
-    The test asserts that the result of calling get_contact is equal to an expected list of contacts.
-    
-    :param self: Access the instance of the class
-    :return: A list of two objects
-    :doc-author: Trelent
-    """
-        limit = 10
-        offset = 0
-        contacts = [
-            Contact(
-                id=1,
-                title="test_title_1",
-                description="test_description_1",
-                user=self.user,
-            ),
-            Contact(
-                id=2,
-                title="test_title_2",
-                description="test_description_2",
-                user=self.user,
-            ),
-        ]
-        mocked_contacts = MagicMock()
-        mocked_contacts.scalars.return_value.all.return_value = contacts
-        self.session.execute.return_value = mocked_contacts
-        result = await get_contact(limit, offset, self.session, self.user)
-        self.assertEqual(result, contacts)
+        """
+        The test_get_contact function tests the get_contact function.
+        It does this by mocking a session object and a user object, then calling the get_contact function with these mocked objects as arguments.
+        The test asserts that the result of calling get_contact is the contact returned by the session.
+
+        :param self: Access the instance of the class
+        :return: A contact object
+        :doc-author: Trelent
+        """
+        contact = self.contact(1)
+        mocked_contact = MagicMock()
+        mocked_contact.scalar_one_or_none.return_value = contact
+        self.session.execute.return_value = mocked_contact
+        result = await get_contact(1, self.session, self.user)
+        self.assertEqual(result, contact)
 
     async def test_create_contact(self):
-    """    
-    The test_create_contact function tests the create_contact function.
-    It does this by creating a ContactSchema object, which is then passed to the create_contact function.
-    The result of that call is then checked to see if it's an instance of Contact and if its title and description are equal to those in the body.
-    
-    :param self: Represent the instance of the class
-    :return: An instance of the contact class
-    :doc-author: Trelent
-    """
-        body = ContactSchema(title="test_title", description="test_description")
+        """
+        The test_create_contact function tests the create_contact function.
+        It does this by creating a ContactSchema object, which is then passed to the create_contact function.
+        The result of that call is then checked to see if it's an instance of Contact and if its fields are equal to those in the body.
+
+        :param self: Represent the instance of the class
+        :return: An instance of the contact class
+        :doc-author: Trelent
+        """
+        body = ContactSchema(first_name="Peter", last_name="Parker", email="peter@example.com",
+                             phone_number="380501234567", born_date="2001-08-10")
         result = await create_contact(body, self.session, self.user)
         self.assertIsInstance(result, Contact)
-        self.assertEqual(result.title, body.title)
-        self.assertEqual(result.description, body.description)
+        self.assertEqual(result.first_name, body.first_name)
+        self.assertEqual(result.email, body.email)
+        self.session.commit.assert_awaited_once()
 
     async def test_update_contact(self):
-    """
-    The test_update_contact function tests the update_contact function.
-    It does this by creating a ContactUpdateSchema object, which is used to create a mocked contact object.
-    The mocked contact's scalar_one_or_none method returns a Contact object with an id of 1, title of test_title, 
-    description of test_description and user equal to self.user (which is set in the setup function).
-    The session's execute method then returns the mocked contact and result becomes equal to await update-contact(...). 
-    The assertIsInstance statement checks that result is an instance of Contact and asserts that it has been updated correctly.
-    
-    :param self: Represent the instance of the class
-    :return: A contact object
-    :doc-author: Trelent
-    """
-        body = ContactUpdateSchema(
-            title="test_title", description="test_description", completed=True
-        )
+        """
+        The test_update_contact function tests the update_contact function.
+        It does this by creating a ContactUpdateSchema object and a mocked result whose scalar_one_or_none method
+        returns an existing Contact of self.user (which is set in the setup function).
+        The session's execute method then returns the mocked result and result becomes equal to await update_contact(...).
+        The assertions check that result is an instance of Contact and that it has been updated from the body.
+
+        :param self: Represent the instance of the class
+        :return: A contact object
+        :doc-author: Trelent
+        """
+        body = ContactUpdateSchema(first_name="Peter", last_name="Parker", email="peter@example.com",
+                                   phone_number="380501234567", born_date="2001-08-10", completed=True)
         mocked_contact = MagicMock()
-        mocked_contact.scalar_one_or_none.return_value = Contact(
-            id=1, title="test_title", description="test_description", user=self.user
-        )
+        mocked_contact.scalar_one_or_none.return_value = self.contact(1)
         self.session.execute.return_value = mocked_contact
         result = await update_contact(1, body, self.session, self.user)
         self.assertIsInstance(result, Contact)
-        self.assertEqual(result.title, body.title)
-        self.assertEqual(result.description, body.description)
+        self.assertEqual(result.first_name, body.first_name)
+        self.assertEqual(result.born_date, body.born_date)
+        self.assertTrue(result.completed)
 
     async def test_delete_contact(self):
-    """
-    The test_delete_contact function tests the delete_contact function in the contacts.py file.
-    It does this by mocking a contact object and returning it when scalar_one_or_none is called on it,
-    and then calling execute on self.session with that mocked contact as an argument, which returns 
-    the mocked contact again (this is done to simulate what happens in the actual delete function). 
-    Then we call delete and commit on self.session to simulate deleting a row from our database table, 
-    and finally assert that result is an instance of Contact.
-    
-    :param self: Access the variables in the class
-    :return: A contact object
-    :doc-author: Trelent
-    """
-        mocked_contact = MagicMock
-        mocked_contact.scalar_one_or_none.return_value = Contact(
-            id=1, title="test_title", description="test_description", user=self.user
-        )
+        """
+        The test_delete_contact function tests the delete_contact function in the contacts.py file.
+        It does this by mocking a result whose scalar_one_or_none method returns a contact,
+        and returning it from execute on self.session (this simulates the select in the actual delete function).
+        Then we check that delete and commit were called on self.session to delete the row from our database table,
+        and finally assert that result is an instance of Contact.
+
+        :param self: Access the variables in the class
+        :return: A contact object
+        :doc-author: Trelent
+        """
+        mocked_contact = MagicMock()
+        mocked_contact.scalar_one_or_none.return_value = self.contact(1)
         self.session.execute.return_value = mocked_contact
         result = await delete_contact(1, self.session, self.user)
         self.session.delete.assert_called_once()
@@ -0,0 +1,129 @@
+import socket
+import unittest
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import delete, select
+
+from src.entity.models import EmailOutbox
+from src.repository.outbox import enqueue_email
+from src.services.email_worker import SMTPSender, DomainRateLimiter, process_batch
+from tests.conftest import TestingSessionLocal
+
+controller = pytest.importorskip("aiosmtpd.controller")
+
+
+class Handler:
+    def __init__(self):
+        self.envelopes = []
+
+    async def handle_RCPT(self, server, session, envelope, address, rcpt_options):
+        if address.startswith("bounce@"):
+            return "550 No such user"
+        envelope.rcpt_tos.append(address)
+        return "250 OK"
+
+    async def handle_DATA(self, server, session, envelope):
+        self.envelopes.append(envelope)
+        return "250 Message accepted for delivery"
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+class TestEmailWorker(unittest.IsolatedAsyncioTestCase):
+    def setUp(self) -> None:
+        self.handler = Handler()
+        self.server = controller.Controller(self.handler, hostname="127.0.0.1", port=free_port())
+        self.server.start()
+        self.sender = SMTPSender("127.0.0.1", self.server.port)
+        self.limiter = DomainRateLimiter(rate=0, burst=0)
+
+    def tearDown(self) -> None:
+        self.server.stop()
+
+    async def asyncSetUp(self) -> None:
+        async with TestingSessionLocal() as db:
+            await db.execute(delete(EmailOutbox))
+            await db.commit()
+
+    async def asyncTearDown(self) -> None:
+        await self.sender.close()
+
+    async def enqueue(self, *recipients: str):
+        async with TestingSessionLocal() as db:
+            for recipient in recipients:
+                await enqueue_email(recipient, "Confirm your email", "verify_email.html",
+                                    {"host": "http://test/", "username": "user", "token": "abc"}, db)
+
+    async def process(self, **kwargs) -> tuple[int, dict[str, EmailOutbox]]:
+        async with TestingSessionLocal() as db:
+            processed = await process_batch(db, self.sender, self.limiter, batch_size=10, max_attempts=3, **kwargs)
+            emails = (await db.execute(select(EmailOutbox))).scalars().all()
+        return processed, {email.recipient: email for email in emails}
+
+    async def test_sends_batch_over_one_connection(self):
+        await self.enqueue("a@example.com", "b@example.com", "c@example.org")
+        processed, emails = await self.process()
+        self.assertEqual(processed, 3)
+        self.assertEqual(self.sender.connections, 1)
+        self.assertEqual(len(self.handler.envelopes), 3)
+        self.assertIn(b"http://test/api/auth/confirmed_email/abc", self.handler.envelopes[0].content)
+        self.assertTrue(all(email.status == "sent" and email.attempts == 1 for email in emails.values()))
+        self.assertEqual((await self.process())[0], 0)
+
+    async def test_permanent_failure_is_not_retried(self):
+        await self.enqueue("bounce@example.com", "a@example.com")
+        _, emails = await self.process()
+        self.assertEqual(emails["bounce@example.com"].status, "failed")
+        self.assertIn("550", emails["bounce@example.com"].last_error)
+        self.assertEqual(emails["a@example.com"].status, "sent")
+
+    async def test_retries_with_backoff_when_server_is_down(self):
+        self.sender = SMTPSender("127.0.0.1", free_port(), timeout=1)
+        await self.enqueue("a@example.com")
+        now = datetime.utcnow()
+        for attempt, delay in ((1, 30), (2, 60)):
+            _, emails = await self.process(now=now)
+            email = emails["a@example.com"]
+            self.assertEqual((email.status, email.attempts), ("pending", attempt))
+            self.assertEqual(email.next_attempt_at, now + timedelta(seconds=delay))
+            now = email.next_attempt_at
+        _, emails = await self.process(now=now)
+        self.assertEqual((emails["a@example.com"].status, emails["a@example.com"].attempts), ("failed", 3))
+
+    async def test_domain_rate_limit_defers_without_an_attempt(self):
+        self.limiter = DomainRateLimiter(rate=1, burst=1, clock=lambda: 0.0)
+        await self.enqueue("a@example.com", "b@example.com", "c@example.org")
+        processed, emails = await self.process()
+        self.assertEqual(processed, 2)
+        self.assertEqual(emails["a@example.com"].status, "sent")
+        self.assertEqual(emails["c@example.org"].status, "sent")
+        self.assertEqual((emails["b@example.com"].status, emails["b@example.com"].attempts), ("pending", 0))
+
+    async def test_each_email_is_committed_once_sent(self):
+        await self.enqueue("a@example.com", "b@example.com")
+        now = datetime.utcnow()
+        async with TestingSessionLocal() as db:
+            commit, commits = db.commit, []
+
+            async def failing_commit():
+                commits.append(1)
+                if len(commits) == 3:
+                    raise OSError("database went away")
+                await commit()
+
+            db.commit = failing_commit
+            with self.assertRaises(OSError):
+                await process_batch(db, self.sender, self.limiter, batch_size=10, max_attempts=3, now=now)
+            await db.rollback()
+        async with TestingSessionLocal() as db:
+            emails = {email.recipient: email for email in (await db.execute(select(EmailOutbox))).scalars()}
+        self.assertEqual(emails["a@example.com"].status, "sent")
+        # accepted by the server but not recorded: leased, and sent again once the claim runs out
+        self.assertEqual(emails["b@example.com"].status, "pending")
+        self.assertGreater(emails["b@example.com"].next_attempt_at, now)
+        self.assertEqual(len(self.handler.envelopes), 2)
@@ -0,0 +1,35 @@
+import asyncio
+import threading
+import unittest
+
+from src.services.executor import BoundedExecutor, ExecutorBusy
+
+
+class TestBoundedExecutor(unittest.IsolatedAsyncioTestCase):
+    def setUp(self) -> None:
+        self.executor = BoundedExecutor("thread", max_workers=1, max_pending=1, name="test")
+        self.gate = threading.Event()
+
+    def tearDown(self) -> None:
+        self.gate.set()
+        self.executor.shutdown()
+
+    async def test_run(self):
+        result = await self.executor.run(pow, 2, 10)
+        self.assertEqual(result, 1024)
+        self.assertEqual(self.executor.stats()["completed"], 1)
+
+    async def test_rejects_when_queue_is_full(self):
+        running = asyncio.create_task(self.executor.run(self.gate.wait))
+        await asyncio.sleep(0.01)
+        waiting = asyncio.create_task(self.executor.run(pow, 2, 2))
+        await asyncio.sleep(0.01)
+        stats = self.executor.stats()
+        self.assertEqual(stats["running"], 1)
+        self.assertEqual(stats["pending"], 1)
+        with self.assertRaises(ExecutorBusy):
+            await self.executor.run(pow, 2, 3)
+        self.assertEqual(self.executor.stats()["rejected"], 1)
+        self.gate.set()
+        await running
+        self.assertEqual(await waiting, 4)
@@ -0,0 +1,60 @@
+import asyncio
+import unittest
+
+from src.services.health import HealthMonitor
+
+
+async def passing():
+    pass
+
+
+async def failing():
+    raise ConnectionError("refused")
+
+
+async def hanging():
+    await asyncio.sleep(10)
+
+
+class TestHealthMonitor(unittest.IsolatedAsyncioTestCase):
+    def monitor(self, **checks) -> HealthMonitor:
+        return HealthMonitor(checks, required=["database"], interval=5, timeout=0.05, stale_after=30)
+
+    async def test_starting(self):
+        ready, report = self.monitor(database=passing).status()
+        self.assertFalse(ready)
+        self.assertEqual(report["status"], "starting")
+
+    async def test_ready(self):
+        monitor = self.monitor(database=passing, redis=passing)
+        await monitor.run_once()
+        ready, report = monitor.status()
+        self.assertTrue(ready)
+        self.assertEqual(report["status"], "ok")
+        self.assertTrue(report["checks"]["database"]["ok"])
+
+    async def test_optional_failure_degrades(self):
+        monitor = self.monitor(database=passing, mail=failing)
+        await monitor.run_once()
+        ready, report = monitor.status()
+        self.assertTrue(ready)
+        self.assertEqual(report["status"], "degraded")
+        self.assertEqual(report["checks"]["mail"]["error"], "ConnectionError: refused")
+
+    async def test_required_failure_and_timeout(self):
+        monitor = self.monitor(database=hanging)
+        await monitor.run_once()
+        ready, report = monitor.status()
+        self.assertFalse(ready)
+        self.assertEqual(report["status"], "unavailable")
+        self.assertIn("no answer", report["checks"]["database"]["error"])
+
+    async def test_stale_results(self):
+        monitor = self.monitor(database=passing)
+        await monitor.run_once()
+        monitor.last_run -= 31
+        self.assertFalse(monitor.status()[0])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,60 @@
+import unittest
+
+from sqlalchemy import create_engine, event, text
+
+from src.database.db import before_cursor_execute, after_cursor_execute
+from src.services.metrics import Counter, Gauge, Histogram, Registry, db_statement_duration
+
+
+class TestMetrics(unittest.TestCase):
+    def setUp(self) -> None:
+        self.registry = Registry()
+
+    def test_counter(self):
+        counter = self.registry.register(Counter("requests_total", "Requests.", ("method", "status")))
+        counter.inc("GET", 200)
+        counter.inc("GET", 200, amount=2)
+        counter.inc("POST", 201)
+        text = self.registry.render()
+        self.assertIn("# TYPE requests_total counter", text)
+        self.assertIn('requests_total{method="GET",status="200"} 3', text)
+        self.assertIn('requests_total{method="POST",status="201"} 1', text)
+
+    def test_gauge(self):
+        gauge = self.registry.register(Gauge("in_flight", "In flight."))
+        gauge.inc()
+        gauge.inc()
+        gauge.dec()
+        self.assertIn("in_flight 1", self.registry.render())
+
+    def test_histogram_buckets_are_cumulative(self):
+        histogram = self.registry.register(Histogram("latency_seconds", "Latency.", ("route",), buckets=(0.1, 1.0)))
+        for value in (0.05, 0.1, 0.5, 3.0):
+            histogram.observe(value, "/a")
+        lines = self.registry.render().splitlines()
+        self.assertIn('latency_seconds_bucket{route="/a",le="0.1"} 2', lines)
+        self.assertIn('latency_seconds_bucket{route="/a",le="1.0"} 3', lines)
+        self.assertIn('latency_seconds_bucket{route="/a",le="+Inf"} 4', lines)
+        self.assertIn('latency_seconds_sum{route="/a"} 3.65', lines)
+        self.assertIn('latency_seconds_count{route="/a"} 4', lines)
+
+    def test_label_values_are_escaped(self):
+        counter = self.registry.register(Counter("odd_total", "Odd labels.", ("value",)))
+        counter.inc('say "hi"\n')
+        self.assertIn('odd_total{value="say \\"hi\\"\\n"} 1', self.registry.render())
+
+
+    def test_sql_statement_duration(self):
+        engine = create_engine("sqlite://")
+        event.listen(engine, "before_cursor_execute", before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", after_cursor_execute)
+        before = sum(db_statement_duration.series(("SELECT",))[:-1])
+        with engine.connect() as conn:
+            conn.execute(text("  select 1"))
+            conn.execute(text("PRAGMA user_version"))
+        self.assertEqual(sum(db_statement_duration.series(("SELECT",))[:-1]), before + 1)
+        self.assertGreater(sum(db_statement_duration.series(("OTHER",))[:-1]), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,82 @@
+import unittest
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+import redis
+
+from src.services.rate_limit import HybridRateLimiter
+
+
+class TestHybridRateLimiter(unittest.IsolatedAsyncioTestCase):
+    def setUp(self) -> None:
+        self.now = 0.0
+        self.script = AsyncMock(return_value=[3, 0])
+        client = MagicMock()
+        client.register_script.return_value = self.script
+        self.limiter = HybridRateLimiter(
+            client,
+            policies={"contacts:read": "10/60", "auth:login": "2/10"},
+            overrides={"bot@example.com": {"contacts:read": "100/60"}},
+            lease_fraction=0.3,
+            lease_ttl=1.0,
+            local_size=100,
+            clock=lambda: self.now,
+        )
+
+    async def test_lease_is_spent_locally(self):
+        for _ in range(3):
+            self.assertEqual(await self.limiter.hit("contacts:read", "a@example.com"), 0)
+        self.script.assert_awaited_once()
+        self.assertEqual(self.script.await_args.kwargs["args"][:3], [10, 60000, 3])
+        await self.limiter.hit("contacts:read", "a@example.com")
+        self.assertEqual(self.script.await_count, 2)
+        self.assertEqual(self.limiter.counters["local_allowed"], 2)
+
+    async def test_lease_expires(self):
+        await self.limiter.hit("contacts:read", "a@example.com")
+        self.now = 1.5
+        await self.limiter.hit("contacts:read", "a@example.com")
+        self.assertEqual(self.script.await_count, 2)
+
+    async def test_blocked_key_skips_redis_until_retry(self):
+        self.script.return_value = [0, 2500]
+        self.assertEqual(await self.limiter.hit("contacts:read", "a@example.com"), 2.5)
+        self.now = 1.0
+        self.assertEqual(await self.limiter.hit("contacts:read", "a@example.com"), 1.5)
+        self.script.assert_awaited_once()
+        self.now = 3.0
+        await self.limiter.hit("contacts:read", "a@example.com")
+        self.assertEqual(self.script.await_count, 2)
+
+    async def test_overrides(self):
+        await self.limiter.hit("contacts:read", "bot@example.com")
+        self.assertEqual(self.script.await_args.kwargs["args"][:3], [100, 60000, 30])
+
+    async def test_degraded_mode_uses_local_token_bucket(self):
+        self.script.side_effect = redis.ConnectionError()
+        self.assertEqual(await self.limiter.hit("auth:login", "10.0.0.1"), 0)
+        self.assertEqual(await self.limiter.hit("auth:login", "10.0.0.1"), 0)
+        self.assertEqual(await self.limiter.hit("auth:login", "10.0.0.1"), 5.0)
+        self.script.assert_awaited_once()
+        self.assertTrue(self.limiter.stats()["degraded_mode"])
+        self.now = 5.0
+        self.assertEqual(await self.limiter.hit("auth:login", "10.0.0.1"), 0)
+
+
+class TestSteadyRate(unittest.IsolatedAsyncioTestCase):
+    async def test_unspent_leases_are_given_back(self):
+        fakeredis = pytest.importorskip("fakeredis")
+        pytest.importorskip("lupa")  # fakeredis runs Lua scripts with it
+        self.now = 0.0
+        client = fakeredis.FakeAsyncRedis()
+        limiter = HybridRateLimiter(client, policies={"contacts:read": "300/60"}, overrides={},
+                                    lease_fraction=0.1, lease_ttl=1.0, local_size=100, clock=lambda: self.now)
+        # one request a second, well below the limit; every lease expires with most of it unspent
+        waits = []
+        for i in range(60):
+            self.now = float(i)
+            waits.append(await limiter.hit("contacts:read", "a@example.com"))
+        self.assertEqual(waits, [0.0] * 60)
+        self.assertEqual(limiter.counters["local_blocked"], 0)
+        # only the lease currently held is in the window without having been used
+        self.assertEqual(await client.zcard("ratelimit:contacts:read:a@example.com"), 60 + 29)
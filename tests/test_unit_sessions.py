@@ -0,0 +1,65 @@
+import unittest
+
+import pytest
+from fastapi import HTTPException
+
+from src.services.sessions import RefreshTokenStore, ROTATED, MISSING, REUSED
+
+fakeredis = pytest.importorskip("fakeredis")
+pytest.importorskip("lupa")  # fakeredis runs Lua scripts with it
+
+
+class TestRefreshTokenStore(unittest.IsolatedAsyncioTestCase):
+    def setUp(self) -> None:
+        self.client = fakeredis.FakeAsyncRedis()
+        self.store = RefreshTokenStore(self.client, ttl=3600)
+
+    async def test_rotation(self):
+        sid, jti = await self.store.create("a@example.com", "phone")
+        result, new_jti = await self.store.rotate("a@example.com", sid, jti)
+        self.assertEqual(result, ROTATED)
+        self.assertNotEqual(new_jti, jti)
+        result, newer_jti = await self.store.rotate("a@example.com", sid, new_jti)
+        self.assertEqual(result, ROTATED)
+        self.assertGreater(await self.client.ttl(self.store.session_key(sid)), 3500)
+
+    async def test_reuse_revokes_the_session(self):
+        sid, jti = await self.store.create("a@example.com", "phone")
+        _, new_jti = await self.store.rotate("a@example.com", sid, jti)
+        self.assertEqual(await self.store.rotate("a@example.com", sid, jti), (REUSED, None))
+        # the thief's rotation killed the family, so the legitimate token is dead as well
+        self.assertEqual(await self.store.rotate("a@example.com", sid, new_jti), (MISSING, None))
+        self.assertEqual(await self.store.sessions("a@example.com"), [])
+
+    async def test_sessions_per_device(self):
+        phone, _ = await self.store.create("a@example.com", "phone")
+        laptop, _ = await self.store.create("a@example.com", "laptop")
+        await self.store.create("b@example.com", "phone")
+        sessions = await self.store.sessions("a@example.com")
+        self.assertEqual({session["id"]: session["device"] for session in sessions}, {phone: "phone", laptop: "laptop"})
+        self.assertFalse(await self.store.revoke("b@example.com", phone))
+        self.assertTrue(await self.store.revoke("a@example.com", phone))
+        self.assertEqual([session["id"] for session in await self.store.sessions("a@example.com")], [laptop])
+        self.assertEqual(await self.store.revoke_all("a@example.com"), 1)
+        self.assertEqual(await self.store.sessions("a@example.com"), [])
+        self.assertEqual(len(await self.store.sessions("b@example.com")), 1)
+
+    async def test_logout_needs_the_current_token(self):
+        sid, jti = await self.store.create("a@example.com", "phone")
+        _, new_jti = await self.store.rotate("a@example.com", sid, jti)
+        self.assertFalse(await self.store.logout("a@example.com", sid, jti))
+        self.assertEqual(len(await self.store.sessions("a@example.com")), 1)
+        self.assertTrue(await self.store.logout("a@example.com", sid, new_jti))
+        self.assertEqual(await self.store.sessions("a@example.com"), [])
+
+    async def test_redis_down(self):
+        server = fakeredis.FakeServer()
+        server.connected = False
+        store = RefreshTokenStore(fakeredis.FakeAsyncRedis(server=server), ttl=3600)
+        with self.assertRaises(HTTPException) as error:
+            await store.create("a@example.com", "phone")
+        self.assertEqual(error.exception.status_code, 503)
+
+
+if __name__ == "__main__":
+    unittest.main()
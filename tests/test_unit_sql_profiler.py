@@ -0,0 +1,51 @@
+import unittest
+
+from sqlalchemy import create_engine, text
+
+from src.services.sql_profiler import normalize, capture_queries, assert_max_queries
+
+
+class TestSqlProfiler(unittest.TestCase):
+    def setUp(self) -> None:
+        self.engine = create_engine("sqlite://")
+        with self.engine.begin() as conn:
+            conn.execute(text("CREATE TABLE users (id INTEGER PRIMARY KEY, email TEXT)"))
+            conn.execute(text("CREATE TABLE contacts (id INTEGER PRIMARY KEY, user_id INTEGER)"))
+
+    def test_normalize(self):
+        self.assertEqual(
+            normalize("SELECT * FROM users\n WHERE email = 'a@b.c' AND id IN (1, 2, 3) LIMIT 10"),
+            "SELECT * FROM users WHERE email = ? AND id IN (?, ...) LIMIT ?",
+        )
+        self.assertEqual(normalize("SELECT id_1 FROM t WHERE a = $1 AND b = %(b)s AND c = :c AND d::text = ?"),
+                         "SELECT id_1 FROM t WHERE a = ? AND b = ? AND c = ? AND d::text = ?")
+
+    def test_repeated_shapes(self):
+        with capture_queries() as profile:
+            with self.engine.connect() as conn:
+                for user_id in (1, 2, 3):
+                    conn.execute(text("SELECT * FROM users WHERE id = :id"), {"id": user_id})
+                conn.execute(text("SELECT * FROM contacts JOIN users ON users.id = contacts.user_id"))
+        self.assertEqual(profile.count, 4)
+        self.assertEqual(profile.repeated(), {"SELECT * FROM users WHERE id = ?": 3})
+        self.assertEqual(profile.tables_read(), {"users": 4})
+        self.assertIn("3x SELECT * FROM users WHERE id = ?", profile.report())
+
+    def test_assert_max_queries(self):
+        with assert_max_queries(1):
+            with self.engine.connect() as conn:
+                conn.execute(text("SELECT 1"))
+        with self.assertRaises(AssertionError):
+            with assert_max_queries(1):
+                with self.engine.connect() as conn:
+                    conn.execute(text("SELECT 1"))
+                    conn.execute(text("SELECT 2"))
+        with self.assertRaises(AssertionError):
+            with assert_max_queries(5):
+                with self.engine.connect() as conn:
+                    conn.execute(text("SELECT * FROM users WHERE id = 1"))
+                    conn.execute(text("SELECT * FROM users WHERE id = 2"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,30 @@
+import unittest
+
+from src.services.startup import parse_importtime, summarize
+
+OUTPUT = """\
+import time: self [us] | cumulative | imported package
+import time:       300 |        300 |     sqlalchemy.sql
+import time:      1000 |       1300 |   sqlalchemy
+import time:       200 |        200 |   src.conf.config
+import time:       500 |       2000 | main
+"""
+
+
+class TestStartupReport(unittest.TestCase):
+    def test_parse_importtime(self):
+        rows = parse_importtime(OUTPUT)
+        self.assertEqual([row["module"] for row in rows], ["sqlalchemy.sql", "sqlalchemy", "src.conf.config", "main"])
+        self.assertEqual([row["depth"] for row in rows], [2, 1, 1, 0])
+        self.assertEqual(rows[1]["self_ms"], 1.0)
+        self.assertEqual(rows[1]["cumulative_ms"], 1.3)
+
+    def test_summarize(self):
+        summary = summarize(parse_importtime(OUTPUT), "main", top=2)
+        self.assertEqual(summary["total_ms"], 2.0)
+        self.assertEqual(summary["packages"], {"sqlalchemy": 1.3, "main": 0.5})
+        self.assertEqual(list(summary["app_modules"]), ["main", "src.conf.config"])
+
+
+if __name__ == "__main__":
+    unittest.main()